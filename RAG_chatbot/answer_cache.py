@@ -0,0 +1,126 @@
+# RAG_chatbot/answer_cache.py
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from .embedding_cache import normalize_text
+
+# 답변에 영향을 주는 사용자 정보 (프롬프트/번역에 쓰이는 항목만, 출신 국가는 답변에 쓰이지 않음)
+PROFILE_FIELDS = ("residence_area", "visa_status", "family_members", "interests", "preferred_language")
+
+# 숫자가 들어간 표현(F-6, 제7조, 2025년 등)은 임베딩이 거의 같아도 답이 달라지므로 정확히 같아야 적중
+KEY_TERM_PATTERN = re.compile(r"[A-Za-z]-\d+|[0-9A-Za-z가-힣]*\d[0-9A-Za-z가-힣]*")
+
+
+def profile_key(user_info):
+    """사용자 정보 → 정규화한 캐시 키 (목록 항목은 순서 무시)"""
+    profile = {}
+    for field in PROFILE_FIELDS:
+        value = (user_info or {}).get(field)
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(normalize_text(str(item)) for item in value)
+        elif value is not None:
+            value = normalize_text(str(value))
+        if value:
+            profile[field] = value
+    return json.dumps(profile, ensure_ascii=False, sort_keys=True)
+
+
+def key_terms(query):
+    return frozenset(term.upper() for term in KEY_TERM_PATTERN.findall(normalize_text(query)))
+
+
+class SemanticAnswerCache:
+    """
+    (질문 임베딩, 사용자 정보) → 답변 캐시
+    - 사용자 정보 키가 같고, 질문 임베딩 코사인 유사도가 threshold 이상이고, 숫자 표현이 같으면 저장된 답변 반환
+    - ttl(초)이 지난 항목은 조회 시 제거, maxsize 를 넘으면 가장 오래 사용하지 않은 항목부터 제거 (LRU)
+    - corpus_version(컬렉션 버전/내용 지문)이 바뀌면 전체 무효화
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, maxsize=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.corpus_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # 번호 → (프로필 키, 정규화 벡터, 숫자 표현, 답변, 저장 시각)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self, corpus_version):
+        if corpus_version != self.corpus_version:
+            if self._entries:
+                self.invalidations += 1
+                print(f"[answer-cache] 문서 버전 변경으로 캐시 {len(self._entries)}개 무효화")
+            self._entries.clear()
+            self.corpus_version = corpus_version
+
+    def _expire(self, now):
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry[4] > self.ttl]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        self.expirations += len(expired)
+
+    def get(self, query, embedding, user_info=None, corpus_version=None):
+        """저장된 답변 (없으면 None)"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        profile, terms = profile_key(user_info), key_terms(query)
+        with self._lock:
+            self._check_version(corpus_version)
+            self._expire(time.time())
+            best_id, best_similarity = None, self.threshold
+            for entry_id, (entry_profile, entry_vector, entry_terms, _, _) in self._entries.items():
+                if entry_profile != profile or entry_terms != terms:
+                    continue
+                similarity = float(entry_vector @ vector)
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            answer = self._entries[best_id][3]
+        print(f"[answer-cache] 적중 (유사도 {best_similarity:.3f})")
+        return answer
+
+    def put(self, query, embedding, answer, user_info=None, corpus_version=None):
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        with self._lock:
+            self._check_version(corpus_version)
+            self._entries[self._next_id] = (profile_key(user_info), vector, key_terms(query), answer, time.time())
+            self._next_id += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,207 @@
+# RAG_chatbot/context_packer.py
+import math
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+from pydantic import ConfigDict
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from .embedding_cache import normalize_text
+from .lexical_index import lexical_terms
+
+# 토큰 수를 셀 모델 (tiktoken 이 모르는 모델이면 o200k_base 사용)
+TOKEN_MODEL = "gpt-4.1-mini"
+FALLBACK_ENCODING = "o200k_base"
+
+# 앞 청크 끝과 뒤 청크 시작이 이 길이(글자) 이상 겹치면 겹친 부분을 잘라냄
+MIN_OVERLAP = 20
+MAX_OVERLAP = 400
+# 이 길이 미만의 줄은 중복이어도 지우지 않음 (빈 줄, '1.' 같은 번호)
+MIN_DEDUP_LINE = 6
+
+
+@lru_cache(maxsize=None)
+def _encoding(model=TOKEN_MODEL):
+    """tiktoken 인코딩 (인코딩 파일을 받을 수 없는 환경이면 None → 글자 수로 추정)"""
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        print(f"[context] tiktoken 인코딩 로드 실패, 글자 수로 토큰 추정: {e}")
+        return None
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        print(f"[context] tiktoken 인코딩 로드 실패, 글자 수로 토큰 추정: {e}")
+        return None
+
+
+def count_tokens(text, model=TOKEN_MODEL):
+    encoding = _encoding(model)
+    if encoding is None:
+        # o200k 기준 한국어는 대략 2글자에 1토큰
+        return math.ceil(len(text) / 2)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens, model=TOKEN_MODEL):
+    """앞에서부터 max_tokens 토큰까지만 남김 (가능하면 줄 경계에서 자름)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        truncated = text[:max_tokens * 2]
+    else:
+        truncated = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    if len(truncated) >= len(text):
+        return text
+    line_end = truncated.rfind("\n")
+    if line_end > len(truncated) // 2:
+        truncated = truncated[:line_end]
+    return truncated.rstrip() + " …"
+
+
+def _overlap(previous, text):
+    """previous 의 끝과 text 의 시작이 겹치는 길이 (MIN_OVERLAP 미만이면 0)"""
+    for length in range(min(len(previous), len(text), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if previous.endswith(text[:length]):
+            return length
+    return 0
+
+
+def _strip_seen(text, packed_texts, seen_lines):
+    """이미 넣은 청크와 겹치는 앞/뒤 구간과 이미 나온 줄(CSV 헤더 등)을 제거"""
+    for previous in packed_texts:
+        if text in previous:
+            return ""
+        cut = _overlap(previous, text)
+        if cut:
+            text = text[cut:]
+        cut = _overlap(text, previous)
+        if cut:
+            text = text[:-cut]
+    lines = []
+    for line in text.split("\n"):
+        key = normalize_text(line)
+        if len(key) >= MIN_DEDUP_LINE and key in seen_lines:
+            continue
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def query_overlap(query, text):
+    """질문 용어(토큰 + 글자 bigram) 중 청크에 나오는 비율"""
+    query_terms = set(lexical_terms(query))
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(lexical_terms(text))) / len(query_terms)
+
+
+class ContextPacker:
+    """
+    검색된 청크를 프롬프트에 넣기 전에 정리하는 단계
+    1. 검색 순위 keep_top 위 밖이면서 질문과 겹치는 용어 비율이 min_relevance 미만인 청크 제외
+    2. 앞 청크와 겹치는 구간, 이미 나온 줄(CSV 헤더 등), 다른 청크에 포함된 청크 제거
+    3. 검색 순위대로 token_budget(tiktoken) 안에 들어가는 만큼 채우고, 마지막 청크는 남은 토큰만큼 잘라서 넣음
+    요청별 (원래 토큰, 넣은 토큰) 을 기록 (stats / recent)
+    """
+
+    def __init__(self, token_budget=1500, min_relevance=0.1, keep_top=2, min_tail_tokens=64, model=TOKEN_MODEL):
+        self.token_budget = token_budget
+        self.min_relevance = min_relevance
+        self.keep_top = keep_top
+        self.min_tail_tokens = min_tail_tokens
+        self.model = model
+        self.requests = 0
+        self.original_tokens = 0
+        self.packed_tokens = 0
+        self.recent = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def pack(self, query, documents):
+        """
+        documents(검색 순위 순) → 정리한 Document 목록 (메타데이터는 그대로, 본문만 교체)
+        query 는 관련도 기준이므로 사용자 정보를 붙인 검색 쿼리가 아니라 사용자의 원래 질문
+        (거주 지역/체류자격 같은 프로필 용어만 겹치는 청크가 남고 질문과 관련된 청크가 빠지지 않도록)
+        """
+        original_tokens = sum(count_tokens(doc.page_content, self.model) for doc in documents)
+        packed, packed_texts, seen_lines = [], [], set()
+        used = dropped = 0
+        for rank, doc in enumerate(documents):
+            if rank >= self.keep_top and query_overlap(query, doc.page_content) < self.min_relevance:
+                dropped += 1
+                continue
+            text = _strip_seen(doc.page_content, packed_texts, seen_lines)
+            if not text:
+                dropped += 1
+                continue
+            tokens = count_tokens(text, self.model)
+            remaining = self.token_budget - used
+            if tokens > remaining:
+                if remaining < self.min_tail_tokens:
+                    dropped += len(documents) - rank
+                    break
+                text = truncate_to_tokens(text, remaining, self.model)
+                tokens = count_tokens(text, self.model)
+            used += tokens
+            packed_texts.append(text)
+            seen_lines.update(normalize_text(line) for line in text.split("\n"))
+            packed.append(Document(id=doc.id, page_content=text, metadata=doc.metadata))
+
+        record = {
+            "original_tokens": original_tokens,
+            "packed_tokens": used,
+            "saved_tokens": original_tokens - used,
+            "documents": len(documents),
+            "packed_documents": len(packed),
+            "dropped_documents": dropped,
+        }
+        with self._lock:
+            self.requests += 1
+            self.original_tokens += original_tokens
+            self.packed_tokens += used
+            self.recent.append(record)
+        print(f"[context] 청크 {len(documents)}→{len(packed)}개, 토큰 {original_tokens}→{used} ({original_tokens - used} 절약)")
+        return packed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "original_tokens": self.original_tokens,
+                "packed_tokens": self.packed_tokens,
+                "saved_tokens": self.original_tokens - self.packed_tokens,
+                "saved_ratio": 1 - self.packed_tokens / self.original_tokens if self.original_tokens else 0.0,
+            }
+
+
+def _question(query, run_manager):
+    """관련도 기준 질문: 호출 config 의 metadata["question"] (사용자 원래 질문), 없으면 검색 쿼리"""
+    return (run_manager.metadata or {}).get("question") or query
+
+
+class PackedRetriever(BaseRetriever):
+    """
+    검색기 결과를 ContextPacker 로 정리해서 반환 (RetrievalQA 'stuff' 체인의 검색기 자리에 사용)
+    검색은 사용자 정보를 붙인 쿼리로, 관련도 필터는 config={"metadata": {"question": 원래 질문}} 의 질문으로
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    retriever: BaseRetriever
+    packer: Optional[ContextPacker] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        if self.packer is None:
+            return documents
+        return self.packer.pack(_question(query, run_manager), documents)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun):
+        documents = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        if self.packer is None:
+            return documents
+        return self.packer.pack(_question(query, run_manager), documents)
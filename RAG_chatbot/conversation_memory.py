@@ -0,0 +1,197 @@
+# RAG_chatbot/conversation_memory.py
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from .context_packer import count_tokens, truncate_to_tokens
+
+# 오래된 대화 요약은 답변을 막지 않도록 별도 스레드에서 실행 (프로세스 공용)
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="conversation-summary")
+
+# 이전 대화를 가리키거나 이어 묻는 표현 (이런 질문은 이전 대화 없이는 뜻이 정해지지 않음)
+FOLLOW_UP_MARKERS = (
+    "그럼", "그러면", "그거", "그것", "그게", "그건", "그걸", "그곳", "거기", "그 ", "이거", "이것", "이건",
+    "저거", "아까", "방금", "위에", "위의", "앞에서", "앞의", "말씀하신", "말한", "더 자세히", "자세히", "다시",
+    "또", "그리고", "그런데", "근데", "그래서", "그렇다면",
+)
+# 이보다 짧은 질문도 대화 맥락에 기대는 경우가 많아 이어지는 질문으로 봄 (공백 제외 글자 수)
+FOLLOW_UP_MIN_CHARS = 8
+
+
+def format_turns(turns):
+    return "\n".join(f"Q: {query}\nA: {answer}" for query, answer in turns)
+
+
+def is_follow_up(query):
+    """이전 대화에 기대는 질문인지 (지시어/접속어로 시작하거나 포함하는 질문, 아주 짧은 질문)"""
+    text = " ".join(query.split())
+    if len(text.replace(" ", "")) < FOLLOW_UP_MIN_CHARS:
+        return True
+    return any(marker in text for marker in FOLLOW_UP_MARKERS)
+
+
+def fallback_summary(summary, turns, max_tokens):
+    """요약 LLM 호출이 실패하면 이전 요약에 질문만 이어 붙임"""
+    questions = "\n".join(f"- {query}" for query, _ in turns)
+    text = f"{summary}\n{questions}".strip() if summary else questions
+    # 예산을 넘으면 오래된 줄부터 버림
+    while count_tokens(text) > max_tokens and "\n" in text:
+        text = text.split("\n", 1)[1]
+    return truncate_to_tokens(text, max_tokens)
+
+
+class ConversationMemory:
+    """
+    한 세션의 대화 기록
+    - 최근 recent_turns 턴은 그대로, 그보다 오래된 턴은 summarizer(이전 요약, 턴 목록, 최대 토큰) 로 요약에 합침
+    - 저장하는 턴 수(max_turns)와 크기(max_bytes, UTF-8)는 요약이 늦어져도 넘지 않음 (넘으면 오래된 턴부터 버림)
+    - render(token_budget): 요약 + 최근 턴을 token_budget 안에서 프롬프트용 텍스트로
+    """
+
+    def __init__(self, summarizer=None, recent_turns=3, max_turns=12, max_bytes=32_000, summary_tokens=300, turn_tokens=250):
+        self.summarizer = summarizer
+        self.recent_turns = recent_turns
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.summary = ""
+        self.turns = deque()
+        self.dropped_turns = 0
+        self.last_used = time.monotonic()
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+    def _size(self):
+        return len(self.summary.encode("utf-8")) + sum(
+            len(query.encode("utf-8")) + len(answer.encode("utf-8")) for query, answer in self.turns
+        )
+
+    def add_turn(self, query, answer):
+        with self._lock:
+            self.last_used = time.monotonic()
+            self.turns.append((query, answer))
+            while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self._size() > self.max_bytes):
+                self.turns.popleft()
+                self.dropped_turns += 1
+            if self._summarizing or len(self.turns) <= self.recent_turns:
+                return
+            self._summarizing = True
+            old_turns = list(self.turns)[:len(self.turns) - self.recent_turns]
+            summary = self.summary
+        _summary_executor.submit(self._fold, summary, old_turns)
+
+    def _summarize(self, summary, turns):
+        try:
+            new_summary = self.summarizer(summary, turns, self.summary_tokens) if self.summarizer else None
+            if new_summary and new_summary.strip():
+                return truncate_to_tokens(new_summary.strip(), self.summary_tokens)
+        except Exception as e:
+            print(f"[conversation] 대화 요약 오류 (질문 목록으로 대체): {e}")
+        return fallback_summary(summary, turns, self.summary_tokens)
+
+    def _fold(self, summary, old_turns):
+        """old_turns 를 요약에 합치고 기록에서 제거 (그 사이 새 턴이 쌓였으면 이어서 다시 요약)"""
+        while True:
+            new_summary = self._summarize(summary, old_turns)
+            with self._lock:
+                self.summary = new_summary
+                # 요약하는 동안 상한 때문에 이미 버려진 턴은 건너뜀
+                while self.turns and any(self.turns[0] is turn for turn in old_turns):
+                    self.turns.popleft()
+                if len(self.turns) <= self.recent_turns:
+                    self._summarizing = False
+                    return
+                old_turns = list(self.turns)[:len(self.turns) - self.recent_turns]
+                summary = self.summary
+
+    def render(self, token_budget=800):
+        """요약 + 최근 턴 (최신 턴부터 token_budget 안에 들어가는 만큼, 각 답변은 turn_tokens 까지)"""
+        with self._lock:
+            self.last_used = time.monotonic()
+            summary, turns = self.summary, list(self.turns)[-self.recent_turns:]
+        parts, used = [], 0
+        if summary:
+            summary = truncate_to_tokens(summary, min(self.summary_tokens, token_budget))
+            parts.append(f"[이전 대화 요약]\n{summary}")
+            used += count_tokens(parts[0])
+        recent = []
+        for query, answer in reversed(turns):
+            text = f"Q: {query}\nA: {truncate_to_tokens(answer, self.turn_tokens)}"
+            tokens = count_tokens(text)
+            if used + tokens > token_budget:
+                break
+            recent.append(text)
+            used += tokens
+        if recent:
+            parts.append("[이전 대화]\n" + "\n".join(reversed(recent)))
+        return "\n\n".join(parts)
+
+    def size(self):
+        """저장한 요약 + 턴 크기 (UTF-8 바이트)"""
+        with self._lock:
+            return self._size()
+
+    def __len__(self):
+        with self._lock:
+            return len(self.turns)
+
+
+class ConversationStore:
+    """
+    세션 ID → ConversationMemory (프로세스 공용, 스레드 안전)
+    idle_ttl(초) 동안 사용하지 않은 세션은 제거하고, max_sessions 를 넘으면 가장 오래 사용하지 않은 세션부터 제거 (LRU)
+    """
+
+    def __init__(self, summarizer=None, max_sessions=1000, idle_ttl=1800, **memory_options):
+        self.summarizer = summarizer
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_options = memory_options
+        self.evicted_sessions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        idle = [session_id for session_id, memory in self._sessions.items() if now - memory.last_used > self.idle_ttl]
+        for session_id in idle:
+            del self._sessions[session_id]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted_sessions += 1
+        self.evicted_sessions += len(idle)
+
+    def get(self, session_id):
+        """세션의 대화 기록 (없으면 생성)"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = self._sessions[session_id] = ConversationMemory(summarizer=self.summarizer, **self.memory_options)
+            self._sessions.move_to_end(session_id)
+            memory.last_used = now
+            return memory
+
+    def clear(self, session_id=None):
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            self._evict(time.monotonic())
+            memories = list(self._sessions.values())
+        return {
+            "sessions": len(memories),
+            "max_sessions": self.max_sessions,
+            "turns": sum(len(memory) for memory in memories),
+            "bytes": sum(memory.size() for memory in memories),
+            "evicted_sessions": self.evicted_sessions,
+        }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
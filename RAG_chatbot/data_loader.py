@@ -3,28 +3,114 @@ import os
 import re
 import json
 import glob
-import requests
-import subprocess
+import time
+import hashlib
+from functools import partial
+from typing import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_core.documents import Document
-from langchain.text_splitter import CharacterTextSplitter
-
-def load_pdfs(data_dir="data/"):
-    """법률정보 PDF 파일들을 로드하여 Document 객체 리스트 반환"""
-    pdf_files = glob.glob(f"{data_dir}/*.pdf")
-    all_docs = []
-
-    for file in pdf_files:
-        loader = PyMuPDFLoader(file)
-        docs = loader.load()
-        all_docs.extend(docs)
-    
-    return all_docs
-
-def load_center_data(center_pdf):
+from .statute_splitter import StatuteTextSplitter, group_pages
+from .public_api import fetch_all_pages, odcloud_page, data_go_kr_page
+from .doc_metadata import pdf_metadata, program_metadata, address_metadata, coordinate_metadata
+
+def file_hash(path):
+    """파일 내용의 sha256 해시 (변경 감지용)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# 파싱 결과 캐시 (파일 해시별 JSONL: 한 줄에 한 페이지 {"page_content", "metadata"})
+PARSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "parsed")
+
+def _parse_pdf(file, digest=None, use_cache=True):
+    """
+    PDF 파일 하나를 파싱해서 (파일, 페이지 목록, 소요 시간, 캐시 사용 여부) 반환
+    프로세스 풀에서 실행되므로 Document 대신 직렬화가 가벼운 dict 로 반환
+    digest: 이미 계산한 file_hash(file) (없으면 여기서 계산)
+    """
+    start = time.perf_counter()
+    cache_path = os.path.join(PARSE_CACHE_DIR, f"{digest or file_hash(file)}.jsonl")
+
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            pages = [json.loads(line) for line in f]
+        for page in pages:
+            # 같은 내용의 파일이 다른 경로에 있을 수 있으므로 경로는 현재 값으로
+            page["metadata"]["source"] = file
+            page["metadata"]["file_path"] = file
+        return file, pages, time.perf_counter() - start, True
+
+    pages = [
+        {"page_content": doc.page_content, "metadata": doc.metadata}
+        for doc in PyMuPDFLoader(file).load()
+    ]
+    if use_cache:
+        os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for page in pages:
+                f.write(json.dumps(page, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, cache_path)
+    return file, pages, time.perf_counter() - start, False
+
+def parse_pdfs(pdf_files, workers=None, use_cache=True, hashes=None):
+    """
+    PDF 파일들을 프로세스 풀로 병렬 파싱하여 (파일, Document 리스트) 를 순서대로 생성
+    workers=None 이면 CPU 코어 수만큼, workers=1 이면 현재 프로세스에서 순차 파싱
+    hashes: {파일: file_hash} — 이미 계산한 해시가 있으면 파일을 다시 읽어 해시하지 않음
+    파일별 파싱 시간을 출력 (캐시 적중 시 PyMuPDF 를 거치지 않음)
+    """
+    pdf_files = list(pdf_files)
+    digests = [(hashes or {}).get(file) for file in pdf_files]
+    workers = workers or os.cpu_count() or 1
+    task = partial(_parse_pdf, use_cache=use_cache)
+
+    if workers == 1 or len(pdf_files) <= 1:
+        results = map(task, pdf_files, digests)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(pdf_files)))
+        results = executor.map(task, pdf_files, digests)
+
+    try:
+        for file, pages, elapsed, cached in results:
+            print(f"  - {os.path.basename(file)}: {len(pages)}페이지, {elapsed:.2f}초{' (캐시)' if cached else ''}")
+            yield file, _to_documents(file, pages)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+def warm_parse_cache(pdf_files, workers=None, hashes=None):
+    """PDF 들을 병렬 파싱해서 파싱 캐시만 채움 (결과는 바로 버려서 메모리에 쌓지 않음)"""
+    for _ in parse_pdfs(pdf_files, workers=workers, hashes=hashes):
+        pass
+
+def _to_documents(file, pages):
+    """파싱한 페이지 dict → Document (파일명에서 추출한 법령명/시행일/주제 메타데이터 추가)"""
+    source_metadata = pdf_metadata(file)
+    return [
+        Document(page_content=page["page_content"], metadata={**page["metadata"], **source_metadata})
+        for page in pages
+    ]
+
+def load_pdf(file, use_cache=True, digest=None):
+    """PDF 파일 하나를 페이지별 Document 리스트로 로드 (파싱 캐시 사용, digest 는 이미 계산한 file_hash)"""
+    _, pages, _, _ = _parse_pdf(file, digest, use_cache=use_cache)
+    return _to_documents(file, pages)
+
+def load_pdfs(data_dir="data/", workers=None):
+    """법률정보 PDF 파일들을 병렬로 파싱하면서 Document 를 하나씩 생성"""
+    pdf_files = sorted(glob.glob(f"{data_dir}/*.pdf"))
+
+    for _, docs in parse_pdfs(pdf_files, workers=workers):
+        yield from docs
+
+def load_center_data(center_pdf, digest=None):
     """다문화가족지원센터 데이터 로딩 및 메타데이터 추가"""
-    loader = PyMuPDFLoader(center_pdf)
-    center_docs = loader.load()
+    center_docs = load_pdf(center_pdf, digest=digest)
     
     for doc in center_docs:
         doc.metadata["type"] = "center"
@@ -32,15 +118,93 @@ def load_center_data(center_pdf):
     
     return center_docs
 
-import glob
-
-def load_hanultari_json(json_path: str) -> list[Document]:
-    """JSON 파일을 Document 리스트로 변환"""
+# 센터 현황 PDF 표 파싱 (표 셀이 한 줄씩 추출됨: [연번] [시도 (개수)] 시군구, 주소 줄들, 연락처 줄들)
+CENTER_TABLE_TITLE = re.compile(r"전국\s*(.+?)\s*현황")
+CENTER_TABLE_HEADERS = {"연번", "시도", "시군구", "가족센터 주소", "다문화가족지원센터 주소", "연 락 처", "연락처", "전화번호"}
+CENTER_SIDO = {"서울", "부산", "대구", "인천", "광주", "대전", "울산", "세종",
+               "경기", "강원", "충북", "충남", "전북", "전남", "경북", "경남", "제주"}
+PHONE_LINE = re.compile(r"^(\d{2,4}-\d{3,4}|[~(]|\d+[~,])")
+
+def load_center_facilities(center_pdf, digest=None):
+    """
+    다문화가족지원센터 현황 PDF 의 표를 시설 행 [{name, sido, sigungu, address, phone, extra}] 으로 변환
+    (facility_type 별: 가족센터 → family_center, 다문화가족지원센터 → multicultural_center)
+    """
+    lines = [
+        line.strip()
+        for doc in load_pdf(center_pdf, digest=digest)
+        for line in doc.page_content.split("\n")
+        if line.strip()
+    ]
+    facilities = {"family_center": [], "multicultural_center": []}
+    facility_type, label, sido = None, None, None
+    row, phase = None, None
+
+    def finish():
+        if row and facility_type and row["address"] and "".join(row["sigungu"]).strip("-"):
+            sigungu = "".join(row["sigungu"])
+            # '서울중구' 처럼 시도가 붙은 시군구 정리 ('제주시', '서울특별시' 는 그대로)
+            if sido and sigungu.startswith(sido) and re.fullmatch(r"[가-힣]{1,4}[구군]", sigungu[len(sido):]):
+                sigungu = sigungu[len(sido):]
+            facilities[facility_type].append({
+                "name": f"{sigungu}{label}",
+                "sido": sido,
+                "sigungu": sigungu,
+                "address": " / ".join(row["address"]),
+                "phone": " ".join(row["phone"]),
+                "extra": {"source": os.path.basename(center_pdf)},
+            })
+
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        title = CENTER_TABLE_TITLE.search(line)
+        if title:
+            finish()
+            label = title.group(1).replace(" ", "")
+            facility_type = "multicultural_center" if label == "다문화가족지원센터" else "family_center"
+            row, phase = None, None
+            continue
+        if line in CENTER_TABLE_HEADERS or (line.startswith("(") and "현재" in line):
+            continue
+        if line.isdigit():
+            # 연번 (표 번호도 숫자 줄이지만 바로 다음 제목 줄에서 버려짐)
+            finish()
+            row, phase = {"sigungu": [], "address": [], "phone": []}, "sigungu"
+            continue
+        if line in CENTER_SIDO and index < len(lines) and re.fullmatch(r"\(\d+\)", lines[index]):
+            index += 1
+            if row is None or phase == "phone":
+                finish()
+                row, phase = {"sigungu": [], "address": [], "phone": []}, "sigungu"
+            sido = line
+            continue
+        if row is None or (phase == "phone" and not PHONE_LINE.match(line)):
+            # 연번이 없는 표: 연락처 다음의 일반 줄이 새 행의 시군구
+            finish()
+            row, phase = {"sigungu": [], "address": [], "phone": []}, "sigungu"
+        if phase == "sigungu":
+            if line == "-" or (len(line) <= 6 and " " not in line and ":" not in line):
+                row["sigungu"].append(line)
+                continue
+            phase = "address"
+        if phase == "address":
+            if line == "-" or re.match(r"^\d{2,4}-\d{3,4}", line):
+                phase = "phone"
+            else:
+                row["address"].append(line)
+                continue
+        row["phone"].append(line)
+    finish()
+    return facilities
+
+def load_hanultari_json(json_path: str) -> Iterator[Document]:
+    """JSON 파일의 프로그램을 Document 로 하나씩 생성"""
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
     programs = data.get("programs") or data.get("multicultural_family_support_programs") or []
-    documents = []
 
     for item in programs:
         content = "\n".join([
@@ -49,80 +213,76 @@ def load_hanultari_json(json_path: str) -> list[Document]:
             f"Location: {item.get('location')}",
             f"Date: {item.get('dates') or item.get('date') or item.get('end_date') or '날짜 정보 없음'}"
         ])
-        documents.append(Document(page_content=content, metadata={
+        yield Document(page_content=content, metadata={
             "source": os.path.basename(json_path),
             "type": "program",
-            "category": "multicultural_policy"
-        }))
+            "category": "multicultural_policy",
+            "topic": "family",
+            **program_metadata(item),
+        })
 
-    return documents
-
-def load_all_hanultari_jsons(folder_path: str) -> list[Document]:
-    """폴더 내 모든 한울타리 JSON 파일을 Document 리스트로 로딩"""
-    """폴더 내 모든 JSON 파일을 Document 리스트로 로딩하므로 다누리(danuri_2025-04-26-program.json) 도 로딩"""
-    json_files = glob.glob(f"{folder_path}/*.json")
-    all_docs = []
+def load_all_hanultari_jsons(folder_path: str) -> Iterator[Document]:
+    """폴더 내 모든 한울타리 JSON 파일을 Document 로 하나씩 생성"""
+    """폴더 내 모든 JSON 파일을 로딩하므로 다누리(danuri_2025-04-26-program.json) 도 로딩"""
+    json_files = sorted(glob.glob(f"{folder_path}/*.json"))
 
     for path in json_files:
-        docs = load_hanultari_json(path)
-        all_docs.extend(docs)
-
-    return all_docs
+        yield from load_hanultari_json(path)
 
 # 여성가족부_결혼이민자 대상 한국어교육기관 정보, 한국건강가정진흥원_전국 다문화가족지원센터 통번역 지원사 배치현황
-def load_data_by_api(url: str, page: int = 1, per_page: int = 1000) -> dict:
+def load_data_by_api(url: str, page: int = 1, per_page: int = 1000) -> list[dict]:
+    """api.odcloud.kr 데이터셋의 page 부터 마지막 페이지까지 모든 항목 (totalCount 기준, 페이지는 동시 요청)"""
     service_key = os.getenv("DATA_API_KEY")
-    
-    params = {
-        "page": page,
-        "perPage": per_page,
-        "serviceKey": service_key
-    }
-
-    headers = {
-        "accept": "*/*"
-    }
-    
-    response = requests.get(url, params=params, headers=headers)
-    response.raise_for_status()  # 실패하면 예외 발생
-
-    return response.json()
 
-# 여성가족부 해바라기센터 정보 API 의 경우 curl 사용
-def load_sunflower_center_data_by_api(url: str, page: int = 1, per_page: int = 100) -> dict:
+    return fetch_all_pages(
+        url,
+        {"serviceKey": service_key},
+        odcloud_page,
+        page_param="page",
+        size_param="perPage",
+        per_page=per_page,
+        start_page=page,
+    )
 
+# 여성가족부 해바라기센터 정보 API (apis.data.go.kr 형식)
+def load_sunflower_center_data_by_api(url: str, page: int = 1, per_page: int = 100) -> list[dict]:
+    """apis.data.go.kr 데이터셋의 page 부터 마지막 페이지까지 모든 항목"""
     service_key = os.getenv("DATA_API_KEY")
 
-    api_request_url = f"{url}?serviceKey={service_key}&pageNo={page}&numOfRows={per_page}&type=json"
-    cmd = ["curl", "-s", "-X", "GET", api_request_url, "-H", "accept: */*"]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    data = json.loads(result.stdout)
-
-    return data
+    return fetch_all_pages(
+        url,
+        {"serviceKey": service_key, "type": "json"},
+        data_go_kr_page,
+        page_param="pageNo",
+        size_param="numOfRows",
+        per_page=per_page,
+        start_page=page,
+    )
 
-def load_korean_education_data(page: int = 1, per_page: int = 1000) -> list[Document]:
+def load_korean_education_data(page: int = 1, per_page: int = 1000) -> list[dict]:
     """여성가족부 결혼이민자 대상 한국어 교육기관 정보 API를 호출하고, VectorDB에 저장한다."""
     # 기관 정보는 data 키 - [{기관정보..}] 형태로 리턴됨.
     korean_education_url = "https://api.odcloud.kr/api/3077037/v1/uddi:de366691-6657-4b87-b324-f1bbbf01c0cb"
-    result = load_data_by_api(url=korean_education_url, page=page, per_page=per_page)
-    data_list = result.get('data', [])
+    data_list = load_data_by_api(url=korean_education_url, page=page, per_page=per_page)
 
     return data_list
 
-def load_translator_data(page: int = 1, per_page: int = 1000) -> list[Document]:
+def load_translator_data(page: int = 1, per_page: int = 1000) -> list[dict]:
     """한국건강가정진흥원_전국 다문화가족지원센터 통번역 지원사 배치현황 정보 API를 호출하고, VectorDB에 저장한다."""
     translator_url = "https://api.odcloud.kr/api/3081602/v1/uddi:3edbb122-3a1c-420d-992a-855bd0a961aa"
-    result = load_data_by_api(url=translator_url, page=page, per_page=per_page)
-    data_list = result.get('data', [])
+    data_list = load_data_by_api(url=translator_url, page=page, per_page=per_page)
     
     return data_list
 
-def load_sunflower_center_data(page: int = 1, per_page: int = 100) -> list[Document]:
-    """여성가족부 해바라기센터 정보 API를 호출하고, VectorDB에 저장한다."""
+def load_sunflower_center_items(page: int = 1, per_page: int = 100) -> list[dict]:
+    """여성가족부 해바라기센터 정보 API 원본 항목"""
     sunflower_centor_url = "https://apis.data.go.kr/1383000/gmis/sfCnterServiceV2/getSfCnterListV2"
-    result = load_sunflower_center_data_by_api(url=sunflower_centor_url, page=page, per_page=per_page)
-    data_list = result.get("response", {}).get("body", {}).get("items", {}).get("item", [])
+    return load_sunflower_center_data_by_api(url=sunflower_centor_url, page=page, per_page=per_page)
+
+def load_sunflower_center_data(page: int = 1, per_page: int = 100, data_list: list[dict] = None) -> list[Document]:
+    """여성가족부 해바라기센터 정보 API를 호출하고, VectorDB에 저장한다. (data_list 를 주면 API 호출 생략)"""
+    if data_list is None:
+        data_list = load_sunflower_center_items(page=page, per_page=per_page)
     documents = []
 
     for item in data_list:
@@ -144,7 +304,10 @@ def load_sunflower_center_data(page: int = 1, per_page: int = 100) -> list[Docum
         documents.append(Document(page_content=content, metadata={
             "source": "여성가족부 해바라기센터 정보 (공공데이터포털 제공)",
             "type": "API to Vector DB",
-            "category": "sunflower_center_info"
+            "category": "sunflower_center_info",
+            "topic": "family",
+            **address_metadata(item.get('roadNmAddr') or item.get('lotnoAddr')),
+            **coordinate_metadata(item),
         }))
 
     return documents
@@ -159,21 +322,21 @@ def format_korean_phone(contact_number):
         # 나머지는 지역번호가 3자리
         return re.sub(r"^(\d{3})(\d{3,4})(\d{4})$", r"\1-\2-\3", contact_number)
 
-def create_text_splitter(chunk_size=1000, chunk_overlap=100):
-    """텍스트 분할기 생성"""
-    return CharacterTextSplitter(
-        separator='',
+def create_text_splitter(chunk_size=1000, chunk_overlap=0):
+    """텍스트 분할기 생성 (법령은 장/절/조/항 경계, 그 외 문서는 문단/줄 경계로 분할)"""
+    return StatuteTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
     )
 
 def split_documents(docs, text_splitter=None):
-    """문서를 청크로 분할"""
+    """문서를 소스(PDF는 파일 단위로 페이지를 묶어서) 하나씩 받아 청크를 생성 (전체 리스트를 만들지 않음)"""
     if text_splitter is None:
         text_splitter = create_text_splitter()
     
-    return text_splitter.split_documents(docs)
+    for pages in group_pages(docs):
+        yield from text_splitter.split_documents(pages)
 
 def split_csv(items, data, max_rows=10):
     if not items:
@@ -0,0 +1,108 @@
+# RAG_chatbot/doc_metadata.py
+import os
+import re
+from .regions import split_region, parse_region_query, parse_coordinates
+
+# 법령 PDF 파일명: 법령명(법령종류)(제N호)(시행일자).pdf
+# 예) 출입국관리법(법률)(제19435호)(20231214).pdf, 국제결혼 ... 고시(법무부고시)(제2023-695호)(20240101).pdf
+LAW_FILENAME = re.compile(
+    r"^(?P<statute>.+?)\((?P<law_type>[^()]+)\)\((?P<law_number>제[^()]+호)\)\((?P<effective_date>\d{8})\)$"
+)
+# 생활 안내 PDF 파일명: 한국생활안내_분야_제목.pdf (분야가 없는 파일도 있음)
+GUIDE_PREFIX = "한국생활안내_"
+
+# 주제(topic) 분류 키워드 — 위에서부터 먼저 걸리는 주제로 분류 (체류/국적 관련을 가장 먼저)
+TOPIC_KEYWORDS = [
+    ("immigration", ("출입국", "국적", "재한외국인", "국제결혼", "체류", "영주", "입국", "이민자사회통합")),
+    ("family", ("가족", "가정", "혼인", "이혼", "해바라기")),
+    ("childcare", ("영유아", "보육", "임신", "육아", "아동", "청소년", "어린이집")),
+    ("health", ("건강", "의료", "보건", "응급")),
+    ("employment", ("고용", "취업", "근로", "직업", "산업재해")),
+    ("welfare", ("복지", "기초생활", "생활기초", "사회보장", "국민연금", "자활", "장애인")),
+]
+DEFAULT_TOPIC = "general"
+
+# 질문 → 검색 범위(주제) 라우팅 키워드. 확실한 경우에만 좁히고 나머지는 전체 검색
+QUERY_TOPIC_KEYWORDS = {
+    "immigration": ("체류", "비자", "visa", "출입국", "국적", "귀화", "영주권", "영주자격", "외국인등록", "사증"),
+}
+
+DATE_RANGE = re.compile(r"(\d{4}-\d{2}-\d{2})\s*~\s*(\d{4}-\d{2}-\d{2})")
+
+
+def topic_of(name):
+    """법령명/문서 제목으로 주제 분류 (해당 없으면 general)"""
+    compact = name.replace(" ", "")
+    for topic, keywords in TOPIC_KEYWORDS:
+        if any(keyword in compact for keyword in keywords):
+            return topic
+    return DEFAULT_TOPIC
+
+
+def pdf_metadata(path):
+    """
+    PDF 파일명에서 메타데이터 추출
+    - 법령: type=law, statute, law_type, law_number, effective_date(YYYY-MM-DD), topic
+    - 생활 안내: type=guide, guide_section, guide_title, topic
+    - 그 외: topic 만
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = LAW_FILENAME.match(name)
+    if match:
+        date = match.group("effective_date")
+        return {
+            "type": "law",
+            "category": "law",
+            "statute": match.group("statute"),
+            "law_type": match.group("law_type"),
+            "law_number": match.group("law_number"),
+            "effective_date": f"{date[:4]}-{date[4:6]}-{date[6:]}",
+            "topic": topic_of(match.group("statute")),
+        }
+    if name.startswith(GUIDE_PREFIX):
+        parts = name[len(GUIDE_PREFIX):].split("_")
+        return {
+            "type": "guide",
+            "category": "life_guide",
+            "guide_section": parts[0] if len(parts) > 1 else None,
+            "guide_title": parts[-1],
+            "topic": topic_of(name),
+        }
+    return {"topic": topic_of(name)}
+
+
+def program_metadata(item):
+    """한울타리/다누리 프로그램 항목의 지역(sido, sigungu)과 신청 기간(start_date, end_date)"""
+    metadata = {}
+    sido, sigungu = parse_region_query(item.get("location"))
+    if sido:
+        metadata["sido"] = sido
+    if sigungu:
+        metadata["sigungu"] = sigungu
+    match = DATE_RANGE.search(item.get("dates") or item.get("date") or "")
+    if match:
+        metadata["start_date"], metadata["end_date"] = match.groups()
+    elif item.get("end_date"):
+        metadata["end_date"] = item["end_date"]
+    return metadata
+
+
+def address_metadata(address):
+    """주소의 시도/시군구 메타데이터"""
+    sido, sigungu = split_region(address)
+    return {key: value for key, value in (("sido", sido), ("sigungu", sigungu)) if value}
+
+
+def coordinate_metadata(item):
+    """API 항목의 위도/경도 메타데이터 (없으면 빈 dict)"""
+    lat, lon = parse_coordinates(item)
+    return {"lat": lat, "lon": lon} if lat is not None else {}
+
+
+def route_query_topic(query):
+    """질문이 특정 주제(예: 체류/비자 → immigration)에 해당하면 그 주제, 아니면 None"""
+    compact = query.replace(" ", "").lower()
+    for topic, keywords in QUERY_TOPIC_KEYWORDS.items():
+        if any(keyword in compact for keyword in keywords):
+            return topic
+    return None
@@ -0,0 +1,225 @@
+# RAG_chatbot/embedding_cache.py
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# SQLite 한 번에 바인딩할 수 있는 변수 수 제한을 피하기 위한 조회 단위
+_LOOKUP_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 정규화: 유니코드 NFC + 공백 정리"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def normalized_text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (모델명, 정규화 텍스트 해시) → 임베딩 벡터를 저장하는 SQLite 캐시
+    max_entries 를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+    """
+
+    def __init__(self, path=None, max_entries=200_000):
+        self.path = path or os.path.join(CACHE_DIR, "embeddings.sqlite")
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model, hashes):
+        """캐시에 있는 항목만 {해시: 벡터} 로 반환하고 사용 시각 갱신"""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), _LOOKUP_BATCH):
+                batch = hashes[i:i + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model, items):
+        """items: {해시: 벡터}"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [
+                    (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for text_hash, vector in items.items()
+                ],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """최대 개수를 넘으면 90% 수준까지 오래된 항목 삭제"""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (count - int(self.max_entries * 0.9),),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 모델 앞단 캐시 (문서/쿼리 임베딩 모두 적용)
+    변경되지 않은 청크나 분할 설정만 바꾼 실험에서 동일한 청크는 다시 계산하지 않음
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: EmbeddingCache = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [normalized_text_hash(text) for text in texts]
+        found = self.cache.get_many(self.model_name, list(set(hashes)))
+
+        # 캐시에 없는 텍스트만 (중복 제거 후) 모델로 계산
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in found and text_hash not in missing:
+                missing[text_hash] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model_name, computed)
+            found.update(computed)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [found[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        text_hash = normalized_text_hash(text)
+        found = self.cache.get_many(self.model_name, [text_hash])
+        if text_hash in found:
+            self.hits += 1
+            return found[text_hash]
+
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many(self.model_name, {text_hash: vector})
+        return vector
+
+
+class QueryEmbeddingLRU:
+    """
+    쿼리 임베딩 메모리 LRU (정규화 텍스트 → 벡터), 스레드 안전
+    maxsize 를 넘으면 가장 오래 사용하지 않은 항목부터 제거, 적중/미적중 횟수 기록
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            vector = self._items.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key, vector):
+        with self._lock:
+            self._items[key] = tuple(vector)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+@lru_cache(maxsize=None)
+def shared_query_lru(model_name, maxsize=1024):
+    """모델별로 프로세스에서 하나만 만드는 쿼리 LRU (Streamlit 세션/재접속한 벡터 스토어가 함께 사용)"""
+    return QueryEmbeddingLRU(maxsize=maxsize)
+
+
+class LRUQueryEmbeddings(Embeddings):
+    """
+    쿼리 임베딩만 메모리 LRU 로 감싸는 래퍼 (반복 질문은 모델 계산과 SQLite 조회 모두 생략)
+    문서 임베딩은 그대로 내부 embeddings 로 전달
+    """
+
+    def __init__(self, embeddings: Embeddings, lru: QueryEmbeddingLRU):
+        self.embeddings = embeddings
+        self.lru = lru
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        key = normalize_text(text)
+        vector = self.lru.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.lru.put(key, vector)
+        return list(vector)
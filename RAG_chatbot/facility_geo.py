@@ -0,0 +1,263 @@
+# RAG_chatbot/facility_geo.py
+import os
+import re
+import json
+import time
+import threading
+from collections import defaultdict
+import numpy as np
+import requests
+import sqlalchemy
+from .vector_store import get_engine
+from .regions import SIDO_CENTROIDS, parse_region_query
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy 가 없으면 NumPy 로 전체 거리 계산
+    cKDTree = None
+
+EARTH_RADIUS_KM = 6371.0
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# 좌표가 없는 시설 주소 → 좌표 변환 (KAKAO_REST_API_KEY 가 있을 때만, 결과는 주소별로 캐시)
+GEOCODE_URL = "https://dapi.kakao.com/v2/local/search/address.json"
+GEOCODE_CACHE_PATH = os.path.join(CACHE_DIR, "geocode.json")
+# 시설 테이블을 다시 읽는 주기(초) — 같은 프로세스에서 replace_facilities 하면 바로 다시 읽음
+GEO_INDEX_TTL = 600
+
+# 위치 정확도: 시설 좌표 / 같은 시군구 시설 좌표 평균 / 시도 대표 좌표
+PRECISION_EXACT = "exact"
+PRECISION_SIGUNGU = "sigungu"
+PRECISION_SIDO = "sido"
+
+
+def _unit_vectors(coordinates):
+    """(위도, 경도) 배열 → 단위 구 위의 3차원 좌표 (직선 거리 순서 = 대원 거리 순서)"""
+    radians = np.radians(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2))
+    lat, lon = radians[:, 0], radians[:, 1]
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def _geocode_query(address):
+    """'서울시 구로구 우마2길 35, 2층 / ...' → '서울시 구로구 우마2길 35' (첫 주소의 층/건물명 제외)"""
+    return re.split(r"[,(]", address.split(" / ")[0])[0].strip()
+
+
+def geocode_rows(rows, timeout=5):
+    """
+    lat/lon 이 없는 시설 행의 주소를 좌표로 변환해서 채움 (API 키가 없거나 실패하면 그대로)
+    같은 주소는 캐시 파일에서 읽어 다시 호출하지 않음
+    """
+    api_key = os.getenv("KAKAO_REST_API_KEY")
+    missing = [row for row in rows if row.get("lat") is None and row.get("address")]
+    if not api_key or not missing:
+        return rows
+    cache = {}
+    if os.path.exists(GEOCODE_CACHE_PATH):
+        with open(GEOCODE_CACHE_PATH, encoding="utf-8") as f:
+            cache = json.load(f)
+
+    found = 0
+    for row in missing:
+        query = _geocode_query(row["address"])
+        if query not in cache:
+            try:
+                response = requests.get(
+                    GEOCODE_URL, params={"query": query}, headers={"Authorization": f"KakaoAK {api_key}"}, timeout=timeout
+                )
+                response.raise_for_status()
+                documents = response.json().get("documents") or []
+                cache[query] = [float(documents[0]["y"]), float(documents[0]["x"])] if documents else None
+            except (requests.RequestException, KeyError, ValueError) as e:
+                print(f"[geocode] 좌표 변환 실패 ({query}): {e}")
+                continue
+        if cache[query]:
+            row["lat"], row["lon"] = cache[query]
+            found += 1
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(GEOCODE_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    print(f"[geocode] 좌표 없는 시설 {len(missing)}곳 중 {found}곳 좌표 변환")
+    return rows
+
+
+class FacilityGeoIndex:
+    """
+    시설 위치 인덱스 (시설 종류별 KD-tree, scipy 가 없으면 NumPy 전체 계산)
+    좌표가 없는 시설(다문화가족지원센터 등 주소만 있는 데이터)은 같은 시군구 시설 좌표 평균, 없으면 시도 대표 좌표로 추정
+    """
+
+    def __init__(self, rows):
+        exact = defaultdict(list)
+        for row in rows:
+            if row.get("lat") is not None and row.get("lon") is not None:
+                exact[(row.get("sido"), row.get("sigungu"))].append((row["lat"], row["lon"]))
+        self._sigungu_centroids = {
+            region: tuple(np.mean(points, axis=0)) for region, points in exact.items() if region[1]
+        }
+
+        self.rows, coordinates, self.precision = [], [], []
+        for row in rows:
+            if row.get("lat") is not None and row.get("lon") is not None:
+                location = ((row["lat"], row["lon"]), PRECISION_EXACT)
+            else:
+                location = self._region_location(row.get("sido"), row.get("sigungu"))
+            if location is None:
+                continue
+            self.rows.append(row)
+            coordinates.append(location[0])
+            self.precision.append(location[1])
+        self._points = _unit_vectors(coordinates) if coordinates else np.empty((0, 3))
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _region_location(self, sido, sigungu):
+        if sigungu and (sido, sigungu) in self._sigungu_centroids:
+            return self._sigungu_centroids[(sido, sigungu)], PRECISION_SIGUNGU
+        if sido in SIDO_CENTROIDS:
+            return SIDO_CENTROIDS[sido], PRECISION_SIDO
+        return None
+
+    def _resolve_region(self, region):
+        """'서울 구로구' / '구로구' / '경기' → (시도, 시군구), 알 수 없으면 (None, None)"""
+        sido, sigungu = parse_region_query(region)
+        if sido is None and sigungu:
+            # 시도 없이 시군구만 있으면 그 이름의 시군구가 한 곳일 때만 사용 ('중구' 는 여러 시도에 있음)
+            sidos = {row.get("sido") for row in self.rows if row.get("sigungu") == sigungu}
+            if len(sidos) != 1:
+                return None, None
+            sido = sidos.pop()
+        return sido, sigungu
+
+    def locate(self, region):
+        """'서울 구로구' / '구로구' / '경기' → ((위도, 경도), 정확도), 알 수 없으면 None"""
+        sido, sigungu = self._resolve_region(region)
+        if sido is None:
+            return None
+        return self._region_location(sido, sigungu)
+
+    def _subset(self, facility_type):
+        """종류별 (행 번호 배열, KD-tree 또는 None, 시군구별/시도별 위치 목록) — 처음 쓰일 때 생성"""
+        key = facility_type if isinstance(facility_type, str) or facility_type is None else tuple(sorted(facility_type))
+        with self._lock:
+            if key not in self._trees:
+                types = None if key is None else ({key} if isinstance(key, str) else set(key))
+                rows = np.array(
+                    [i for i, row in enumerate(self.rows) if types is None or row["facility_type"] in types], dtype=np.int64
+                )
+                tree = cKDTree(self._points[rows]) if cKDTree is not None and len(rows) else None
+                by_sigungu, by_sido = defaultdict(list), defaultdict(list)
+                for position, index in enumerate(rows):
+                    row = self.rows[index]
+                    by_sigungu[(row.get("sido"), row.get("sigungu"))].append(position)
+                    by_sido[row.get("sido")].append(position)
+                self._trees[key] = (rows, tree, by_sigungu, by_sido)
+            return self._trees[key]
+
+    def nearest(self, region, facility_type=None, n=5):
+        """
+        region 에서 가까운 시설 n개
+        주소만 있는 시설은 시군구/시도 대표 좌표라 추정 좌표끼리의 거리 순서는 의미가 없으므로
+        같은 시군구 → 같은 시도 시설을 먼저 두고, 각 범위 안에서는 좌표가 있는 시설을 거리 순, 없는 시설은 이름 순
+        그래도 n개가 안 되면 다른 지역 시설을 거리 순으로 채움
+        각 행에 distance_km(같은 지역의 추정 좌표 시설은 None), approximate(거리가 추정값인지) 추가, 지역을 알 수 없으면 None
+        """
+        sido, sigungu = self._resolve_region(region)
+        if sido is None:
+            return None
+        location = self._region_location(sido, sigungu)
+        rows, tree, by_sigungu, by_sido = self._subset(facility_type)
+        if not len(rows) or n <= 0:
+            return []
+        query = _unit_vectors([location[0]])[0] if location is not None else None
+        user_exact = location is not None and location[1] == PRECISION_EXACT
+
+        chosen, results = set(), []
+
+        def add(positions):
+            positions = [position for position in positions if position not in chosen]
+            exact = [position for position in positions if self.precision[rows[position]] == PRECISION_EXACT]
+            if query is not None and exact:
+                chords = np.linalg.norm(self._points[rows[exact]] - query, axis=1)
+                exact = [exact[i] for i in np.argsort(chords, kind="stable")]
+            approximate = sorted(
+                (position for position in positions if self.precision[rows[position]] != PRECISION_EXACT),
+                key=lambda position: self.rows[rows[position]]["name"],
+            )
+            for position in exact + approximate:
+                if len(results) >= n:
+                    return
+                chosen.add(position)
+                results.append(self._result(rows[position], query, user_exact, sido, sigungu))
+
+        if sigungu:
+            add(by_sigungu.get((sido, sigungu), []))
+        add(by_sido.get(sido, []))
+        if len(results) < n and query is not None:
+            # 다른 지역: 가까운 순 (이미 고른 시설 수만큼 더 찾아서 제외)
+            k = min(n + len(chosen), len(rows))
+            if tree is not None:
+                _, positions = tree.query(query, k=k)
+                positions = np.atleast_1d(positions)
+            else:
+                positions = np.argsort(np.linalg.norm(self._points[rows] - query, axis=1), kind="stable")[:k]
+            for position in positions:
+                if len(results) >= n:
+                    break
+                if int(position) not in chosen:
+                    chosen.add(int(position))
+                    results.append(self._result(rows[position], query, user_exact, sido, sigungu))
+        return results
+
+    def _result(self, index, query, user_exact, sido, sigungu):
+        row = self.rows[index]
+        precision = self.precision[index]
+        same_region = row.get("sido") == sido and (precision == PRECISION_SIDO or row.get("sigungu") == sigungu)
+        distance = None
+        if query is not None and (precision == PRECISION_EXACT or not same_region):
+            distance = float(_chord_to_km(np.linalg.norm(self._points[index] - query)))
+        return {
+            **row,
+            "distance_km": distance,
+            "approximate": distance is not None and (not user_exact or precision != PRECISION_EXACT),
+        }
+
+
+_geo_index = None
+_geo_index_loaded_at = 0.0
+_geo_index_lock = threading.Lock()
+
+
+def load_geo_index(force=False):
+    """시설 테이블로 만든 위치 인덱스 (프로세스 공용, GEO_INDEX_TTL 마다 다시 읽음)"""
+    global _geo_index, _geo_index_loaded_at
+    with _geo_index_lock:
+        if force or _geo_index is None or time.monotonic() - _geo_index_loaded_at > GEO_INDEX_TTL:
+            with get_engine().connect() as conn:
+                rows = [
+                    dict(row._mapping)
+                    for row in conn.execute(sqlalchemy.text(
+                        "SELECT facility_type, name, sido, sigungu, address, phone, lat, lon FROM facility"
+                    ))
+                ]
+            _geo_index = FacilityGeoIndex(rows)
+            _geo_index_loaded_at = time.monotonic()
+        return _geo_index
+
+
+def invalidate_geo_index():
+    global _geo_index
+    with _geo_index_lock:
+        _geo_index = None
+
+
+def nearest_facilities(region, facility_type=None, n=5):
+    """사용자 거주 지역(residence_area) 에서 가까운 시설 n개 (FacilityGeoIndex.nearest 참고)"""
+    return load_geo_index().nearest(region, facility_type=facility_type, n=n)
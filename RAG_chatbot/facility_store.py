@@ -0,0 +1,256 @@
+# RAG_chatbot/facility_store.py
+import re
+import json
+import sqlalchemy
+from .vector_store import get_engine
+from .regions import normalize_sido, split_region, parse_region_query, parse_coordinates
+from .facility_geo import nearest_facilities, invalidate_geo_index, geocode_rows
+
+# 시설 종류 → 표시 이름
+FACILITY_TYPES = {
+    "family_center": "가족센터",
+    "multicultural_center": "다문화가족지원센터",
+    "korean_education": "결혼이민자 대상 한국어교육 운영기관",
+    "translator": "다문화가족지원센터 통번역 지원사",
+    "sunflower_center": "해바라기센터",
+}
+
+# 시설 조회 질문 판별용 키워드
+FACILITY_KEYWORDS = {
+    "해바라기": "sunflower_center",
+    "한국어교육": "korean_education",
+    "한국어 교육": "korean_education",
+    "통번역": "translator",
+    "통역": "translator",
+    "다문화가족지원센터": "multicultural_center",
+    "가족센터": "family_center",
+}
+# 거리 순 조회에서 종류 없이 '센터' 만 물으면 가족센터/다문화가족지원센터
+CENTER_TYPES = ("family_center", "multicultural_center")
+LOOKUP_KEYWORDS = ("전화번호", "연락처", "번호", "주소", "위치", "어디")
+# 거리 순 조회 질문 ('가까운 센터', '근처 해바라기센터')
+NEAREST_KEYWORDS = ("가까운", "가까이", "가장가까", "근처", "주변", "인근")
+# '가까운 센터에서 받을 수 있는 지원' 같은 질문은 제외하고 시설을 찾는 질문만 거리 순 조회
+NEAREST_REQUEST_KEYWORDS = ("알려", "찾아", "찾고", "어디", "있나", "있어", "있을까", "추천", "목록")
+REGION_PATTERN = re.compile(r"[가-힣]{1,6}(?:시|군|구)(?![가-힣])")
+
+
+def ensure_facility_table():
+    """시설 테이블과 지역/종류/이름 인덱스 생성 (이미 있으면 그대로 둠)"""
+    with get_engine().begin() as conn:
+        conn.execute(sqlalchemy.text("""
+            CREATE TABLE IF NOT EXISTS facility (
+                id BIGSERIAL PRIMARY KEY,
+                facility_type TEXT NOT NULL,
+                name TEXT NOT NULL,
+                sido TEXT,
+                sigungu TEXT,
+                address TEXT,
+                phone TEXT,
+                extra JSONB NOT NULL DEFAULT '{}'::jsonb,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+        # 좌표 (API 가 위도/경도를 주는 시설만, 이전 버전 테이블에는 컬럼 추가)
+        conn.execute(sqlalchemy.text("ALTER TABLE facility ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION"))
+        conn.execute(sqlalchemy.text("ALTER TABLE facility ADD COLUMN IF NOT EXISTS lon DOUBLE PRECISION"))
+        conn.execute(sqlalchemy.text(
+            "CREATE INDEX IF NOT EXISTS ix_facility_region ON facility (sido, sigungu, facility_type)"
+        ))
+        conn.execute(sqlalchemy.text(
+            "CREATE INDEX IF NOT EXISTS ix_facility_sigungu ON facility (sigungu, facility_type)"
+        ))
+        conn.execute(sqlalchemy.text(
+            "CREATE INDEX IF NOT EXISTS ix_facility_type ON facility (facility_type)"
+        ))
+        # 이름 앞부분 검색 (LIKE '구로%')
+        conn.execute(sqlalchemy.text(
+            "CREATE INDEX IF NOT EXISTS ix_facility_name ON facility (name text_pattern_ops)"
+        ))
+
+
+def replace_facilities(facility_type, rows):
+    """
+    facility_type 의 시설 목록을 한 트랜잭션으로 교체
+    rows: [{name, sido, sigungu, address, phone, lat, lon, extra}] — 좌표가 없는 행은 주소로 좌표 변환 시도
+    """
+    ensure_facility_table()
+    rows = geocode_rows(rows)
+    with get_engine().begin() as conn:
+        conn.execute(
+            sqlalchemy.text("DELETE FROM facility WHERE facility_type = :facility_type"),
+            {"facility_type": facility_type},
+        )
+        if rows:
+            conn.execute(
+                sqlalchemy.text("""
+                    INSERT INTO facility (facility_type, name, sido, sigungu, address, phone, lat, lon, extra)
+                    VALUES (:facility_type, :name, :sido, :sigungu, :address, :phone, :lat, :lon, CAST(:extra AS jsonb))
+                """),
+                [
+                    {
+                        "facility_type": facility_type,
+                        "name": row["name"],
+                        "sido": row.get("sido"),
+                        "sigungu": row.get("sigungu"),
+                        "address": row.get("address"),
+                        "phone": row.get("phone"),
+                        "lat": row.get("lat"),
+                        "lon": row.get("lon"),
+                        "extra": json.dumps(row.get("extra") or {}, ensure_ascii=False, default=str),
+                    }
+                    for row in rows
+                ],
+            )
+    invalidate_geo_index()
+    print(f"[facility] {FACILITY_TYPES.get(facility_type, facility_type)} {len(rows)}건 저장")
+
+
+def _pick(item, *candidates):
+    """API 항목에서 후보 키(부분 일치) 중 처음으로 값이 있는 항목"""
+    for candidate in candidates:
+        for key, value in item.items():
+            if candidate in key and value not in (None, ""):
+                return str(value).strip()
+    return None
+
+
+def facility_rows_from_items(items, facility_type):
+    """공공데이터 API 항목(dict) → 시설 행 (데이터셋마다 컬럼명이 달라 후보 키로 찾음)"""
+    rows = []
+    for item in items:
+        name = _pick(item, "cnterNm", "기관명", "센터명", "시설명", "운영기관")
+        if not name:
+            continue
+        address = _pick(item, "roadNmAddr", "lotnoAddr", "도로명주소", "주소", "소재지")
+        sido, sigungu = split_region(address)
+        sido = normalize_sido(_pick(item, "시도", "광역")) or sido
+        sigungu = _pick(item, "시군구") or sigungu
+        lat, lon = parse_coordinates(item)
+        rows.append({
+            "name": name,
+            "sido": sido,
+            "sigungu": sigungu,
+            "address": address,
+            "phone": _pick(item, "rprsTelno", "전화번호", "연락처", "대표전화"),
+            "lat": lat,
+            "lon": lon,
+            "extra": item,
+        })
+    return rows
+
+
+def find_facilities(region=None, facility_type=None, name=None, limit=20):
+    """
+    지역/종류/이름으로 시설 조회 (인덱스를 타는 단일 쿼리)
+    region: '서울 구로구', '구로구', '경기' 등 / facility_type: str 또는 종류 목록 / name: 이름 앞부분
+    """
+    sido, sigungu = parse_region_query(region)
+    conditions, params = [], {"limit": limit}
+    if sido:
+        conditions.append("sido = :sido")
+        params["sido"] = sido
+    if sigungu:
+        conditions.append("sigungu = :sigungu")
+        params["sigungu"] = sigungu
+    if facility_type:
+        types = [facility_type] if isinstance(facility_type, str) else list(facility_type)
+        conditions.append("facility_type = ANY(:types)")
+        params["types"] = types
+    if name:
+        conditions.append("name LIKE :name")
+        params["name"] = name.replace("%", r"\%").replace("_", r"\_") + "%"
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_engine().connect() as conn:
+        result = conn.execute(sqlalchemy.text(f"""
+            SELECT facility_type, name, sido, sigungu, address, phone
+            FROM facility {where}
+            ORDER BY facility_type, sido, sigungu, name
+            LIMIT :limit
+        """), params)
+        return [dict(row._mapping) for row in result]
+
+
+def parse_facility_query(query):
+    """
+    '구로구 가족센터 전화번호' 같은 시설 조회 질문이면 {region, facility_type, nearest} 반환, 아니면 None
+    시설 종류 + (전화번호/주소/위치 등 또는 가까운/근처) 이 함께 있어야 시설 조회로 판단
+    종류 없이 '센터' 만 있으면 '가까운 센터' 같은 거리 순 조회일 때만 (가족센터/다문화가족지원센터, facility_type 은 CENTER_TYPES)
+    ('어느 기관 어디에서' 처럼 종류가 없는 질문은 None → RAG 답변)
+    질문에 지역이 없으면 region 은 None, 거리 순 조회면 nearest=True
+    """
+    compact = query.replace(" ", "")
+    nearest = any(keyword in compact for keyword in NEAREST_KEYWORDS) and any(
+        keyword in compact for keyword in NEAREST_REQUEST_KEYWORDS + LOOKUP_KEYWORDS
+    )
+    if not nearest and not any(keyword in compact for keyword in LOOKUP_KEYWORDS):
+        return None
+
+    facility_type = None
+    for keyword, keyword_type in FACILITY_KEYWORDS.items():
+        if keyword.replace(" ", "") in compact:
+            facility_type = keyword_type
+            break
+    if facility_type is None:
+        if not (nearest and "센터" in compact):
+            return None
+        facility_type = CENTER_TYPES
+
+    region_tokens = [token for token in re.split(r"[\s,.?!]+", query) if normalize_sido(token)]
+    region_tokens += REGION_PATTERN.findall(query)
+    return {"region": " ".join(region_tokens) or None, "facility_type": facility_type, "nearest": nearest}
+
+
+def format_facilities(rows):
+    """조회 결과를 답변 텍스트로 구성 (거리 순 조회 결과면 거리 표시)"""
+    lines = []
+    for row in rows:
+        region = " ".join(part for part in (row["sido"], row["sigungu"]) if part)
+        distance = ""
+        if row.get("distance_km") is not None:
+            distance = f", {'약 ' if row.get('approximate') else ''}{row['distance_km']:.1f}km"
+        lines.append(f"- {row['name']} ({FACILITY_TYPES.get(row['facility_type'], row['facility_type'])}, {region}{distance})")
+        if row["address"]:
+            lines.append(f"  주소: {row['address']}")
+        if row["phone"]:
+            lines.append(f"  연락처: {row['phone']}")
+    return "\n".join(lines)
+
+
+def answer_facility_query(query, default_region=None, limit=10, nearest_count=5):
+    """
+    시설 조회 질문이면 테이블 조회 결과로 답변 (LLM 호출 없음), 해당하지 않거나 결과가 없으면 None
+    질문에 지역이 없으면 default_region(사용자 거주 지역) 으로 조회
+    '가까운 센터' 같은 질문은 위치 인덱스에서 가까운 순으로 nearest_count 개 (위치를 알 수 없으면 지역 조회)
+    """
+    parsed = parse_facility_query(query)
+    if parsed is None:
+        return None
+    region = parsed["region"] or default_region
+    if not region:
+        return None
+    if parsed["nearest"]:
+        try:
+            rows = nearest_facilities(region, parsed["facility_type"], n=nearest_count)
+        except sqlalchemy.exc.DBAPIError as e:
+            # 좌표 컬럼이 없는 이전 테이블 등은 지역 조회로 처리
+            print(f"시설 위치 조회 오류: {e}")
+            rows = None
+        if rows:
+            notes = []
+            if any(row["approximate"] for row in rows):
+                notes.append("'약' 으로 표시된 거리는 주소의 시군구/시도 기준으로 추정한 거리입니다.")
+            if any(row["distance_km"] is None for row in rows):
+                notes.append("거리가 없는 시설은 좌표가 없어 같은 지역 주소로 찾은 시설입니다.")
+            note = "".join(f"\n\n({text})" for text in notes)
+            return f"{region}에서 가까운 시설입니다.\n\n{format_facilities(rows)}{note}"
+    try:
+        rows = find_facilities(region, parsed["facility_type"], limit=limit)
+    except sqlalchemy.exc.DBAPIError as e:
+        # 시설 테이블이 아직 없거나 DB 오류면 RAG 경로로 처리
+        print(f"시설 조회 오류: {e}")
+        return None
+    if not rows:
+        return None
+    return f"{region} 지역 시설 정보입니다.\n\n{format_facilities(rows)}"
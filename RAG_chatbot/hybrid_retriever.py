@@ -0,0 +1,107 @@
+# RAG_chatbot/hybrid_retriever.py
+import time
+import asyncio
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pydantic import ConfigDict
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from .lexical_index import BM25Index
+
+RETRIEVAL_MODES = ("hybrid", "lexical", "vector")
+
+# 벡터 검색(임베딩 + DB) 을 BM25 검색과 동시에 실행하기 위한 스레드 풀 (프로세스 공용)
+_vector_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-search")
+# 비동기 검색의 BM25 (메모리 내 CPU 작업) 전용 스레드 풀
+# 느린 벡터 검색이 _vector_executor 를 모두 차지해도 BM25 결과는 기다리지 않고 바로 나옴
+_lexical_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+
+
+def _doc_key(doc):
+    return doc.id or doc.metadata.get("chunk_id") or doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists, rrf_k=60):
+    """
+    여러 검색 결과 목록을 RRF 로 병합: 문서 점수 = Σ 1 / (rrf_k + 순위)
+    점수 스케일이 다른 BM25 / 벡터 거리를 정규화 없이 순위만으로 합칠 수 있음
+    """
+    scores, documents = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25(글자 n-gram) + 벡터 검색 결과를 RRF 로 병합하는 검색기
+    - 벡터 검색은 스레드 풀에서, BM25 는 현재 스레드에서 동시에 실행
+      (비동기 호출 시에는 둘 다 스레드 풀에서 실행하고 이벤트 루프는 막지 않음)
+    - 벡터 검색이 실패하거나 vector_timeout(초) 안에 끝나지 않으면 BM25 결과만 반환
+    - mode="lexical" 이면 임베딩 모델/DB 를 거치지 않고 BM25 만 사용
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_retriever: Optional[BaseRetriever] = None
+    lexical_index: Optional[BM25Index] = None
+    metadata_filter: Optional[dict] = None
+    k: int = 5
+    candidate_k: int = 10
+    mode: str = "hybrid"
+    rrf_k: int = 60
+    vector_timeout: Optional[float] = None
+
+    def _lexical(self, query):
+        return self.lexical_index.search(query, k=self.candidate_k, metadata_filter=self.metadata_filter)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        if self.mode == "lexical" or (self.vector_retriever is None and self.lexical_index is not None):
+            return self._lexical(query)[:self.k]
+        if self.mode == "vector" or self.lexical_index is None:
+            return self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()})[:self.k]
+
+        started = time.perf_counter()
+        future = _vector_executor.submit(
+            self.vector_retriever.invoke, query, config={"callbacks": run_manager.get_child()}
+        )
+        lexical_docs = self._lexical(query)
+        try:
+            remaining = None if self.vector_timeout is None else max(0.0, self.vector_timeout - (time.perf_counter() - started))
+            vector_docs = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            print(f"[hybrid] 벡터 검색이 {self.vector_timeout}초 안에 끝나지 않아 BM25 결과만 사용")
+            return lexical_docs[:self.k]
+        except Exception as e:
+            print(f"[hybrid] 벡터 검색 오류로 BM25 결과만 사용: {e}")
+            return lexical_docs[:self.k]
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], rrf_k=self.rrf_k)[:self.k]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun):
+        # PGVector 는 동기 엔진으로 접속하므로 벡터 검색도 ainvoke 대신 스레드 풀에서 동기 호출
+        loop = asyncio.get_running_loop()
+        if self.mode == "lexical" or (self.vector_retriever is None and self.lexical_index is not None):
+            return (await loop.run_in_executor(_lexical_executor, self._lexical, query))[:self.k]
+
+        def vector_search():
+            return self.vector_retriever.invoke(query)
+
+        if self.mode == "vector" or self.lexical_index is None:
+            return (await loop.run_in_executor(_vector_executor, vector_search))[:self.k]
+
+        started = time.perf_counter()
+        vector_task = loop.run_in_executor(_vector_executor, vector_search)
+        lexical_docs = await loop.run_in_executor(_lexical_executor, self._lexical, query)
+        try:
+            remaining = None if self.vector_timeout is None else max(0.0, self.vector_timeout - (time.perf_counter() - started))
+            vector_docs = await asyncio.wait_for(vector_task, timeout=remaining)
+        except asyncio.TimeoutError:
+            print(f"[hybrid] 벡터 검색이 {self.vector_timeout}초 안에 끝나지 않아 BM25 결과만 사용")
+            return lexical_docs[:self.k]
+        except Exception as e:
+            print(f"[hybrid] 벡터 검색 오류로 BM25 결과만 사용: {e}")
+            return lexical_docs[:self.k]
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], rrf_k=self.rrf_k)[:self.k]
@@ -0,0 +1,387 @@
+# RAG_chatbot/ingestion.py
+import os
+import json
+import uuid
+import queue
+import time
+import hashlib
+import threading
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# 청크 ID 생성용 네임스페이스 (변경 시 모든 청크 ID가 바뀌므로 고정)
+CHUNK_NAMESPACE = uuid.UUID("6f1c2b0e-4d7a-4c1e-9a39-3b8f6c0d5e21")
+
+# 로더가 만드는 청크 형식(메타데이터 구성 등)이 바뀌면 올려서 기존 소스를 다시 적재
+SOURCE_FORMAT_VERSION = 2
+
+
+def text_hash(text: str) -> str:
+    """문자열의 sha256 해시"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_version(content_hash: str, text_splitter) -> str:
+    """소스 내용 해시 + 분할기 종류/설정 + 청크 형식 버전 (분할 방식이 바뀌면 같은 파일도 다시 적재)"""
+    return text_hash(
+        f"{content_hash}:{type(text_splitter).__name__}:{text_splitter._chunk_size}:{text_splitter._chunk_overlap}"
+        f":{SOURCE_FORMAT_VERSION}"
+    )
+
+
+def chunk_hash(chunk) -> str:
+    """청크 본문 + 메타데이터 해시 (메타데이터만 바뀌어도 다른 청크로 보고 다시 저장)"""
+    metadata = json.dumps(chunk.metadata, ensure_ascii=False, sort_keys=True, default=str)
+    return text_hash(f"{chunk.page_content}\n{metadata}")
+
+
+def make_chunk_id(source_key: str, content_hash: str, seen: dict, collection_name: str = "") -> str:
+    """
+    (컬렉션 +) 소스 키 + 청크 내용 해시로 결정적인 청크 ID 생성
+    같은 소스 안에서 내용이 같은 청크는 등장 순서(seen 에 누적)로 구분
+    청크 ID 는 langchain_pg_embedding 전체의 기본키이므로, 같은 소스를 여러 컬렉션 버전에
+    적재해도 겹치지 않도록 컬렉션 이름을 포함
+    """
+    occurrence = seen.get(content_hash, 0)
+    seen[content_hash] = occurrence + 1
+    key = f"{collection_name}/{source_key}" if collection_name else source_key
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{key}:{content_hash}:{occurrence}"))
+
+
+def make_chunk_ids(source_key: str, chunks, collection_name: str = "") -> list[str]:
+    """청크 목록 전체의 ID (make_chunk_id 참고)"""
+    seen = {}
+    return [make_chunk_id(source_key, chunk_hash(chunk), seen, collection_name) for chunk in chunks]
+
+
+def manifest_path(collection_name):
+    return os.path.join(CACHE_DIR, f"ingest_manifest_{collection_name}.json")
+
+
+class IngestManifest:
+    """
+    소스 파일/데이터별 해시와 벡터 DB에 저장된 청크 ID를 기록하는 매니페스트
+    {"sources": {source_key: {"group": ..., "hash": ..., "chunks": {chunk_id: chunk_hash},
+                              "duplicates": {제외된 청크 ID: 대신 저장된 청크 ID}}}}
+    hash 는 해당 소스의 적재가 끝까지 완료된 경우에만 기록된다.
+    """
+
+    def __init__(self, collection_name="laws_db", path=None):
+        self.collection_name = collection_name
+        self.path = path or manifest_path(collection_name)
+        self.sources = {}
+        # 파이프라인의 로드 단계와 쓰기 단계가 서로 다른 스레드에서 접근
+        self._lock = threading.RLock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.sources = json.load(f).get("sources", {})
+
+    def save(self):
+        """중단되어도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"sources": self.sources}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def entry(self, source_key, group):
+        with self._lock:
+            return self.sources.setdefault(source_key, {"group": group, "hash": None, "chunks": {}})
+
+    def is_current(self, source_key, source_hash):
+        entry = self.sources.get(source_key)
+        return entry is not None and entry.get("hash") == source_hash
+
+    def keys_in_group(self, group):
+        with self._lock:
+            return [key for key, entry in self.sources.items() if entry.get("group") == group]
+
+    def invalidate_duplicates_of(self, chunk_ids):
+        """
+        삭제된 청크를 근접 중복 원본으로 참조하던 소스의 해시를 지움
+        (다음 실행에서 해당 소스를 다시 읽어 제외했던 청크를 적재)
+        """
+        chunk_ids = set(chunk_ids)
+        with self._lock:
+            for entry in self.sources.values():
+                if chunk_ids.intersection(entry.get("duplicates", {}).values()):
+                    entry["hash"] = None
+
+
+def prune_sources(vector_store, manifest, group, current_keys, dedup=None):
+    """이번 실행에서 사라진 소스(삭제된 파일 등)의 청크를 벡터 DB와 매니페스트에서 제거"""
+    removed = 0
+    for source_key in manifest.keys_in_group(group):
+        if source_key in current_keys:
+            continue
+        chunk_ids = list(manifest.sources[source_key]["chunks"])
+        if chunk_ids:
+            vector_store.delete(ids=chunk_ids)
+            manifest.invalidate_duplicates_of(chunk_ids)
+            if dedup is not None:
+                dedup.remove(chunk_ids)
+        removed += len(chunk_ids)
+        with manifest._lock:
+            del manifest.sources[source_key]
+        manifest.save()
+    return removed
+
+
+# 파이프라인 종료 신호
+_END = object()
+
+
+class IngestPipeline:
+    """
+    load → split → embed → write 단계를 크기 제한 큐로 연결한 스트리밍 적재 파이프라인
+    - load/split (호출 스레드): 변경된 소스만 생성기로 읽어 batch_size 개씩 청크를 넘김
+    - embed (스레드): 배치 단위 임베딩
+    - write (스레드): 배치 커밋 후 매니페스트 기록, 소스가 끝나면 사라진 청크 삭제
+    큐가 가득 차면 앞 단계가 기다리므로 코퍼스 크기와 관계없이 메모리에는 몇 배치만 존재하고,
+    먼저 적재된 배치는 전체 적재가 끝나기 전에도 바로 검색 가능하다.
+
+    write_rows(ids, documents, embeddings): 임베딩이 끝난 배치 기록 함수
+    (기본: vector_store.add_embeddings, 대량 적재는 vector_store.create_row_writer 사용)
+    dedup: NearDuplicateIndex 를 주면 이미 저장된(또는 이번에 저장할) 청크와 근접 중복인 청크는
+    임베딩 전에 제외하고, 제외한 청크 수/글자 수와 절약된 임베딩 시간(추정)을 출력
+    dedup_groups: 중복 검사를 할 그룹 (None 이면 모든 그룹) — 법령/안내서처럼 청크마다 자체 메타데이터
+    (statute, article 등)가 있는 그룹은 본문이 겹쳐도 제외하면 해당 필터 검색에서 빠지므로 대상에서 뺌
+    """
+
+    def __init__(self, vector_store, manifest, batch_size=64, queue_size=4, write_rows=None, dedup=None,
+                 dedup_groups=None):
+        self.vector_store = vector_store
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.write_rows = write_rows or self._add_embeddings
+        self.dedup = dedup
+        self.dedup_groups = None if dedup_groups is None else set(dedup_groups)
+        self.stats = {}
+        self._embed_seconds = 0.0
+        self._embed_chars = 0
+        self._embedding_dim = 0
+        self._errors = []
+        self._failed = threading.Event()
+
+    def _add_embeddings(self, ids, documents, embeddings):
+        self.vector_store.add_embeddings(
+            texts=[doc.page_content for doc in documents],
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+        )
+
+    def run(self, groups):
+        """
+        groups: (그룹명, {source_key: (source_hash, load_chunks)}) 를 생성하는 iterable
+        load_chunks 는 해시가 바뀐 소스에 대해서만 호출되며 청크 iterable 을 반환
+        반환값: {그룹명: {"added", "deleted", "skipped", "duplicates", ...}}
+        """
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        embed_thread = threading.Thread(target=self._embed_stage, args=(embed_queue, write_queue), daemon=True)
+        write_thread = threading.Thread(target=self._write_stage, args=(write_queue,), daemon=True)
+        embed_thread.start()
+        write_thread.start()
+        self._reconcile_dedup()
+
+        try:
+            for group, sources in groups:
+                self.stats.setdefault(group, {"added": 0, "deleted": 0, "skipped": 0, "duplicates": 0, "duplicate_chars": 0, "duplicate_bytes": 0})
+                for source_key, (source_hash, load_chunks) in sources.items():
+                    if self._failed.is_set():
+                        break
+                    self._load_stage(group, source_key, source_hash, load_chunks, embed_queue)
+                embed_queue.put(("prune", group, set(sources)))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            embed_queue.put(_END)
+            embed_thread.join()
+            write_thread.join()
+
+        self._reconcile_dedup()
+        if self._errors:
+            raise self._errors[0]
+        for group, stat in self.stats.items():
+            print(f"[{group}] 추가 {stat['added']}개, 삭제 {stat['deleted']}개, 변경 없음 {stat['skipped']}개 소스")
+        self._report_duplicates()
+        return self.stats
+
+    def _dedup_for(self, group):
+        """그룹에 적용할 근접 중복 인덱스 (중복 검사 대상이 아니면 None)"""
+        if self.dedup_groups is not None and group not in self.dedup_groups:
+            return None
+        return self.dedup
+
+    def _reconcile_dedup(self):
+        """
+        근접 중복 인덱스를 매니페스트에 기록된(실제로 저장된) 중복 검사 대상 그룹의 청크만 남기고 저장
+        중단된 실행에서 등록만 되고 기록되지 못한 청크가 원본으로 남지 않도록 함
+        중복 검사 대상이 아닌 그룹에서 예전에 제외한 청크가 있으면 그 소스를 다시 적재하도록 해시를 지움
+        """
+        if self.dedup is None:
+            return
+        with self.manifest._lock:
+            stored = set()
+            for entry in self.manifest.sources.values():
+                if self._dedup_for(entry.get("group")) is not None:
+                    stored.update(entry["chunks"])
+                elif entry.get("duplicates"):
+                    entry["hash"] = None
+                    entry["duplicates"] = {}
+        self.dedup.retain(stored)
+        self.dedup.save()
+
+    def _report_duplicates(self):
+        """
+        근접 중복 제거로 줄어든 저장 행/용량과 임베딩 시간
+        (용량은 텍스트 + float32 벡터 기준, 시간은 이번 실행의 글자당 임베딩 시간으로 추정)
+        """
+        duplicates = sum(stat["duplicates"] for stat in self.stats.values())
+        if not duplicates:
+            return
+        duplicate_chars = sum(stat["duplicate_chars"] for stat in self.stats.values())
+        added = sum(stat["added"] for stat in self.stats.values())
+        saved_bytes = sum(stat["duplicate_bytes"] for stat in self.stats.values()) + duplicates * self._embedding_dim * 4
+        seconds_per_char = self._embed_seconds / self._embed_chars if self._embed_chars else 0.0
+        print(
+            f"[중복 제거] 근접 중복 청크 {duplicates}개 제외 "
+            f"(이번 적재 {added + duplicates}개 중 {duplicates / (added + duplicates):.1%}), "
+            f"저장 용량 약 {saved_bytes / 1024:,.1f}KB, 임베딩 시간 약 {duplicate_chars * seconds_per_char:.1f}초 절약"
+        )
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._failed.set()
+
+    def _load_stage(self, group, source_key, source_hash, load_chunks, embed_queue):
+        if self.manifest.is_current(source_key, source_hash):
+            self.stats[group]["skipped"] += 1
+            return
+
+        with self.manifest._lock:
+            stored = set(self.manifest.entry(source_key, group)["chunks"])
+        dedup = self._dedup_for(group)
+        seen = {}
+        chunk_ids = []
+        duplicates = {}
+        batch = []
+        for chunk in load_chunks():
+            if self._failed.is_set():
+                return
+            content_hash = chunk_hash(chunk)
+            chunk_id = make_chunk_id(source_key, content_hash, seen, self.manifest.collection_name)
+            if chunk_id in stored:
+                chunk_ids.append(chunk_id)
+                # 중복 검사 도입 전에 저장된 청크도 원본으로 등록
+                if dedup is not None and chunk_id not in dedup:
+                    dedup.add(chunk_id, dedup.signature(chunk.page_content))
+                continue
+            if dedup is not None:
+                signature = dedup.signature(chunk.page_content)
+                original = dedup.find(signature)
+                # 같은 소스의 이전 청크(메타데이터만 바뀐 경우 등)는 곧 교체되므로 원본으로 보지 않음
+                if original is not None and original not in stored:
+                    duplicates[chunk_id] = original
+                    self.stats[group]["duplicates"] += 1
+                    self.stats[group]["duplicate_chars"] += len(chunk.page_content)
+                    self.stats[group]["duplicate_bytes"] += len(chunk.page_content.encode("utf-8"))
+                    continue
+                dedup.add(chunk_id, signature)
+            chunk_ids.append(chunk_id)
+            chunk.metadata["chunk_id"] = chunk_id
+            batch.append((chunk_id, content_hash, chunk))
+            if len(batch) >= self.batch_size:
+                embed_queue.put(("chunks", group, source_key, batch))
+                batch = []
+        if batch:
+            embed_queue.put(("chunks", group, source_key, batch))
+        embed_queue.put(("end", group, source_key, source_hash, chunk_ids, duplicates))
+
+    def _embed_stage(self, embed_queue, write_queue):
+        while True:
+            item = embed_queue.get()
+            if item is _END:
+                write_queue.put(_END)
+                return
+            if self._failed.is_set():
+                continue  # 실패 후에는 앞 단계가 막히지 않도록 큐만 비움
+            try:
+                if item[0] == "chunks":
+                    _, group, source_key, batch = item
+                    texts = [chunk.page_content for _, _, chunk in batch]
+                    started = time.perf_counter()
+                    embeddings = self.vector_store.embeddings.embed_documents(texts)
+                    self._embed_seconds += time.perf_counter() - started
+                    self._embed_chars += sum(len(text) for text in texts)
+                    self._embedding_dim = len(embeddings[0]) if embeddings else self._embedding_dim
+                    item = ("rows", group, source_key, batch, embeddings)
+                write_queue.put(item)
+            except Exception as e:
+                self._fail(e)
+
+    def _write_stage(self, write_queue):
+        while True:
+            item = write_queue.get()
+            if item is _END:
+                return
+            if self._failed.is_set():
+                continue
+            try:
+                if item[0] == "rows":
+                    self._write_rows(*item[1:])
+                elif item[0] == "end":
+                    self._finish_source(*item[1:])
+                elif item[0] == "prune":
+                    _, group, current_keys = item
+                    self.stats[group]["deleted"] += prune_sources(
+                        self.vector_store, self.manifest, group, current_keys, dedup=self.dedup
+                    )
+            except Exception as e:
+                self._fail(e)
+
+    def _write_rows(self, group, source_key, batch, embeddings):
+        self.write_rows(
+            [chunk_id for chunk_id, _, _ in batch],
+            [chunk for _, _, chunk in batch],
+            embeddings,
+        )
+        stored = self.manifest.entry(source_key, group)["chunks"]
+        with self.manifest._lock:
+            for chunk_id, content_hash, _ in batch:
+                stored[chunk_id] = content_hash
+        self.manifest.save()
+        self.stats[group]["added"] += len(batch)
+
+    def _finish_source(self, group, source_key, source_hash, chunk_ids, duplicates):
+        entry = self.manifest.entry(source_key, group)
+        stale = list(set(entry["chunks"]) - set(chunk_ids))
+        if stale:
+            self.vector_store.delete(ids=stale)
+            with self.manifest._lock:
+                for chunk_id in stale:
+                    del entry["chunks"][chunk_id]
+            if self.dedup is not None:
+                self.dedup.remove(stale)
+        with self.manifest._lock:
+            entry["duplicates"] = duplicates
+        if stale:
+            self.manifest.invalidate_duplicates_of(stale)
+        # 소스의 모든 청크가 기록된 후에만 해시를 남김 (중단 시 다음 실행에서 이어서 적재)
+        entry["hash"] = source_hash
+        self.manifest.save()
+        self.stats[group]["deleted"] += len(stale)
+
+
+def sync_group(vector_store, manifest, group, sources, batch_size=64, write_rows=None, dedup=None):
+    """
+    같은 종류의 소스 묶음 하나를 파이프라인으로 동기화하고 사라진 소스는 정리
+    sources: {source_key: (source_hash, load_chunks)}
+    반환값: (추가된 청크 수, 삭제된 청크 수)
+    """
+    pipeline = IngestPipeline(vector_store, manifest, batch_size=batch_size, write_rows=write_rows, dedup=dedup)
+    stat = pipeline.run([(group, sources)])[group]
+    return stat["added"], stat["deleted"]
@@ -0,0 +1,142 @@
+# RAG_chatbot/lexical_index.py
+import re
+import time
+import json
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from langchain_core.documents import Document
+from .embedding_cache import normalize_text
+
+# 본문과 함께 색인할 메타데이터 (법령 청크 본문에는 법령명이 없어서 '출입국관리법 제7조' 같은 질문이 맞지 않음)
+LEXICAL_METADATA_FIELDS = ("statute", "article", "article_title", "chapter", "guide_title")
+
+# 토큰 경계 (한글/영문/숫자 외 문자는 구분자, F-6 / E-9 같은 비자 코드는 한 토큰으로 유지)
+TOKEN_PATTERN = re.compile(r"[A-Za-z]-\d+|[0-9A-Za-z가-힣]+")
+
+
+def lexical_terms(text, n=2):
+    """
+    BM25 용어 목록: 토큰 자체 + 토큰의 글자 n-gram
+    한국어는 조사가 붙어 띄어쓰기 단위 토큰이 잘 일치하지 않으므로 글자 bigram 으로 부분 일치를 잡고,
+    '제7조', 'F-6', 법령명처럼 정확히 맞아야 하는 표현은 토큰 전체로도 매칭
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(normalize_text(text).lower()):
+        terms.append(token)
+        if len(token) > n:
+            terms.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return terms
+
+
+def indexed_text(doc):
+    """BM25 색인 대상 텍스트: 메타데이터(법령명/조문/제목) + 본문"""
+    fields = [str(doc.metadata[field]) for field in LEXICAL_METADATA_FIELDS if doc.metadata.get(field)]
+    return "\n".join(fields + [doc.page_content])
+
+
+def matches_filter(metadata, metadata_filter):
+    """build_metadata_filter 형식($and / $in / $gte / $lte / 값)의 필터를 메타데이터 dict 에 적용"""
+    if not metadata_filter:
+        return True
+    for field, condition in metadata_filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, expected in condition.items():
+            if operator == "$eq" and value != expected:
+                return False
+            if operator == "$ne" and value == expected:
+                return False
+            if operator == "$in" and (value is None or str(value) not in {str(item) for item in expected}):
+                return False
+            if operator == "$nin" and value is not None and str(value) in {str(item) for item in expected}:
+                return False
+            if operator == "$gte" and (value is None or value < expected):
+                return False
+            if operator == "$lte" and (value is None or value > expected):
+                return False
+            if operator == "$exists" and (field in metadata) != expected:
+                return False
+    return True
+
+
+class BM25Index:
+    """
+    청크 텍스트의 인메모리 BM25 인덱스 (벡터 DB 와 같은 청크로 구성)
+    용어별 (문서 번호 배열, BM25 가중치 배열) 을 미리 계산해 두고, 검색은 질문 용어의 가중치 합
+    """
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+        started = time.perf_counter()
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(self.documents), dtype=np.float32)
+        for doc_index, doc in enumerate(self.documents):
+            counts = Counter(lexical_terms(indexed_text(doc)))
+            lengths[doc_index] = sum(counts.values())
+            for term, count in counts.items():
+                ids, tfs = postings[term]
+                ids.append(doc_index)
+                tfs.append(count)
+
+        total = len(self.documents)
+        average = float(lengths.mean()) if total else 0.0
+        self._postings = {}
+        for term, (ids, tfs) in postings.items():
+            ids = np.asarray(ids, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = np.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / (average or 1.0))
+            self._postings[term] = (ids, (idf * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32))
+        self._filter_masks = {}
+        self._lock = threading.Lock()
+        print(f"[BM25] 문서 {total}개, 용어 {len(self._postings)}개 인덱스 구성 ({time.perf_counter() - started:.2f}초)")
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _filter_mask(self, metadata_filter):
+        """필터별 허용 문서 마스크 (같은 필터는 다시 계산하지 않음)"""
+        key = json.dumps(metadata_filter, ensure_ascii=False, sort_keys=True, default=str)
+        with self._lock:
+            mask = self._filter_masks.get(key)
+        if mask is None:
+            mask = np.array([matches_filter(doc.metadata, metadata_filter) for doc in self.documents], dtype=bool)
+            with self._lock:
+                self._filter_masks[key] = mask
+        return mask
+
+    def search_with_scores(self, query, k=5, metadata_filter=None):
+        """질문과 BM25 점수가 높은 (Document, 점수) 상위 k개 (일치하는 용어가 없으면 빈 목록)"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term, count in Counter(lexical_terms(query)).items():
+            posting = self._postings.get(term)
+            if posting is not None:
+                ids, weights = posting
+                scores[ids] += count * weights
+        if metadata_filter:
+            scores[~self._filter_mask(metadata_filter)] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.documents[i], float(scores[i])) for i in candidates]
+
+    def search(self, query, k=5, metadata_filter=None):
+        return [doc for doc, _ in self.search_with_scores(query, k=k, metadata_filter=metadata_filter)]
+
+
+def documents_from_rows(rows):
+    """(id, document, cmetadata) 행 → Document (벡터 검색 결과와 같은 id 사용)"""
+    return [Document(id=str(row_id), page_content=text, metadata=metadata or {}) for row_id, text, metadata in rows]
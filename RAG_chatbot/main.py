@@ -1,43 +1,98 @@
-from data_loader import (
-    load_pdfs,
+import os
+import glob
+import json
+import argparse
+from .data_loader import (
+    file_hash,
+    warm_parse_cache,
+    load_pdf,
     load_center_data,
-    load_all_hanultari_jsons,
+    load_center_facilities,
+    load_hanultari_json,
     load_korean_education_data,
     load_translator_data,
+    load_sunflower_center_items,
     load_sunflower_center_data,
     create_text_splitter,
     split_documents,
     split_csv,
 )
-from vector_store import create_vector_store, create_retriever
-from model import create_qa_chain
+from .vector_store import (
+    create_vector_store,
+    create_hybrid_retriever,
+    load_lexical_index,
+    create_row_writer,
+    next_version,
+    ensure_vector_index,
+    ensure_metadata_indexes,
+    build_metadata_filter,
+    check_index_usage,
+    validate_collection,
+    swap_alias,
+    garbage_collect_versions,
+)
+from .model import create_qa_chain
+from .ingestion import IngestManifest, IngestPipeline, source_version, text_hash, manifest_path
+from .facility_store import replace_facilities, facility_rows_from_items
+from .near_duplicate import NearDuplicateIndex, near_duplicate_index_path
+from .vector_replica import remove_replica_snapshot
 
-def main():
-    # 텍스트 분할기 생성
-    text_splitter = create_text_splitter()
-    # vector_store = create_vector_store()
+COLLECTION_NAME = "laws_db"
+
+# HNSW 검색 범위 (MMR 의 fetch_k 보다 커야 후보가 부족하지 않음)
+SEARCH_EF = 64
+
+# 새 버전 전환 전 검증 쿼리 (모두 검색 결과가 있어야 전환)
+PROBE_QUERIES = [
+    "결혼이민자 국적 취득 요건",
+    "다문화가족지원센터 연락처",
+]
+
+# 근접 중복 제거 대상 그룹 (hanultari_*/danuri_* 프로그램 JSON 스냅샷)
+DEDUP_GROUPS = ("hanultari",)
 
+def data_version(items):
+    """API 응답 데이터의 해시"""
+    return text_hash(json.dumps(items, ensure_ascii=False, sort_keys=True, default=str))
+
+# 다문화가족지원센터 현황 PDF (법령 PDF 와 같은 폴더에 있지만 센터 그룹으로 따로 적재)
+CENTER_PDF = "data/다문화가족지원센터현황(공공데이터).pdf"
+
+
+def iter_sources(manifest, text_splitter):
+    """
+    (그룹명, {source_key: (source_hash, load_chunks)}) 를 그룹 단위로 생성
+    앞 그룹이 적재되는 동안 다음 그룹의 데이터를 불러오지 않도록 생성기로 구성
+    load_chunks 는 청크 생성기를 반환하므로 소스 전체가 메모리에 올라가지 않음
+    """
     # 법률 PDF 로드 및 분할
     print("법률 PDF 파일 로딩 중...")
-    docs = load_pdfs("data/")
-    # print(docs)
-    texts = split_documents(docs, text_splitter)
-    
-    # 벡터 스토어 생성 및 법률 데이터 추가
-    print("벡터 스토어 생성 및 법률 데이터 추가 중...")
-    vector_store = create_vector_store(texts)
-    
-    # 다문화가족지원센터 데이터 로드
-    print("다문화가족지원센터 데이터 로딩 중...")
-    center_pdf = "data/다문화가족지원센터현황(공공데이터).pdf"
-    center_docs = load_center_data(center_pdf)
+    # 센터 현황 PDF 는 "center" 그룹에서 센터 메타데이터(type=center 등)와 함께 적재
+    # (여기 포함하면 법령 청크로 먼저 들어가 중복 제거로 센터 그룹 청크가 모두 빠짐)
+    pdf_files = sorted(path for path in glob.glob("data/*.pdf") if os.path.normpath(path) != os.path.normpath(CENTER_PDF))
+    # 파일 해시는 한 번만 계산해서 버전 비교와 파싱 캐시 키에 함께 사용
+    pdf_hashes = {path: file_hash(path) for path in pdf_files}
+    pdf_versions = {path: source_version(pdf_hashes[path], text_splitter) for path in pdf_files}
+    # 변경된 PDF만 프로세스 풀로 병렬 파싱해서 파싱 캐시를 채움 (이후에는 캐시에서 파일 단위로 읽음)
+    warm_parse_cache([path for path in pdf_files if not manifest.is_current(path, pdf_versions[path])], hashes=pdf_hashes)
+    yield "laws", {
+        path: (
+            pdf_versions[path],
+            lambda path=path: split_documents(load_pdf(path, digest=pdf_hashes[path]), text_splitter),
+        )
+        for path in pdf_files
+    }
 
     # 한울타리 JSON 데이터 로드
     print("한울타리 정책 프로그램 데이터 로딩 중...")
-    hanultari_docs = load_all_hanultari_jsons("data/")
-    hanultari_chunks = split_documents(hanultari_docs, text_splitter)
-    vector_store.add_documents(hanultari_chunks)
-    print(f"한울타리 프로그램 데이터 {len(hanultari_chunks)}개 청크가 추가되었습니다.")
+    json_files = sorted(glob.glob("data/*.json"))
+    yield "hanultari", {
+        path: (
+            source_version(file_hash(path), text_splitter),
+            lambda path=path: split_documents(load_hanultari_json(path), text_splitter),
+        )
+        for path in json_files
+    }
 
     # 결혼이민자 대상 한국어교육 운영기관 API 데이터 로드
     # 여성가족부_결혼이민자 대상 한국어교육 운영기관 현황 (2024년)
@@ -45,40 +100,119 @@ def main():
     data = "결혼이민자 대상 한국어교육 운영기관 정보"
     print(f"{data} 로딩 중...")
     korean_education_data = load_korean_education_data(page=1, per_page=1000)
-    korean_education_chunks = split_csv(korean_education_data, data, max_rows=10)
-    vector_store.add_documents(korean_education_chunks)
-    print(f"{data} {len(korean_education_chunks)}개 청크가 추가되었습니다.")
+    # 시설 조회용 테이블에도 저장 (지역/종류/이름 인덱스로 직접 조회)
+    replace_facilities("korean_education", facility_rows_from_items(korean_education_data, "korean_education"))
+    yield "korean_education", {
+        data: (
+            data_version(korean_education_data),
+            lambda: split_csv(korean_education_data, data, max_rows=10),
+        )
+    }
 
     # 한국건강가정진흥원_전국 다문화가족지원센터 통번역 지원사 배치현황 API 데이터 로드
     # 한국건강가정진흥원_전국 다문화가족지원센터 통번역 지원사 배치현황 (2024년)
     # https://www.data.go.kr/tcs/dss/selectFileDataDetailView.do?publicDataPk=3081602#tab-layer-openapi
-    data = "한국건강가정진흥원_전국 다문화가족지원센터 통번역 지원사 배치현황"
-    print(f"{data} 로딩 중...")
+    translator = "한국건강가정진흥원_전국 다문화가족지원센터 통번역 지원사 배치현황"
+    print(f"{translator} 로딩 중...")
     translator_data = load_translator_data(page=1, per_page=1000)
-    translator_chunks = split_csv(translator_data, data, max_rows=10)
-    vector_store.add_documents(translator_chunks)
-    print(f"{data} {len(korean_education_chunks)}개 청크가 추가되었습니다.")
+    replace_facilities("translator", facility_rows_from_items(translator_data, "translator"))
+    yield "translator", {
+        translator: (
+            data_version(translator_data),
+            lambda: split_csv(translator_data, translator, max_rows=10),
+        )
+    }
 
     # 여성가족부_해바라기센터 API 데이터 로드
     # 성폭력 피해자 지원을 전담하는 해바라기센터의 POI시설정보(도로명주소, 지번주소, 위도, 경도, 전화번호 등) 현황의 사회복지 정보서비스를 제공합니다.
     # https://www.data.go.kr/data/15109785/openapi.do#tab_layer_detail_function
     print("여성가족부_해바라기센터 데이터 로딩 중...")
-    sunflower_docs = load_sunflower_center_data(page=1, per_page=100)
-    sunflower_chunks = split_documents(sunflower_docs, text_splitter)
-    vector_store.add_documents(sunflower_chunks)
-    print(f"여성가족부_해바라기센터 데이터 {len(sunflower_chunks)}개 청크가 추가되었습니다.")
-    
-    # 다문화가족지원센터 데이터 분할 및 추가
-    center_chunks = split_documents(center_docs, text_splitter)
-    vector_store.add_documents(center_chunks)
-    print(f"다문화가족지원센터 데이터 {len(center_chunks)}개 청크가 추가되었습니다.")
-    
-    # 리트리버 생성
-    retriever = create_retriever(vector_store)
-    
+    sunflower_items = load_sunflower_center_items(page=1, per_page=100)
+    replace_facilities("sunflower_center", facility_rows_from_items(sunflower_items, "sunflower_center"))
+    sunflower_docs = load_sunflower_center_data(data_list=sunflower_items)
+    yield "sunflower", {
+        "sunflower_center": (
+            source_version(data_version([doc.page_content for doc in sunflower_docs]), text_splitter),
+            lambda: split_documents(sunflower_docs, text_splitter),
+        )
+    }
+
+    # 다문화가족지원센터 데이터 로드, 분할 및 추가
+    print("다문화가족지원센터 데이터 로딩 중...")
+    center_pdf = CENTER_PDF
+    center_hash = file_hash(center_pdf)
+    for facility_type, rows in load_center_facilities(center_pdf, digest=center_hash).items():
+        replace_facilities(facility_type, rows)
+    yield "center", {
+        f"center:{center_pdf}": (
+            source_version(center_hash, text_splitter),
+            lambda: split_documents(load_center_data(center_pdf, digest=center_hash), text_splitter),
+        )
+    }
+
+def remove_local_state(collection_name):
+    """삭제된 버전 컬렉션의 적재 매니페스트/근접 중복 인덱스/복제본 스냅샷 파일 정리"""
+    for path in (manifest_path(collection_name), near_duplicate_index_path(collection_name)):
+        if os.path.exists(path):
+            os.remove(path)
+    remove_replica_snapshot(collection_name)
+
+def main(rebuild=False, embedding_model=None, keep_versions=1, resume=True):
+    """
+    rebuild=False: 현재 버전 컬렉션에 변경된 소스만 반영
+    rebuild=True: 새 버전 컬렉션(laws_db@vN)을 처음부터 적재 → 검증 → 별칭 전환 → 이전 버전 정리
+    resume=False: 중단된 재적재가 있어도 이어서 적재하지 않고 새 번호로 시작
+    (서빙 중인 컬렉션에는 쓰지 않으므로 적재 중에도 검색 결과가 섞이지 않고, 임베딩 모델도 교체 가능)
+    """
+    # 텍스트 분할기 생성
+    text_splitter = create_text_splitter()
+
+    # 벡터 스토어 접속 및 적재 매니페스트 로드 (변경된 소스만 임베딩/upsert)
+    if rebuild:
+        vector_store = create_vector_store(
+            collection_name=COLLECTION_NAME,
+            # 중단된 재적재(전환 전 버전, 검증 실패 제외)가 있으면 이어서 적재
+            version=next_version(COLLECTION_NAME, resume=resume, embedding_model=embedding_model),
+            embedding_model=embedding_model,
+        )
+    else:
+        vector_store = create_vector_store(collection_name=COLLECTION_NAME)
+    collection = vector_store.collection_name
+    print(f"적재 대상 컬렉션: {collection}")
+    manifest = IngestManifest(collection)
+
+    # load → split → embed → write 스트리밍 파이프라인 (임베딩 후 배치 단위 COPY 기반 upsert)
+    # 한울타리/다누리 프로그램 스냅샷처럼 겹치는 소스의 근접 중복 청크는 임베딩 전에 제외
+    # (법령/안내서는 청크마다 statute/article 메타데이터가 있어 본문이 겹쳐도 그대로 적재)
+    pipeline = IngestPipeline(
+        vector_store,
+        manifest,
+        batch_size=256,
+        queue_size=4,
+        write_rows=create_row_writer(vector_store),
+        dedup=NearDuplicateIndex(near_duplicate_index_path(collection)),
+        dedup_groups=DEDUP_GROUPS,
+    )
+    pipeline.run(iter_sources(manifest, text_splitter))
+
+    # 컬렉션별 HNSW 인덱스 + 주제(topic)별 파티션 인덱스 (없을 때만 생성) 및 검색 쿼리의 인덱스 사용 확인
+    ensure_metadata_indexes()
+    ensure_vector_index(vector_store, method="hnsw", partition_key="topic")
+    check_index_usage(vector_store)
+    check_index_usage(vector_store, metadata_filter=build_metadata_filter(topic="immigration"))
+
+    if rebuild:
+        # 검증에 실패하면 예외로 중단되고 별칭은 기존 버전을 그대로 가리킴
+        validate_collection(vector_store, probe_queries=PROBE_QUERIES)
+        swap_alias(COLLECTION_NAME, collection)
+        garbage_collect_versions(COLLECTION_NAME, keep=keep_versions, on_delete=remove_local_state)
+
+    # 리트리버 생성 (BM25 + 벡터 검색 RRF 병합)
+    retriever = create_hybrid_retriever(vector_store, load_lexical_index(collection), ef_search=SEARCH_EF)
+
     # QA 체인 생성
     qa_chain = create_qa_chain(retriever)
-    
+
     # 테스트 쿼리
     query = "10개월 된 아이가 있는 베트남 출신 결혼이민자로서 받을 수 있는 지원 정책과 이용할 수 있는 시설이 알고 싶어요."
     print("\n테스트 쿼리:", query)
@@ -86,4 +220,14 @@ def main():
     print("\n응답:", response["result"])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 프로젝트 루트에서 python -m RAG_chatbot.main 으로 실행
+    # (데이터 경로와 적재 매니페스트의 소스 키가 RAG_chatbot 폴더 기준 상대 경로이므로 작업 폴더를 맞춤)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="마주봄 벡터 스토어 적재")
+    parser.add_argument("--rebuild", action="store_true", help="새 버전 컬렉션으로 전체 재적재 후 전환")
+    parser.add_argument("--embedding-model", default=None, help="재적재 시 사용할 임베딩 모델")
+    parser.add_argument("--keep-versions", type=int, default=1, help="전환 후 남겨둘 이전 버전 수")
+    parser.add_argument("--fresh", action="store_true", help="재적재 시 중단된 버전을 이어서 적재하지 않고 새 버전으로 시작")
+    args = parser.parse_args()
+    main(rebuild=args.rebuild, embedding_model=args.embedding_model, keep_versions=args.keep_versions,
+         resume=not args.fresh)
@@ -6,8 +6,22 @@ from langchain.prompts.chat import (
     HumanMessagePromptTemplate,
 )
 import os
+import time
+import asyncio
+import threading
+from functools import partial
+from concurrent.futures import Future
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
+from langchain_core.prompts import format_document
+from .facility_store import answer_facility_query
+from .doc_metadata import route_query_topic
+from .context_packer import ContextPacker, PackedRetriever
+from .answer_cache import SemanticAnswerCache, profile_key
+from .translation_pipeline import SegmentTranslator, source_list_text, translate_text, atranslate_text
+from .embedding_cache import normalize_text
+from .translation_memory import TranslationMemory
+from .conversation_memory import ConversationStore, format_turns, is_follow_up
 
 def create_llm():
     """LLM 모델 생성"""
@@ -38,18 +52,18 @@ def create_qa_prompt(user_info=None, chat_history=None):
         if parts:
             user_context = "\n\n[사용자 정보]\n" + "\n".join(parts)
 
-    # 이전 대화 기록 구성
+    # 이전 대화 기록 구성 (체인을 여러 세션이 함께 쓰므로 세션별 기록은 요청마다 {history} 로 채움)
     history_context = ""
     if chat_history:
         formatted_history = "\n".join([f"Q: {q}\nA: {a}" for q, a in chat_history[-5:]])
-        history_context = f"\n\n[이전 대화]\n{formatted_history}"
+        history_context = f"[이전 대화]\n{formatted_history}"
 
     # System 프롬프트
     system_template = f"""
     당신은 '마주봄'이라는 AI 상담사입니다. 다문화 가정에게 복지, 정책, 법률 정보를 쉽고 친절하게 제공합니다.
 
     {user_context}
-    {history_context}
+    {{history}}
 
     사용자의 질문에 대한 답변을 최우선으로 하며, 필요시 이전 대화를 참고하여 중복되지 않게 답변하세요.
     사용자의 체류 자격, 가족 구성, 거주 지역 등의 정보를 기반으로 맞춤형 답변을 제공합니다.
@@ -86,7 +100,7 @@ def create_qa_prompt(user_info=None, chat_history=None):
         HumanMessagePromptTemplate.from_template(human_template),
     ]
 
-    return ChatPromptTemplate.from_messages(messages)
+    return ChatPromptTemplate.from_messages(messages).partial(history=history_context)
 
 
 def create_qa_chain(retriever, user_info=None):
@@ -101,6 +115,39 @@ def create_qa_chain(retriever, user_info=None):
         return_source_documents=True
     )
 
+# 벡터 스토어 컬렉션 별칭과 새 버전 전환 여부 확인 주기(초)
+COLLECTION_ALIAS = "laws_db"
+ALIAS_CHECK_INTERVAL = 30
+SEARCH_EF = 64
+# 검색 방식 (hybrid: BM25 + 벡터 RRF 병합, lexical: BM25 만, vector: 벡터만)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# 벡터 검색이 이 시간(초) 안에 끝나지 않으면 BM25 결과로 답변
+VECTOR_SEARCH_TIMEOUT = 5.0
+# 벡터 검색을 프로세스 메모리 복제본에서 수행 (DB 는 복제본 로드 실패/검색 오류 시에만 사용)
+USE_VECTOR_REPLICA = os.getenv("USE_VECTOR_REPLICA", "1") == "1"
+# 복제본 벡터 압축 방식 (float16 / int8 / pca128 등, 비우면 float32 그대로) — scripts/compression_report.py 로 비교
+VECTOR_COMPRESSION = os.getenv("VECTOR_COMPRESSION") or None
+# 프롬프트에 넣는 검색 문서의 토큰 상한 (중복 구간/관련 낮은 청크를 뺀 뒤 이 안에 채움)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# 의미 기반 답변 캐시: 질문 임베딩 코사인 유사도가 이 값 이상이면 저장된 답변 사용 (e5 는 유사도가 전반적으로 높아 기준을 높게)
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = 3600
+ANSWER_CACHE_SIZE = 1000
+# 세션별 대화 기록: 최근 턴은 그대로, 오래된 턴은 요약해서 프롬프트에 최대 HISTORY_TOKEN_BUDGET 토큰만 넣음
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+HISTORY_SUMMARY_TOKENS = 300
+HISTORY_RECENT_TURNS = 3
+HISTORY_MAX_TURNS = 12
+HISTORY_MAX_BYTES = 32_000
+# 이 시간(초) 동안 질문이 없는 세션의 대화 기록은 삭제
+SESSION_IDLE_TTL = 1800
+MAX_SESSIONS = 1000
+# 세그먼트 번역 메모리 최대 항목 수 (언어별 세그먼트 합계, .cache/translations.sqlite)
+TRANSLATION_MEMORY_SIZE = int(os.getenv("TRANSLATION_MEMORY_SIZE", "100000"))
+
+class _InflightCancelled(Exception):
+    """aget_response 에서 함께 기다리던 계산이 끝나지 못함 (이벤트 루프 종료 등) — 기다리던 요청이 다시 계산"""
+
 class RAGModel:
     _instance = None  # 싱글톤 패턴 적용
     
@@ -113,16 +160,15 @@ class RAGModel:
     def __init__(self):
         # 최초 한 번만 초기화
         if not self.initialized:
-            from RAG_chatbot.vector_store import create_vector_store, create_retriever
-            
-            # 기존 벡터 스토어에 접속만 함 (생성 X)
-            vector_store = create_vector_store(documents=None)
-            
-            # 검색기 생성
-            self.retriever = create_retriever(vector_store)
-            
-            # QA 체인 생성
-            self.qa_chain = create_qa_chain(self.retriever)
+            # 검색 문서 정리 단계 (요청별 절약한 토큰 기록, 재접속해도 유지)
+            self.context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+            # 모든 세션이 함께 쓰는 답변 캐시 (문서 버전이 바뀌면 비움)
+            self.answer_cache = SemanticAnswerCache(
+                threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, maxsize=ANSWER_CACHE_SIZE
+            )
+
+            # 벡터 스토어 접속 및 QA 체인 생성
+            self._connect()
             
             # 번역용 별도 LLM 객체 생성
             self.translation_llm = ChatOpenAI(
@@ -131,12 +177,124 @@ class RAGModel:
             # openai_api_base="https://openrouter.ai/api/v1",
             openai_api_key=os.getenv("OPENAI_API_KEY")
         )
+            # 반복되는 답변 세그먼트의 번역 재사용 (프로세스 재시작 후에도 유지)
+            self.translation_memory = TranslationMemory(max_entries=TRANSLATION_MEMORY_SIZE)
+            # aget_response 에서 진행 중인 요청 ((정규화 질문, 사용자 정보) → Future), 합쳐진 요청 수
+            self._inflight = {}
+            self._inflight_lock = threading.Lock()
+            self.coalesced_requests = 0
             
-            self.chat_history = []
+            # 세션별 대화 기록 (오래된 턴은 요약 LLM 으로 줄여서 보관)
+            self.summary_llm = create_llm()
+            self.conversations = ConversationStore(
+                summarizer=self._summarize_conversation,
+                max_sessions=MAX_SESSIONS,
+                idle_ttl=SESSION_IDLE_TTL,
+                recent_turns=HISTORY_RECENT_TURNS,
+                max_turns=HISTORY_MAX_TURNS,
+                max_bytes=HISTORY_MAX_BYTES,
+                summary_tokens=HISTORY_SUMMARY_TOKENS,
+            )
             self.initialized = True
+
+    def _connect(self):
+        from .vector_store import create_vector_store, load_lexical_index, load_vector_replica, get_collection_fingerprint
+
+        # 기존 벡터 스토어에 접속만 함 (생성 X, 별칭이 가리키는 현재 버전)
+        vector_store = create_vector_store(documents=None, collection_name=COLLECTION_ALIAS)
+        self.collection_name = vector_store.collection_name
+        self._alias_checked_at = time.monotonic()
+
+        self.vector_store = vector_store
+        # 컬렉션 전체(id, 임베딩, 메타데이터)를 메모리 복제본으로 한 번 로드
+        self.replica = None
+        if USE_VECTOR_REPLICA:
+            try:
+                self.replica = load_vector_replica(vector_store, compression=VECTOR_COMPRESSION)
+            except Exception as e:
+                print(f"벡터 복제본 로드 오류 (DB 검색 사용): {e}")
+        # 컬렉션 내용 지문 (증분 적재 감지 및 답변 캐시 무효화 기준, 복제본이 없으면 BM25 인덱스 로드 전에 DB 에서 계산)
+        if self.replica is not None:
+            self.fingerprint = self.replica.fingerprint
+        else:
+            self.fingerprint = get_collection_fingerprint(self.collection_name)
+        # 같은 컬렉션 청크로 BM25 인덱스 구성
+        self.lexical_index = load_lexical_index(self.collection_name, replica=self.replica)
+
+        # 검색기 생성 (BM25 + 벡터 검색, HNSW 인덱스 검색 범위 ef_search)
+        self.retriever = self._create_retriever()
+
+        # QA 체인 생성
+        self.qa_chain = create_qa_chain(self.retriever)
+        # 주제별로 검색 범위를 좁힌 QA 체인 (처음 쓰일 때 생성)
+        self.topic_chains = {}
+
+    def _qa_chain_for(self, query):
+        """체류/비자 질문처럼 주제가 분명하면 그 주제 문서만 검색하는 체인, 아니면 전체 검색 체인"""
+        topic = route_query_topic(query)
+        if topic is None:
+            return self.qa_chain
+        if topic not in self.topic_chains:
+            from .vector_store import build_metadata_filter
+
+            retriever = self._create_retriever(metadata_filter=build_metadata_filter(topic=topic))
+            self.topic_chains[topic] = create_qa_chain(retriever)
+        return self.topic_chains[topic]
+
+    def _create_retriever(self, metadata_filter=None):
+        from .vector_store import create_hybrid_retriever
+
+        retriever = create_hybrid_retriever(
+            self.vector_store,
+            self.lexical_index,
+            mode=RETRIEVAL_MODE,
+            vector_timeout=VECTOR_SEARCH_TIMEOUT,
+            ef_search=SEARCH_EF,
+            metadata_filter=metadata_filter,
+            replica=self.replica,
+        )
+        # 검색 결과를 토큰 예산 안으로 정리한 뒤 'stuff' 프롬프트에 넣음
+        return PackedRetriever(retriever=retriever, packer=self.context_packer)
+
+    def _refresh_collection(self):
+        """
+        적재 스크립트가 별칭을 새 버전으로 전환했으면 재시작 없이 새 버전으로 다시 접속
+        같은 버전에 증분 적재된 경우(컬렉션 지문 변경)에도 복제본/BM25 인덱스를 다시 로드
+        """
+        if time.monotonic() - self._alias_checked_at < ALIAS_CHECK_INTERVAL:
+            return
+        from .vector_store import resolve_alias, get_collection_fingerprint
+
+        self._alias_checked_at = time.monotonic()
+        try:
+            if resolve_alias(COLLECTION_ALIAS) != self.collection_name:
+                self._connect()
+                print(f"벡터 스토어 전환: {self.collection_name}")
+            elif get_collection_fingerprint(self.collection_name) != self.fingerprint:
+                self._connect()
+                print(f"컬렉션 내용 변경으로 검색 인덱스 갱신: {self.collection_name}")
+        except Exception as e:
+            print(f"컬렉션 별칭 확인 오류: {e}")
     
-    def get_response(self, query, user_info=None):
-        # 사용자 정보를 기반으로 쿼리 증강
+    def _corpus_version(self):
+        """답변 캐시 무효화 기준: 컬렉션 버전 + 내용 지문 (같은 버전에 증분 적재해도 달라짐)"""
+        return f"{self.collection_name}:{self.fingerprint}"
+
+    def get_cached_response(self, query, user_info=None, session_id=None):
+        """비슷한 질문(같은 사용자 정보)에 대한 답변이 캐시에 있으면 재사용, 없으면 답변 생성 후 저장"""
+        return self._final_answer(self.stream_response(query, user_info, use_cache=True, session_id=session_id))
+
+    def get_response(self, query, user_info=None, session_id=None):
+        return self._final_answer(self.stream_response(query, user_info, use_cache=False, session_id=session_id))
+
+    @staticmethod
+    def _final_answer(events):
+        for event, value in events:
+            if event == "done":
+                return value
+
+    def _augment_query(self, query, user_info):
+        """사용자 정보를 기반으로 쿼리 증강"""
         augmented_query = f"{query} {user_info['residence_area']} 지역"
         if user_info:
             parts = []
@@ -152,13 +310,11 @@ class RAGModel:
             if user_info.get('interests'):
                 interests_str = ", ".join(user_info['interests'])
                 augmented_query += f" (관심 분야: {interests_str})"
-        
-        # 응답 생성
-        response = self.qa_chain.invoke(augmented_query)
-        answer = response["result"]
+        return augmented_query
 
-        # 🔽 사용된 문서 제목 추출
-        sources = response.get("source_documents", [])
+    @staticmethod
+    def _source_titles(sources):
+        """사용된 문서 제목 추출"""
         titles = []
         for doc in sources:
             title = doc.metadata.get("source") or doc.metadata.get("title")
@@ -167,41 +323,264 @@ class RAGModel:
                 title = os.path.splitext(os.path.basename(title))[0]
                 if title not in titles:
                     titles.append(title)
-        if titles:
-            source_text = "\n\n📚 참고한 문서:\n" + "\n".join(f"- {t}" for t in titles)
-            answer += source_text
-        
-            # ✅ 번역 로직 추가
-        if user_info:
-            preferred_lang = user_info.get('preferred_language', '한국어')
-            if preferred_lang != "한국어":
-                lang_map = {
-                    "영어": "English",
-                    "중국어": "Chinese",
-                    "베트남어": "Vietnamese",
-                    "타갈로그어": "Tagalog",
-                    "우즈베크어": "Uzbek",
-                    "태국어": "Thai",
-                    "몽골어": "Mongolian",
-                    "태국어": "Thai",
-                    "우즈베크어": "Uzbek"
-                }
-                target_lang = lang_map.get(preferred_lang, "English")
+        return titles
+
+    @staticmethod
+    def _target_language(user_info):
+        """번역할 언어 (한국어 사용자면 None)"""
+        if not user_info:
+            return None
+        preferred_lang = user_info.get('preferred_language', '한국어')
+        if preferred_lang == "한국어":
+            return None
+        lang_map = {
+            "영어": "English",
+            "중국어": "Chinese",
+            "베트남어": "Vietnamese",
+            "타갈로그어": "Tagalog",
+            "우즈베크어": "Uzbek",
+            "태국어": "Thai",
+            "몽골어": "Mongolian",
+            "태국어": "Thai",
+            "우즈베크어": "Uzbek"
+        }
+        return lang_map.get(preferred_lang, "English")
+
+    @staticmethod
+    def _qa_messages(stuff_chain, sources, augmented_query, history=""):
+        """'stuff' 체인과 같은 방식으로 검색 문서(+ 세션 대화 기록)를 프롬프트에 넣은 메시지"""
+        context = stuff_chain.document_separator.join(
+            format_document(doc, stuff_chain.document_prompt) for doc in sources
+        )
+        return stuff_chain.llm_chain.prompt.format_messages(
+            **{stuff_chain.document_variable_name: context, "question": augmented_query, "history": history}
+        )
+
+    def _stream_answer(self, query, augmented_query, default_region=None, history=""):
+        """
+        ('sources', 제목 목록) 을 먼저 내보낸 뒤 ('answer', 토큰) 들을 생성 (참고 문서 목록은 stream_response 에서 붙임)
+        RetrievalQA 체인의 검색기/프롬프트/LLM 을 그대로 쓰고 LLM 호출만 스트리밍
+        """
+        # 시설 연락처/주소 같은 단순 조회는 시설 테이블에서 바로 답변 (임베딩/검색/LLM 호출 생략)
+        facility_answer = answer_facility_query(query, default_region=default_region)
+        if facility_answer:
+            yield "sources", []
+            yield "answer", facility_answer
+            return
+
+        # 응답 생성 (주제 라우팅은 사용자 정보가 붙지 않은 원래 질문으로 판단)
+        chain = self._qa_chain_for(query)
+        stuff_chain = chain.combine_documents_chain
+        # 검색은 사용자 정보를 붙인 쿼리로, 검색 결과의 관련도 필터는 원래 질문 기준
+        sources = chain.retriever.invoke(augmented_query, config={"metadata": {"question": query}})
+        titles = self._source_titles(sources)
+        yield "sources", titles
+
+        messages = self._qa_messages(stuff_chain, sources, augmented_query, history)
+        for chunk in stuff_chain.llm_chain.llm.stream(messages):
+            if chunk.content:
+                yield "answer", chunk.content
+
+    def _session_history(self, session_id):
+        """(세션 대화 기록, 프롬프트에 넣을 텍스트) — session_id 가 없으면 (None, '')"""
+        if session_id is None:
+            return None, ""
+        memory = self.conversations.get(session_id)
+        return memory, memory.render(HISTORY_TOKEN_BUDGET)
+
+    @staticmethod
+    def _cache_lookup(query, use_cache, history):
+        """답변 캐시를 확인할지 — 이전 대화가 있으면 이어지는 질문이 아닐 때만 (저장은 이전 대화가 없을 때만)"""
+        return use_cache and not (history and is_follow_up(query))
+
+    @staticmethod
+    def _history_answer(answer):
+        """대화 기록에 남길 답변: 번역문과 참고 문서 목록을 뺀 한국어 본문"""
+        answer = answer.split("\n\n---\n[한국어 원문]\n")[-1]
+        return answer.split("\n\n📚 참고한 문서:\n")[0]
 
+    def _summarize_conversation(self, summary, turns, max_tokens):
+        """이전 요약 + 오래된 턴 → 새 요약 (ConversationStore 의 summarizer)"""
+        prompt = (
+            f"다음은 다문화 가정 상담 대화의 이전 요약과 이어진 대화입니다. "
+            f"사용자의 상황(체류 자격, 가족, 지역), 이미 안내한 정책/절차, 아직 해결되지 않은 궁금증 위주로 "
+            f"{max_tokens}토큰 이내의 한국어로 요약해주세요. 요약만 출력하세요.\n\n"
+            f"[이전 요약]\n{summary or '없음'}\n\n[이어진 대화]\n{format_turns(turns)}"
+        )
+        return self.summary_llm.invoke([HumanMessage(content=prompt)]).content
+
+    def stream_response(self, query, user_info=None, use_cache=False, session_id=None):
+        """
+        답변을 생성하면서 (이벤트, 값) 을 차례로 내보내는 제너레이터
+        - ('sources', [문서 제목]) : 검색이 끝나면 LLM 호출 전에 먼저
+        - ('answer', 토큰)         : 한국어 답변 (참고 문서 목록 포함)
+        - ('translation', 토큰)    : 선호 언어가 한국어가 아니면 번역문 (답변 생성 중 완성된 세그먼트부터, 원래 순서대로)
+        - ('done', 최종 답변)      : get_response 와 같은 형식 (번역문 + 한국어 원문)
+        use_cache=True 이면 의미 기반 답변 캐시를 먼저 확인하고 (적중 시 ('answer', 답변) 한 번), 생성한 답변은 저장
+        session_id 가 있으면 그 세션의 이전 대화(요약 + 최근 턴)를 프롬프트에 넣고 이번 턴을 기록
+        (이전 대화가 있으면 이어지는 질문(is_follow_up)만 답변 캐시를 건너뜀 — 대화 맥락과 무관한 질문은 캐시를 확인하되,
+         이전 대화를 넣어 생성한 답변은 맥락이 섞였을 수 있어 저장하지 않음. 지시어 없이 맥락에 기대는 질문이
+         캐시에 적중할 수 있는 대신, 세션을 쓰는 UI 에서도 대화 중 독립적인 질문은 캐시 이득을 봄)
+        """
+        self._refresh_collection()
+        memory, history = self._session_history(session_id)
+
+        embedding = None
+        if self._cache_lookup(query, use_cache, history):
+            try:
+                embedding = self.vector_store.embeddings.embed_query(query)
+            except Exception as e:
+                print(f"답변 캐시 임베딩 오류 (캐시 생략): {e}")
+            if embedding is not None:
+                answer = self.answer_cache.get(query, embedding, user_info, corpus_version=self._corpus_version())
+                if answer is not None:
+                    yield "answer", answer
+                    if memory is not None:
+                        memory.add_turn(query, self._history_answer(answer))
+                    yield "done", answer
+                    return
+
+        augmented_query = self._augment_query(query, user_info)
+        answer = ""
+        titles = []
+        default_region = (user_info or {}).get("residence_area")
+        # ✅ 번역 로직: 답변이 생성되는 동안 완성된 문단/문장부터 동시에 번역 (순서대로 내보냄)
+        target_lang = self._target_language(user_info)
+        translator = SegmentTranslator(self.translation_llm, target_lang, memory=self.translation_memory) if target_lang else None
+        translated = ""
+        for event, value in self._stream_answer(query, augmented_query, default_region, history):
+            if event == "sources":
+                titles = value
+            elif event == "answer":
+                answer += value
+            yield event, value
+            if translator is not None and event == "answer":
                 try:
-                    translated = self._translate_text(answer, target_lang)
-                    answer = f"{translated}\n\n---\n[한국어 원문]\n{answer}"
+                    translator.feed(value)
+                    for token in translator.ready_tokens():
+                        translated += token
+                        yield "translation", token
                 except Exception as e:
                     print(f"번역 오류: {e}")
+                    translator = None
 
-        self.chat_history.append((query, answer))
-        return answer
+        body = answer
+        if titles:
+            source_text = "\n\n" + source_list_text(titles)
+            answer += source_text
+            yield "answer", source_text
+
+        if translator is not None:
+            try:
+                for token in translator.remaining_tokens():
+                    translated += token
+                    yield "translation", token
+                if titles:
+                    # 문서 제목은 번역하지 않음 (목록 제목 줄만 대상 언어로)
+                    source_text = "\n\n" + source_list_text(titles, target_lang)
+                    translated += source_text
+                    yield "translation", source_text
+                print(f"[translation] 세그먼트 {translator.segments}개 번역, {translator.reused}줄 번역 메모리 재사용 ({target_lang})")
+                answer = f"{translated}\n\n---\n[한국어 원문]\n{answer}"
+            except Exception as e:
+                print(f"번역 오류: {e}")
+
+        if memory is not None:
+            memory.add_turn(query, body)
+        if embedding is not None and not history:
+            self.answer_cache.put(query, embedding, answer, user_info, corpus_version=self._corpus_version())
+        yield "done", answer
     
+    async def aget_response(self, query, user_info=None, use_cache=True, session_id=None):
+        """
+        get_cached_response 의 비동기 버전 (검색/LLM/번역을 ainvoke 로 호출해 요청마다 스레드를 붙잡지 않음)
+        같은 질문(정규화) + 같은 사용자 정보 + 같은 이전 대화로 이미 진행 중인 요청이 있으면 새로 계산하지 않고 그 결과를 함께 받음
+        계산은 별도 태스크에서 실행하므로 처음 요청한 쪽이 취소되어도 함께 기다리던 요청은 결과를 받음
+        """
+        memory, history = self._session_history(session_id)
+        key = (normalize_text(query), profile_key(user_info), history)
+        while True:
+            with self._inflight_lock:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    # 세션마다 이벤트 루프가 다를 수 있어 asyncio.Future 대신 스레드 안전한 Future 사용
+                    # (실행 상태로 두어 기다리던 요청이 취소되어도 공유 Future 는 취소되지 않음)
+                    future = self._inflight[key] = Future()
+                    future.set_running_or_notify_cancel()
+                else:
+                    self.coalesced_requests += 1
+            if leader:
+                task = asyncio.ensure_future(self._agenerate(query, user_info, use_cache, history))
+                task.add_done_callback(partial(self._finish_inflight, key, future))
+                answer = await asyncio.shield(task)
+                break
+            try:
+                answer = await asyncio.wrap_future(future)
+                break
+            except _InflightCancelled:
+                # 계산하던 이벤트 루프가 종료되어 결과가 없음 → 이 요청이 다시 계산
+                continue
+        if memory is not None:
+            memory.add_turn(query, self._history_answer(answer))
+        return answer
+
+    def _finish_inflight(self, key, future, task):
+        """계산 태스크가 끝나면 진행 중 목록에서 빼고 함께 기다리던 요청에 결과(또는 오류) 전달"""
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        error = _InflightCancelled() if task.cancelled() else task.exception()
+        if error is None:
+            future.set_result(task.result())
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.set_exception(_InflightCancelled())
+
+    async def _agenerate(self, query, user_info, use_cache, history=""):
+        await asyncio.to_thread(self._refresh_collection)
+
+        embedding = None
+        if self._cache_lookup(query, use_cache, history):
+            try:
+                embedding = await self.vector_store.embeddings.aembed_query(query)
+            except Exception as e:
+                print(f"답변 캐시 임베딩 오류 (캐시 생략): {e}")
+            if embedding is not None:
+                answer = self.answer_cache.get(query, embedding, user_info, corpus_version=self._corpus_version())
+                if answer is not None:
+                    return answer
+
+        augmented_query = self._augment_query(query, user_info)
+        titles = []
+        default_region = (user_info or {}).get("residence_area")
+        answer = await asyncio.to_thread(answer_facility_query, query, default_region=default_region)
+        if not answer:
+            chain = self._qa_chain_for(query)
+            stuff_chain = chain.combine_documents_chain
+            sources = await chain.retriever.ainvoke(augmented_query, config={"metadata": {"question": query}})
+            titles = self._source_titles(sources)
+            message = await stuff_chain.llm_chain.llm.ainvoke(self._qa_messages(stuff_chain, sources, augmented_query, history))
+            answer = message.content
+
+        # ✅ 번역 로직: 참고 문서 목록은 번역하지 않고 제목 줄만 대상 언어로
+        body = answer
+        if titles:
+            answer += "\n\n" + source_list_text(titles)
+        target_lang = self._target_language(user_info)
+        if target_lang:
+            try:
+                translated = await atranslate_text(self.translation_llm, body, target_lang, memory=self.translation_memory)
+                if titles:
+                    translated += "\n\n" + source_list_text(titles, target_lang)
+                answer = f"{translated}\n\n---\n[한국어 원문]\n{answer}"
+            except Exception as e:
+                print(f"번역 오류: {e}")
+
+        if embedding is not None and not history:
+            self.answer_cache.put(query, embedding, answer, user_info, corpus_version=self._corpus_version())
+        return answer
+
     def _translate_text(self, text, target_language):
-        """텍스트를 대상 언어로 번역"""
-        # 번역을 위한 간단한 프롬프트
-        translation_prompt = f"다음 한국어 텍스트를 {target_language}로 정확히 번역해주세요:\n\n{text}"
-        
-        # 별도 생성한 번역용 LLM 사용
-        response = self.translation_llm.invoke([HumanMessage(content=translation_prompt)])
-        return response.content
\ No newline at end of file
+        """텍스트를 대상 언어로 번역 (문단/문장 단위로 나눠 동시에 번역)"""
+        return translate_text(self.translation_llm, text, target_language, memory=self.translation_memory)
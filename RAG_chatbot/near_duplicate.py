@@ -0,0 +1,117 @@
+# RAG_chatbot/near_duplicate.py
+import os
+import zlib
+import threading
+from collections import defaultdict
+import numpy as np
+from .embedding_cache import normalize_text
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# MinHash 해시 함수 (a*x + b) mod p 의 p (2^32 보다 큰 소수, uint64 곱셈이 넘치지 않는 범위)
+_PRIME = np.uint64(4294967311)
+
+
+def shingles(text, size=5):
+    """정규화한 텍스트의 글자 n-gram 해시 집합 (한국어는 띄어쓰기가 흔들려서 공백 제거 후 생성)"""
+    text = normalize_text(text).replace(" ", "")
+    if len(text) <= size:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH 밴딩 기반 근접 중복 청크 인덱스
+    - 청크마다 num_perm 개의 MinHash 서명을 만들고 bands 개 구간으로 나눠 버킷에 등록
+    - 같은 버킷에 걸린 후보 중 추정 자카드 유사도가 threshold 이상이면 중복으로 판단
+    (bands=16, rows=8 이면 유사도 약 0.7 이상부터 후보가 되고 threshold 로 최종 판정)
+    path 를 주면 청크 ID별 서명을 저장/복원하므로, 이전 실행에서 적재된 청크와의 중복도 찾는다.
+    """
+
+    def __init__(self, path=None, threshold=0.85, num_perm=128, bands=16, shingle_size=5, seed=7):
+        if num_perm % bands:
+            raise ValueError("num_perm 은 bands 의 배수여야 합니다.")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self._signatures = {}
+        self._buckets = defaultdict(set)
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def signature(self, text):
+        values = np.fromiter(shingles(text, self.shingle_size), dtype=np.uint64)
+        # (shingle 수, num_perm) 행렬의 열별 최솟값
+        hashed = (np.outer(values, self._a) + self._b) % _PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def find(self, signature):
+        """signature 와 근접 중복인 기존 청크 ID (없으면 None)"""
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            best, best_similarity = None, self.threshold
+            for chunk_id in candidates:
+                similarity = float(np.mean(self._signatures[chunk_id] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = chunk_id, similarity
+            return best
+
+    def add(self, chunk_id, signature):
+        with self._lock:
+            self._signatures[chunk_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets[key].add(chunk_id)
+
+    def remove(self, chunk_ids):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                signature = self._signatures.pop(chunk_id, None)
+                if signature is None:
+                    continue
+                for key in self._band_keys(signature):
+                    self._buckets[key].discard(chunk_id)
+
+    def retain(self, chunk_ids):
+        """chunk_ids 에 없는 항목 제거"""
+        self.remove([chunk_id for chunk_id in list(self._signatures) if chunk_id not in chunk_ids])
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._signatures
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            ids = list(self._signatures)
+            matrix = np.array([self._signatures[chunk_id] for chunk_id in ids], dtype=np.uint32).reshape(len(ids), self.num_perm)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, ids=np.array(ids, dtype=str), signatures=matrix)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        data = np.load(self.path)
+        if data["signatures"].shape[1:] != (self.num_perm,):
+            return  # 설정이 바뀐 인덱스는 버리고 새로 구성
+        for chunk_id, signature in zip(data["ids"].tolist(), data["signatures"]):
+            self.add(chunk_id, signature)
+
+
+def near_duplicate_index_path(collection_name):
+    return os.path.join(CACHE_DIR, f"near_duplicates_{collection_name}.npz")
@@ -0,0 +1,150 @@
+# RAG_chatbot/onnx_embeddings.py
+import os
+import time
+import queue
+import threading
+from functools import lru_cache
+from concurrent.futures import Future
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# scripts/export_onnx_embeddings.py 로 내보낸 모델 위치 (모델별 하위 폴더: model.onnx, model.int8.onnx, tokenizer.json)
+ONNX_MODEL_ROOT = os.getenv("ONNX_MODEL_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "onnx"))
+MAX_SEQ_LENGTH = 512
+
+
+def onnx_model_dir(model_name):
+    return os.path.join(ONNX_MODEL_ROOT, model_name.replace("/", "__"))
+
+
+def onnx_model_path(model_name, quantized=False):
+    return os.path.join(onnx_model_dir(model_name), "model.int8.onnx" if quantized else "model.onnx")
+
+
+def onnx_model_available(model_name, quantized=False):
+    return os.path.exists(onnx_model_path(model_name, quantized)) and os.path.exists(
+        os.path.join(onnx_model_dir(model_name), "tokenizer.json")
+    )
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 임베딩 요청을 모아 한 번에 계산하는 백그라운드 스레드
+    첫 요청이 들어오면 max_wait_ms 동안(또는 max_batch 개가 찰 때까지) 다른 요청을 기다렸다가 함께 실행
+    """
+
+    def __init__(self, encode, max_batch=32, max_wait_ms=3.0):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        """texts 의 임베딩 행렬을 돌려주는 Future"""
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                vectors = self.encode(texts)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(pending)
+            offset = 0
+            for request_texts, future in pending:
+                future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    ONNX Runtime 으로 실행하는 sentence-transformers 호환 임베딩 (torch / sentence-transformers 불필요)
+    - 토크나이저는 tokenizers(Rust) 의 tokenizer.json, 모델은 내보낸 BERT 계열 그래프(last_hidden_state)
+    - mean pooling + L2 정규화 (multilingual-e5 의 sentence-transformers 설정과 동일)
+    - 접두어('query: ' 등)는 붙이지 않음: 기존 HuggingFaceEmbeddings 로 적재한 벡터와 같은 공간을 유지
+    - embed_query 는 MicroBatcher 로 동시 요청을 묶어서 계산, embed_documents 는 길이순으로 정렬해 batch_size 씩 계산
+    """
+
+    def __init__(self, model_name, quantized=False, batch_size=32, max_wait_ms=3.0, intra_op_threads=None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        started = time.perf_counter()
+        self.model_name = model_name
+        self.quantized = quantized
+        self.batch_size = batch_size
+        model_dir = onnx_model_dir(model_name)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        pad_token = "<pad>" if self.tokenizer.token_to_id("<pad>") is not None else "[PAD]"
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(
+            onnx_model_path(model_name, quantized), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {item.name for item in self.session.get_inputs()}
+        self.batcher = MicroBatcher(self._encode_batch, max_batch=batch_size, max_wait_ms=max_wait_ms)
+        print(f"[onnx] {model_name}{' (int8)' if quantized else ''} 로드 ({time.perf_counter() - started:.2f}초)")
+
+    def _encode_batch(self, texts):
+        """texts → (len(texts), dim) float32 정규화 임베딩"""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, inputs)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # 길이가 비슷한 텍스트끼리 묶어 패딩 낭비를 줄이고 원래 순서로 되돌림
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.batcher.submit([text]).result()[0].tolist()
+
+
+@lru_cache(maxsize=None)
+def shared_onnx_embeddings(model_name, quantized=False):
+    """모델별로 프로세스에서 하나만 만드는 ONNX 세션 (벡터 스토어를 다시 만들어도 모델을 다시 읽지 않음)"""
+    return OnnxEmbeddings(model_name, quantized=quantized)
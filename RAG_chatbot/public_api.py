@@ -0,0 +1,182 @@
+# RAG_chatbot/public_api.py
+import os
+import json
+import random
+import asyncio
+import hashlib
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import aiohttp
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "api")
+
+# 재시도 대상 상태 코드 (요청 과다, 일시적 서버 오류)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def odcloud_page(data):
+    """api.odcloud.kr 응답 → (항목 목록, 전체 개수)"""
+    return data.get("data", []), data.get("totalCount", 0)
+
+
+def data_go_kr_page(data):
+    """apis.data.go.kr 응답 → (항목 목록, 전체 개수) / 항목이 하나면 dict 로 오는 경우 처리"""
+    body = data.get("response", {}).get("body", {})
+    items = (body.get("items") or {}).get("item", [])
+    if isinstance(items, dict):
+        items = [items]
+    return items, int(body.get("totalCount") or 0)
+
+
+def retry_after_seconds(value):
+    """Retry-After 헤더 (초 또는 HTTP 날짜) → 대기 시간(초), 해석할 수 없으면 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class _Retry(Exception):
+    """재시도 신호 (delay: 서버가 Retry-After 로 지정한 대기 시간)"""
+
+    def __init__(self, delay=None):
+        super().__init__("retry")
+        self.delay = delay
+
+
+class PublicDataClient:
+    """
+    공공데이터 API 비동기 클라이언트
+    - 커넥션 풀 하나를 공유하고 동시 요청 수를 concurrency 로 제한
+    - 429/5xx/네트워크 오류는 지수 백오프로 재시도
+    - ETag/Last-Modified 조건부 요청 + 디스크 응답 캐시 (304 이면 캐시된 응답 사용)
+    url 을 그대로 받으므로 로컬 스텁 서버 주소로 바꿔서 테스트할 수 있다.
+    """
+
+    def __init__(self, concurrency=4, max_retries=5, backoff_base=0.5, timeout=30, cache_dir=CACHE_DIR):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cache_dir = cache_dir
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=self.timeout,
+            headers={"accept": "*/*"},
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    def _cache_path(self, url, params):
+        """cache_dir=None 이면 응답 캐시를 사용하지 않음"""
+        if not self.cache_dir:
+            return None
+        # 인증키는 캐시 키에서 제외
+        key_params = {k: v for k, v in params.items() if k != "serviceKey"}
+        key = hashlib.sha256(f"{url}?{json.dumps(key_params, sort_keys=True)}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_cache(self, path):
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+            except ValueError:
+                return None
+            return cached if "body" in cached else None
+        return None
+
+    def _write_cache(self, path, response, body):
+        if not path:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "body": body,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def get_json(self, url, params):
+        """GET 요청 하나 (조건부 요청, 재시도 포함)"""
+        cache_path = self._cache_path(url, params)
+        cached = self._read_cache(cache_path)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, params=params, headers=headers) as response:
+                        if response.status == 304:
+                            if cached:
+                                return cached["body"]
+                            # 캐시가 없는데 304 (중간 프록시/CDN 캐시 등) → 조건부 헤더 없이, 캐시 우회를 요청해서 다시 받음
+                            if attempt >= self.max_retries or "Cache-Control" in headers:
+                                raise aiohttp.ClientResponseError(
+                                    response.request_info, response.history, status=304, message="캐시 없이 304 응답"
+                                )
+                            headers = {"Cache-Control": "no-cache"}
+                            raise _Retry(0)
+                        if response.status in RETRY_STATUS and attempt < self.max_retries:
+                            raise _Retry(retry_after_seconds(response.headers.get("Retry-After")))
+                        response.raise_for_status()
+                        # data.go.kr 은 JSON 을 text/html 등으로 내려주는 경우가 있어 content_type 검사 생략
+                        body = await response.json(content_type=None)
+                        self._write_cache(cache_path, response, body)
+                        return body
+            except (_Retry, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = getattr(e, "delay", None)
+                if delay is None:
+                    delay = self.backoff_base * (2 ** attempt) * (1 + random.random())
+                await asyncio.sleep(delay)
+
+    async def fetch_all(self, url, params, parse_page, page_param, size_param, per_page, start_page=1):
+        """
+        첫 페이지로 전체 개수를 확인한 뒤 나머지 페이지를 동시에 요청하여 모든 항목 반환
+        parse_page(응답) → (항목 목록, 전체 개수)
+        """
+        first = await self.get_json(url, {**params, page_param: start_page, size_param: per_page})
+        items, total_count = parse_page(first)
+        items = list(items)
+        last_page = max(start_page, -(-total_count // per_page))
+
+        pages = await asyncio.gather(*[
+            self.get_json(url, {**params, page_param: page, size_param: per_page})
+            for page in range(start_page + 1, last_page + 1)
+        ])
+        for page in pages:
+            items.extend(parse_page(page)[0])
+        return items
+
+
+def fetch_all_pages(url, params, parse_page, page_param="page", size_param="perPage", per_page=1000, start_page=1, **client_options):
+    """동기 코드(적재 스크립트)에서 사용하는 fetch_all 래퍼"""
+    async def run():
+        async with PublicDataClient(**client_options) as client:
+            return await client.fetch_all(url, params, parse_page, page_param, size_param, per_page, start_page)
+
+    return asyncio.run(run())
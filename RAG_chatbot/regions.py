@@ -0,0 +1,98 @@
+# RAG_chatbot/regions.py
+import re
+
+# 광역시도 정식 명칭 → 약칭 (주소, 사용자 입력 모두 약칭으로 통일)
+SIDO_ALIASES = {
+    "서울특별시": "서울", "서울시": "서울",
+    "부산광역시": "부산", "부산시": "부산",
+    "대구광역시": "대구", "대구시": "대구",
+    "인천광역시": "인천", "인천시": "인천",
+    "광주광역시": "광주",
+    "대전광역시": "대전", "대전시": "대전",
+    "울산광역시": "울산", "울산시": "울산",
+    "세종특별자치시": "세종", "세종시": "세종",
+    "경기도": "경기",
+    "강원도": "강원", "강원특별자치도": "강원",
+    "충청북도": "충북",
+    "충청남도": "충남",
+    "전라북도": "전북", "전북특별자치도": "전북",
+    "전라남도": "전남",
+    "경상북도": "경북",
+    "경상남도": "경남",
+    "제주도": "제주", "제주특별자치도": "제주",
+}
+SIDO_NAMES = {"서울", "부산", "대구", "인천", "광주", "대전", "울산", "세종",
+              "경기", "강원", "충북", "충남", "전북", "전남", "경북", "경남", "제주"}
+
+
+def normalize_sido(name):
+    """'서울특별시' / '서울시' / '서울' → '서울' (광역시도가 아니면 None)"""
+    if not name:
+        return None
+    name = name.strip()
+    name = SIDO_ALIASES.get(name, name)
+    return name if name in SIDO_NAMES else None
+
+
+def split_region(address):
+    """주소 앞부분에서 (시도, 시군구) 추출"""
+    tokens = (address or "").split()
+    if not tokens:
+        return None, None
+    sido = normalize_sido(tokens[0])
+    if sido is None:
+        return None, None
+    sigungu = tokens[1] if len(tokens) > 1 and re.search(r"(시|군|구)$", tokens[1]) else None
+    return sido, sigungu
+
+
+def parse_region_query(region):
+    """'서울 구로구' / '구로구' / '서울특별시' / '구로구 가족센터' → (시도, 시군구)"""
+    sido = sigungu = None
+    for token in (region or "").split():
+        if normalize_sido(token):
+            sido = normalize_sido(token)
+        elif re.search(r"(시|군|구)$", token):
+            sigungu = token
+    return sido, sigungu
+
+
+# 광역시도 대표 좌표 (시도청 소재지, 위도/경도) — 좌표가 없는 시설/사용자 위치를 시도 단위로 추정할 때 사용
+SIDO_CENTROIDS = {
+    "서울": (37.5665, 126.9780), "부산": (35.1796, 129.0756), "대구": (35.8714, 128.6014),
+    "인천": (37.4563, 126.7052), "광주": (35.1595, 126.8526), "대전": (36.3504, 127.3845),
+    "울산": (35.5384, 129.3114), "세종": (36.4800, 127.2890), "경기": (37.2752, 127.0095),
+    "강원": (37.8853, 127.7298), "충북": (36.6357, 127.4915), "충남": (36.6588, 126.6728),
+    "전북": (35.8202, 127.1089), "전남": (34.8161, 126.4629), "경북": (36.5760, 128.5056),
+    "경남": (35.2383, 128.6925), "제주": (33.4890, 126.4983),
+}
+
+# 좌표 검증 범위 (대한민국 위도/경도)
+KOREA_LAT = (33.0, 39.0)
+KOREA_LON = (124.0, 132.0)
+# API 항목의 좌표 키 (정확히 같은 이름만, 'lot' 이 'lotnoAddr' 에 부분 일치하지 않도록)
+LATITUDE_KEYS = ("lat", "latitude", "위도")
+LONGITUDE_KEYS = ("lot", "lon", "lng", "longitude", "경도")
+
+
+def parse_coordinates(item):
+    """API 항목 → (위도, 경도), 없거나 범위를 벗어나면 (None, None)"""
+    values = {str(key).lower(): value for key, value in (item or {}).items()}
+
+    def pick(keys):
+        for key in keys:
+            try:
+                return float(values[key.lower()])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return None
+
+    lat, lon = pick(LATITUDE_KEYS), pick(LONGITUDE_KEYS)
+    if lat is None or lon is None:
+        return None, None
+    if not (KOREA_LAT[0] <= lat <= KOREA_LAT[1] and KOREA_LON[0] <= lon <= KOREA_LON[1]):
+        # 위도/경도를 바꿔 넣은 데이터
+        lat, lon = lon, lat
+        if not (KOREA_LAT[0] <= lat <= KOREA_LAT[1] and KOREA_LON[0] <= lon <= KOREA_LON[1]):
+            return None, None
+    return lat, lon
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+QUESTIONS = [
+    "결혼이민자 국적 취득 요건이 어떻게 되나요?",
+    "F-6 비자 체류기간 연장은 어떻게 하나요?",
+    "외국인등록증을 잃어버렸어요. 재발급 절차가 궁금해요",
+    "다문화가족지원센터에서 한국어 교육을 받으려면 어떻게 신청하나요?",
+    "아이 어린이집 보육료 지원 대상인가요?",
+    "가정폭력 피해를 입었을 때 도움을 받을 수 있는 곳이 있나요?",
+    "임신 출산 진료비 지원은 어떻게 받나요?",
+    "건강보험 외국인 지역가입자 보험료는 얼마인가요?",
+]
+
+
+def session_requests(sessions, distinct):
+    """
+    세션 수만큼 (질문, 사용자 정보) — 서로 다른 질문 distinct 개를 돌려 써서 같은 질문이 동시에 들어오게 함
+    distinct 가 QUESTIONS 보다 많으면 번호를 붙여 서로 다른 질문으로 만듦
+    """
+    user_info = {"residence_area": "서울", "visa_status": "결혼이민(F-6)", "preferred_language": "영어"}
+    questions = [
+        QUESTIONS[i % len(QUESTIONS)] + (f" ({i // len(QUESTIONS) + 1})" if i >= len(QUESTIONS) else "")
+        for i in range(distinct)
+    ]
+    return [(questions[i % distinct], user_info) for i in range(sessions)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_threads(model, requests):
+    """기존 방식: 세션마다 스레드 하나가 get_response 동안 블로킹"""
+    latencies = []
+
+    def timed(request):
+        started = time.perf_counter()
+        model.get_response(*request)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        list(executor.map(timed, requests))
+    return time.perf_counter() - started, latencies
+
+
+async def run_async(model, requests):
+    """aget_response: 한 이벤트 루프에서 동시에 실행, 같은 질문은 진행 중인 요청에 합쳐짐"""
+    latencies = []
+
+    async def timed(request):
+        started = time.perf_counter()
+        await model.aget_response(*request, use_cache=False)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(request) for request in requests))
+    return time.perf_counter() - started, latencies
+
+
+def measure(model, name, requests, rounds):
+    """(처리량, p50, p99, 합쳐진 요청 수)"""
+    elapsed, latencies = 0.0, []
+    coalesced_before = model.coalesced_requests
+    for _ in range(rounds):
+        if name == "thread":
+            round_elapsed, round_latencies = run_threads(model, requests)
+        else:
+            round_elapsed, round_latencies = asyncio.run(run_async(model, requests))
+        elapsed += round_elapsed
+        latencies += round_latencies
+    return (
+        len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 99),
+        model.coalesced_requests - coalesced_before,
+    )
+
+
+def main(sessions=16, distinct=4, rounds=1):
+    """
+    두 경우를 따로 측정해서 비동기 처리 자체의 효과와 같은 질문 합치기 효과를 구분
+    - 서로 다른 질문 sessions 개: 합쳐질 요청이 없으므로 thread 대비 async 차이는 비동기 처리 효과만
+    - 서로 다른 질문 distinct 개 (distinct < sessions): 위 async 대비 차이가 요청 합치기 효과
+    """
+    from RAG_chatbot.model import RAGModel
+
+    model = RAGModel()
+    # 번역 메모리가 먼저 실행한 방식의 번역을 재사용하지 않도록 측정 중에는 끔
+    model.translation_memory = None
+    model.get_response(*session_requests(1, 1)[0])  # 검색 인덱스/모델 로드는 측정에서 제외
+
+    scenarios = [sessions] + ([distinct] if distinct < sessions else [])
+    results = {}
+    for scenario in scenarios:
+        requests = session_requests(sessions, scenario)
+        print(f"\n동시 세션 {sessions}개, 서로 다른 질문 {scenario}개, {rounds}회 반복")
+        print(f"{'방식':<10} {'처리량(QPS)':>11} {'p50(초)':>9} {'p99(초)':>9} {'합쳐진 요청':>10}")
+        for name in ("thread", "async"):
+            qps, p50, p99, coalesced = results[scenario, name] = measure(model, name, requests, rounds)
+            print(f"{name:<10} {qps:11.2f} {p50:9.2f} {p99:9.2f} {coalesced:10d}")
+
+    print(f"\n비동기 처리 효과 (질문이 모두 다를 때 async / thread): {results[sessions, 'async'][0] / results[sessions, 'thread'][0]:.2f}배")
+    if distinct < sessions:
+        print(
+            f"요청 합치기 효과 (질문 {distinct}개 async / 질문 {sessions}개 async): "
+            f"{results[distinct, 'async'][0] / results[sessions, 'async'][0]:.2f}배"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="동시 세션에서 get_response(스레드) 와 aget_response(비동기 + 요청 합치기) 처리량 비교")
+    parser.add_argument("--sessions", type=int, default=16, help="동시 세션 수")
+    parser.add_argument("--distinct", type=int, default=4, help="서로 다른 질문 수 (세션 수보다 작으면 같은 질문이 동시에 들어옴)")
+    parser.add_argument("--rounds", type=int, default=1, help="반복 횟수")
+    args = parser.parse_args()
+    main(sessions=args.sessions, distinct=min(args.distinct, args.sessions), rounds=args.rounds)
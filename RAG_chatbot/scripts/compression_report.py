@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from RAG_chatbot.vector_store import (
+    create_vector_store,
+    load_vector_replica,
+    ensure_vector_index,
+    halfvec_search,
+    vector_search,
+    pgvector_version,
+    HALFVEC_MIN_VERSION,
+)
+from RAG_chatbot.vector_replica import VectorReplica
+
+# 실제 사용자 질문 유형의 평가 쿼리 (여기에 코퍼스 청크 앞부분을 질문처럼 샘플링해 추가)
+QUESTIONS = [
+    "결혼이민자 국적 취득 요건",
+    "F-6 비자 체류기간 연장 방법",
+    "외국인등록증 재발급 절차",
+    "영주권 신청 자격",
+    "다문화가족지원센터 연락처",
+    "한국어 교육 프로그램 신청",
+    "아이 어린이집 보육료 지원",
+    "임신 출산 진료비 지원",
+    "육아휴직 급여 신청",
+    "가정폭력 피해자 보호 시설",
+    "이혼 후 자녀 양육권",
+    "기초생활수급자 신청 조건",
+    "건강보험 외국인 가입",
+    "긴급복지지원 대상",
+    "한부모가족 지원 내용",
+    "고용보험 실업급여",
+    "장애인 복지 서비스",
+    "통번역 지원 서비스 이용",
+    "부모님 한국 초청 비자",
+    "사회통합프로그램 이수 혜택",
+]
+
+DEFAULT_COMPRESSIONS = ["float16", "int8", "pca128", "pca64"]
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000 if samples else 0.0
+
+
+def evaluate(search, queries, truth, ks):
+    """search(쿼리 벡터, k) → id 목록 / truth: 쿼리별 정확한 상위 id 목록"""
+    max_k = max(ks)
+    recalls = {k: [] for k in ks}
+    latencies = []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query, max_k)
+        latencies.append(time.perf_counter() - started)
+        for k in ks:
+            recalls[k].append(len(set(found[:k]) & set(expected[:k])) / k)
+    return {k: float(np.mean(values)) for k, values in recalls.items()}, latencies
+
+
+def print_row(name, memory_bytes, recalls, latencies, ks):
+    recall_text = "  ".join(f"R@{k}={recalls[k]:.3f}" for k in ks)
+    memory_text = f"{memory_bytes / 1024 / 1024:8.2f}MB" if memory_bytes is not None else "       -  "
+    print(f"{name:<24} {memory_text}  {recall_text}  평균 {np.mean(latencies) * 1000:7.3f}ms  p95 {percentile_ms(latencies, 95):7.3f}ms")
+
+
+def main(ks=(5, 10), samples=200, rescore_k=50, compressions=None, pg=False, seed=7):
+    compressions = compressions or DEFAULT_COMPRESSIONS
+    vector_store = create_vector_store(collection_name="laws_db")
+    baseline = load_vector_replica(vector_store)
+    print(f"컬렉션 {vector_store.collection_name}: {len(baseline)}개, {baseline.vectors.shape[1]}차원")
+
+    # 평가 쿼리: 고정 질문 + 청크 앞부분 샘플
+    rng = random.Random(seed)
+    texts = [text[:120] for text in rng.sample(baseline.texts, min(samples, len(baseline.texts)))]
+    query_texts = QUESTIONS + texts
+    queries = [np.asarray(vector_store.embeddings.embed_query(text), dtype=np.float32) for text in query_texts]
+
+    max_k = max(ks)
+    truth = [
+        [doc.id for doc, _ in baseline.similarity_search_with_score_by_vector(query, k=max_k)]
+        for query in queries
+    ]
+
+    print(f"\n쿼리 {len(queries)}개, 기준: float32 정확 검색")
+    print("-" * 100)
+    recalls, latencies = evaluate(
+        lambda query, k: [doc.id for doc, _ in baseline.similarity_search_with_score_by_vector(query, k=k)],
+        queries, truth, ks,
+    )
+    print_row("float32 (기준)", baseline.memory_bytes(), recalls, latencies, ks)
+
+    for compression in compressions:
+        for rescore in (0, rescore_k):
+            replica = VectorReplica(
+                baseline.collection_name, baseline.fingerprint, baseline.ids, baseline.vectors,
+                baseline.texts, baseline.metadatas, distance_strategy=baseline.distance_strategy,
+                compression=compression, rescore_k=rescore, normalized=True,
+            )
+            recalls, latencies = evaluate(
+                lambda query, k: [doc.id for doc, _ in replica.similarity_search_with_score_by_vector(query, k=k)],
+                queries, truth, ks,
+            )
+            label = f"{compression} + 재정렬 {rescore}" if rescore else f"{compression}"
+            # 압축 코드만 메모리에 두는 경우의 크기 (원래 벡터는 스냅샷 메모리 매핑)
+            print_row(label, replica.codes.nbytes, recalls, latencies, ks)
+
+    if pg:
+        print("-" * 100)
+        recalls, latencies = evaluate(
+            lambda query, k: [doc.id for doc, _ in vector_search(vector_store, query.tolist(), k=k)],
+            queries, truth, ks,
+        )
+        print_row("Postgres vector (HNSW)", None, recalls, latencies, ks)
+        version = pgvector_version()
+        if version < HALFVEC_MIN_VERSION:
+            print(f"Postgres halfvec: pgvector {'.'.join(map(str, version))} 에서는 지원하지 않아 생략")
+        else:
+            ensure_vector_index(vector_store, precision="halfvec")
+            recalls, latencies = evaluate(
+                lambda query, k: [doc.id for doc, _ in halfvec_search(vector_store, query.tolist(), k=k, rescore_k=rescore_k)],
+                queries, truth, ks,
+            )
+            print_row(f"Postgres halfvec + 재정렬 {rescore_k}", None, recalls, latencies, ks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벡터 압축 방식별 recall@k / 지연 시간 비교")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10], help="recall 을 계산할 k 값들")
+    parser.add_argument("--samples", type=int, default=200, help="청크에서 샘플링할 추가 쿼리 수")
+    parser.add_argument("--rescore-k", type=int, default=50, help="재정렬할 후보 수")
+    parser.add_argument("--compression", nargs="+", default=None, help="비교할 압축 방식 (float16 int8 pca128 ...)")
+    parser.add_argument("--pg", action="store_true", help="Postgres vector / halfvec 검색도 비교")
+    args = parser.parse_args()
+    main(ks=args.k, samples=args.samples, rescore_k=args.rescore_k, compressions=args.compression, pg=args.pg)
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+QUERIES = [
+    "결혼이민자 국적 취득 요건",
+    "F-6 비자 체류기간 연장 방법",
+    "외국인등록증 재발급 절차",
+    "다문화가족지원센터 한국어 교육 신청",
+    "아이 어린이집 보육료 지원 대상",
+    "임신 출산 진료비 지원은 어떻게 받나요?",
+    "가정폭력 피해를 입었을 때 도움을 받을 수 있는 곳",
+    "건강보험 외국인 지역가입자 보험료",
+]
+
+
+def run_worker(backend, rounds, concurrency):
+    """한 가지 방식을 현재 프로세스에서 측정 (모델 로드 전후 RSS 를 재기 위해 방식별로 별도 프로세스에서 실행)"""
+    import psutil
+    import numpy as np
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    started = time.perf_counter()
+    from RAG_chatbot.vector_store import create_embeddings, EMBEDDING_MODEL
+    from RAG_chatbot.onnx_embeddings import onnx_model_available
+
+    if backend != "torch" and not onnx_model_available(EMBEDDING_MODEL, quantized=backend == "onnx-int8"):
+        # create_embeddings 는 torch 로 대체하므로 측정 결과가 섞이지 않게 중단
+        sys.exit("ONNX 모델이 없습니다 (scripts/export_onnx_embeddings.py 로 생성)")
+
+    # 캐시를 끄고 모델 자체를 측정, 첫 호출(그래프 초기화)까지 로드 시간에 포함
+    embeddings = create_embeddings(EMBEDDING_MODEL, use_cache=False, backend=backend)
+    embeddings.embed_query(QUERIES[0])
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        embeddings.embed_query(f"{QUERIES[i % len(QUERIES)]} {i}")
+        latencies.append(time.perf_counter() - started)
+
+    # 동시 요청: ONNX 는 MicroBatcher 가 묶어서 처리
+    concurrent_latencies = []
+
+    def timed(text):
+        started = time.perf_counter()
+        embeddings.embed_query(text)
+        concurrent_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, [f"{QUERIES[i % len(QUERIES)]} #{i}" for i in range(rounds)]))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "concurrent_p50_ms": float(np.percentile(concurrent_latencies, 50)) * 1000,
+        "concurrent_p99_ms": float(np.percentile(concurrent_latencies, 99)) * 1000,
+        "concurrent_qps": rounds / elapsed,
+        "rss_mb": (process.memory_info().rss - rss_before) / 1024 / 1024,
+    }
+
+
+def main(backends, rounds=200, concurrency=8):
+    print(f"쿼리 {rounds}개 (순차 1건씩 / 동시 {concurrency}개 스레드)")
+    print(f"{'방식':<10} {'로드(초)':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'동시 p50':>9} {'동시 p99':>9} {'동시 QPS':>9} {'RSS 증가(MB)':>12}")
+    for backend in backends:
+        # 방식마다 새 프로세스에서 측정 (import / 모델 로드 비용과 메모리를 서로 섞지 않음)
+        result = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--rounds", str(rounds), "--concurrency", str(concurrency)],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"{backend:<10} 실행 실패: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode}")
+            continue
+        row = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{backend:<10} {row['load_seconds']:8.2f} {row['p50_ms']:9.2f} {row['p99_ms']:9.2f} "
+            f"{row['concurrent_p50_ms']:9.2f} {row['concurrent_p99_ms']:9.2f} {row['concurrent_qps']:9.1f} {row['rss_mb']:12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 방식(torch / onnx / onnx-int8) 로드 시간, 지연 시간, 메모리 비교")
+    parser.add_argument("--backend", nargs="+", default=["torch", "onnx", "onnx-int8"], help="비교할 방식")
+    parser.add_argument("--rounds", type=int, default=200, help="측정할 쿼리 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 스레드 수")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.rounds, args.concurrency)))
+    else:
+        main(args.backend, rounds=args.rounds, concurrency=args.concurrency)
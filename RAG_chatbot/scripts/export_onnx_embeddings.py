@@ -0,0 +1,81 @@
+import os
+import sys
+import argparse
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from RAG_chatbot.vector_store import EMBEDDING_MODEL
+from RAG_chatbot.onnx_embeddings import OnnxEmbeddings, onnx_model_dir, onnx_model_path
+
+# 내보낸 모델이 torch 결과와 같은지 확인하는 문장
+CHECK_TEXTS = [
+    "결혼이민자 국적 취득 요건",
+    "외국인등록증 재발급은 관할 출입국·외국인관서에서 신청합니다.",
+    "F-6 visa extension",
+]
+
+
+def export(model_name, opset=17):
+    """torch 모델 → model.onnx (+ tokenizer.json), 배치/길이 축은 동적"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = onnx_model_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir="/tmp/hf_cache")
+    model = AutoModel.from_pretrained(model_name, cache_dir="/tmp/hf_cache").eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(CHECK_TEXTS, padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            onnx_model_path(model_name),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"✅ ONNX 내보내기: {onnx_model_path(model_name)}")
+
+
+def quantize(model_name):
+    """가중치 int8 동적 양자화 (활성값은 실행 시 양자화)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(onnx_model_path(model_name), onnx_model_path(model_name, quantized=True), weight_type=QuantType.QInt8)
+    size = os.path.getsize(onnx_model_path(model_name, quantized=True)) / 1024 / 1024
+    print(f"✅ int8 양자화: {onnx_model_path(model_name, quantized=True)} ({size:.1f}MB)")
+
+
+def check(model_name, quantized):
+    """HuggingFaceEmbeddings(torch) 결과와의 코사인 유사도"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    reference = np.array(HuggingFaceEmbeddings(model_name=model_name, cache_folder="/tmp/hf_cache").embed_documents(CHECK_TEXTS))
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    vectors = np.array(OnnxEmbeddings(model_name, quantized=quantized).embed_documents(CHECK_TEXTS))
+    similarities = (reference * vectors).sum(axis=1)
+    print(f"{'int8' if quantized else 'fp32'} 코사인 유사도 (torch 대비): 최소 {similarities.min():.5f}, 평균 {similarities.mean():.5f}")
+
+
+def main(model_name=EMBEDDING_MODEL, int8=True, skip_check=False):
+    export(model_name)
+    if int8:
+        quantize(model_name)
+    if not skip_check:
+        check(model_name, quantized=False)
+        if int8:
+            check(model_name, quantized=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 모델을 ONNX 로 내보내기 (EMBEDDING_BACKEND=onnx / onnx-int8 에서 사용)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="내보낼 임베딩 모델")
+    parser.add_argument("--no-int8", action="store_true", help="int8 양자화 모델은 만들지 않음")
+    parser.add_argument("--skip-check", action="store_true", help="torch 결과와 비교 생략")
+    args = parser.parse_args()
+    main(model_name=args.model, int8=not args.no_int8, skip_check=args.skip_check)
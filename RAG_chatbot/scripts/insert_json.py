@@ -1,19 +1,30 @@
 import os
 import sys
+import glob
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
-from RAG_chatbot.data_loader import load_all_hanultari_jsons, split_documents
-from RAG_chatbot.vector_store import create_vector_store
+from RAG_chatbot.data_loader import file_hash, load_hanultari_json, create_text_splitter, split_documents
+from RAG_chatbot.vector_store import create_vector_store, create_row_writer
+from RAG_chatbot.ingestion import IngestManifest, sync_group, source_version
+from RAG_chatbot.near_duplicate import NearDuplicateIndex, near_duplicate_index_path
 
 def main():
-    # ✅ 한울타리 JSON 여러 개 로드
-    docs = load_all_hanultari_jsons("RAG_chatbot/data")
+    collection_name = "laws_db"
+    # 별칭이 가리키는 현재 버전 컬렉션에 반영
+    vector_store = create_vector_store(collection_name=collection_name)
+    manifest = IngestManifest(vector_store.collection_name)
+    text_splitter = create_text_splitter()
 
-    # ✅ 텍스트 청크로 분할
-    chunks = split_documents(docs)
-
-    # ✅ 벡터 DB에 저장
-    vector_store = create_vector_store(documents=chunks)
-    print(f"✅ {len(chunks)}개의 JSON 청크가 벡터 DB에 저장되었습니다.")
+    # ✅ 한울타리 JSON 여러 개 로드 → 텍스트 청크로 분할 → 변경된 파일만 벡터 DB에 저장
+    json_files = sorted(glob.glob("RAG_chatbot/data/*.json"))
+    added, deleted = sync_group(vector_store, manifest, "hanultari", {
+        os.path.join("data", os.path.basename(path)): (
+            source_version(file_hash(path), text_splitter),
+            lambda path=path: split_documents(load_hanultari_json(path), text_splitter),
+        )
+        for path in json_files
+    }, batch_size=256, write_rows=create_row_writer(vector_store),
+       dedup=NearDuplicateIndex(near_duplicate_index_path(vector_store.collection_name)))
+    print(f"✅ {added}개의 JSON 청크가 벡터 DB에 저장되었습니다. (삭제 {deleted}개)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,244 @@
+# RAG_chatbot/statute_splitter.py
+import re
+from bisect import bisect_right
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter, RecursiveCharacterTextSplitter
+
+# 국가법령정보센터 PDF 페이지 머리말 ("법제처   1   국가법령정보센터" + 다음 줄의 법령명)
+PAGE_HEADER = re.compile(r"^법제처\s+\d+\s+국가법령정보센터\s*$")
+# 줄바꿈 때문에 본문의 "제7조에 따라" 같은 인용이 줄 맨 앞에 오는 경우와 구분하기 위해
+# 장/절은 "제N장 제목" 형태의 짧은 줄, 조는 "제N조(제목)" 또는 "제N조 삭제" 형태만 인정
+CHAPTER = re.compile(r"^(제\d+장(?:의\d+)?)\s+(\S.{0,40})$")
+SECTION = re.compile(r"^(제\d+절(?:의\d+)?)\s+(\S.{0,40})$")
+ARTICLE = re.compile(r"^(제\d+조(?:의\d+)?)(?:\(([^)]*)\)|\s+삭제)")
+SUPPLEMENT = re.compile(r"^부칙\s*(<.*>)?\s*$")
+# 항 번호 ①~⑳
+PARAGRAPH = re.compile(r"^[①-⑳]")
+
+
+class StatuteTextSplitter(TextSplitter):
+    """
+    법령 구조(장/절/조/항) 경계로 나누는 분할기
+    - 조 단위로 자르고, 같은 장 안의 짧은 조문은 chunk_size 까지 묶어서 청크 수를 줄임
+    - chunk_size 보다 긴 조문은 항(①②…) 경계에서, 그래도 길면 줄 단위로 자름
+    - 청크 간 겹침 없음, 메타데이터에 조문 번호/제목, 장/절 기록
+    - 조문 구조가 없는 문서(생활안내 PDF 등)는 문단/줄 경계 분할기로 처리
+    여러 페이지에 걸친 조문이 잘리지 않도록 split_documents 는 같은 source 의 페이지를 이어 붙여서 분할한다.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=0, **kwargs):
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **kwargs)
+        self._fallback = RecursiveCharacterTextSplitter(
+            separators=["\n\n", "\n", ". ", " ", ""],
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=self._length_function,
+        )
+
+    def split_text(self, text):
+        return [chunk["text"] for chunk in self._split_statute(text.split("\n"))]
+
+    def split_documents(self, documents):
+        """같은 source 의 연속된 페이지를 이어 붙인 뒤 분할하고, 청크 시작 페이지를 기록"""
+        chunks = []
+        for pages in group_pages(documents):
+            lines, line_pages = [], []
+            for doc in pages:
+                page_lines = _strip_page_header(doc.page_content.split("\n"))
+                lines.extend(page_lines)
+                line_pages.extend([doc.metadata.get("page")] * len(page_lines))
+
+            base_metadata = dict(pages[0].metadata)
+            for chunk in self._split_statute(lines):
+                metadata = {**base_metadata, **chunk["metadata"]}
+                if "page" in base_metadata and line_pages:
+                    metadata["page"] = line_pages[min(chunk["start_line"], len(line_pages) - 1)]
+                chunks.append(Document(page_content=chunk["text"], metadata=metadata))
+        return chunks
+
+    def _split_statute(self, lines):
+        units = _parse_units(lines)
+        if not any(unit["article"] for unit in units):
+            return self._split_plain(lines)
+
+        chunks = []
+        current = None
+        for unit in units:
+            for piece in self._split_long_unit(unit):
+                if (
+                    current
+                    and current["chapter"] == piece["chapter"]
+                    and self._length_function(current["text"]) + 1 + self._length_function(piece["text"]) <= self._chunk_size
+                ):
+                    current["text"] += "\n" + piece["text"]
+                    if piece["article"]:
+                        current["articles"].append(piece["article"])
+                    continue
+                if current:
+                    chunks.append(_finish(current))
+                current = {
+                    "text": piece["text"],
+                    "chapter": piece["chapter"],
+                    "section": piece["section"],
+                    "articles": [piece["article"]] if piece["article"] else [],
+                    "article_title": piece["article_title"],
+                    "start_line": piece["start_line"],
+                }
+        if current:
+            chunks.append(_finish(current))
+        return chunks
+
+    def _split_long_unit(self, unit):
+        """chunk_size 를 넘는 조문을 항 경계 → 줄 경계 순으로 나눔"""
+        if self._length_function(unit["text"]) <= self._chunk_size:
+            return [unit]
+
+        # 항 단위 블록 (첫 블록은 조문 제목 + 본문 또는 제1항)
+        blocks, block = [], []
+        for line in unit["text"].split("\n"):
+            if PARAGRAPH.match(line) and block:
+                blocks.append("\n".join(block))
+                block = []
+            block.append(line)
+        blocks.append("\n".join(block))
+
+        texts, current = [], ""
+        for block in blocks:
+            pieces = [block]
+            if self._length_function(block) > self._chunk_size:
+                pieces = self._fallback.split_text(block)
+            for piece in pieces:
+                if current and self._length_function(current) + 1 + self._length_function(piece) > self._chunk_size:
+                    texts.append(current)
+                    current = piece
+                else:
+                    current = f"{current}\n{piece}" if current else piece
+        if current:
+            texts.append(current)
+
+        start_lines = _start_lines(unit["lines"], unit["indices"], texts)
+        return [{**unit, "text": text, "start_line": start_line} for text, start_line in zip(texts, start_lines)]
+
+    def _split_plain(self, lines):
+        kept = [(index, line) for index, line in enumerate(lines) if line.strip()]
+        kept_lines = [line for _, line in kept]
+        texts = self._fallback.split_text("\n".join(kept_lines))
+        start_lines = _start_lines(kept_lines, [index for index, _ in kept], texts)
+        return [{"text": text, "metadata": {}, "start_line": start_line} for text, start_line in zip(texts, start_lines)]
+
+
+def group_pages(documents):
+    """
+    연속된 같은 source 의 페이지 문서끼리 묶음 (생성기 입력도 한 소스씩만 메모리에 유지)
+    page 메타데이터가 없는 문서(JSON 항목, API 항목 등)는 각각 따로 분할
+    """
+    group, current_source = [], None
+    for doc in documents:
+        source = doc.metadata.get("source") if "page" in doc.metadata else None
+        if group and (source is None or source != current_source):
+            yield group
+            group = []
+        group.append(doc)
+        current_source = source
+    if group:
+        yield group
+
+
+def _strip_page_header(lines):
+    """페이지 머리말(법제처 … 국가법령정보센터 + 법령명 줄) 제거"""
+    if lines and PAGE_HEADER.match(lines[0].strip()):
+        return lines[2:]
+    return lines
+
+
+def _parse_units(lines):
+    """줄 목록을 조문 단위 {text, lines, indices(각 줄의 원래 줄 번호), article, article_title, chapter, section, start_line} 로 나눔"""
+    units = []
+    chapter = section = None
+    unit = {"lines": [], "indices": [], "article": None, "article_title": None, "chapter": None, "section": None, "start_line": 0}
+
+    def flush():
+        text = "\n".join(unit["lines"]).strip()
+        if text:
+            units.append({**unit, "text": text})
+
+    for index, raw_line in enumerate(lines):
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        chapter_match = CHAPTER.match(line)
+        section_match = SECTION.match(line)
+        supplement_match = SUPPLEMENT.match(line)
+        article_match = ARTICLE.match(line)
+
+        if chapter_match or supplement_match:
+            flush()
+            # 부칙은 개정 이력마다 하나씩 있으므로 "부칙 <제N호,...>" 줄 전체를 장 이름으로 사용
+            chapter = line
+            section = None
+            unit = {"lines": [line], "indices": [index], "article": None, "article_title": None, "chapter": chapter, "section": None, "start_line": index}
+        elif section_match:
+            flush()
+            section = line
+            unit = {"lines": [line], "indices": [index], "article": None, "article_title": None, "chapter": chapter, "section": section, "start_line": index}
+        elif article_match:
+            # 장/절 제목 줄만 있는 단위는 다음 조문에 붙임
+            heading = unit["lines"] if unit["article"] is None and unit["lines"] and (unit["chapter"] or unit["section"]) else []
+            if not heading:
+                flush()
+            unit = {
+                "lines": heading + [line],
+                "indices": (unit["indices"] if heading else []) + [index],
+                "article": article_match.group(1),
+                "article_title": article_match.group(2),
+                "chapter": chapter,
+                "section": section,
+                "start_line": unit["start_line"] if heading else index,
+            }
+        else:
+            unit["lines"].append(line)
+            unit["indices"].append(index)
+    flush()
+
+    # 부칙의 조문 번호는 본문과 겹치므로 구분
+    for unit in units:
+        if unit["chapter"] and unit["chapter"].startswith("부칙") and unit["article"]:
+            unit["article"] = f"부칙 {unit['article']}"
+    return units
+
+
+def _start_lines(lines, indices, pieces):
+    """
+    lines 를 줄바꿈으로 이은 텍스트를 순서대로 나눈 pieces 각각의 시작 줄 → 원래 줄 번호(indices)
+    (분할기가 조각 앞뒤 공백을 지우므로 조각의 첫 줄을 텍스트에서 찾아 위치를 정함)
+    """
+    text = "\n".join(lines)
+    line_starts, position = [], 0
+    for line in lines:
+        line_starts.append(position)
+        position += len(line) + 1
+
+    start_lines, offset = [], 0
+    for piece in pieces:
+        found = text.find(piece.split("\n")[0], offset)
+        if found < 0:
+            found = offset
+        offset = found
+        start_lines.append(indices[max(0, bisect_right(line_starts, found) - 1)] if indices else 0)
+    return start_lines
+
+
+def _finish(current):
+    articles = current["articles"]
+    metadata = {}
+    if articles:
+        metadata["article"] = articles[0] if len(articles) == 1 else f"{articles[0]}~{articles[-1]}"
+        metadata["articles"] = articles
+        if len(articles) == 1 and current["article_title"]:
+            metadata["article_title"] = current["article_title"]
+    if current["chapter"]:
+        metadata["chapter"] = current["chapter"]
+    if current["section"]:
+        metadata["section"] = current["section"]
+    return {"text": current["text"], "metadata": metadata, "start_line": current["start_line"]}
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from RAG_chatbot.facility_geo import FacilityGeoIndex
+
+GYEONGGI_CENTERS = ["가평군", "고양시", "과천시", "광명시", "광주시", "구리시", "군포시", "김포시", "안산시", "수원시"]
+
+
+def center(sigungu, sido="경기"):
+    return {
+        "facility_type": "multicultural_center", "name": f"{sigungu}가족센터", "sido": sido, "sigungu": sigungu,
+        "address": f"{sido} {sigungu}", "phone": None, "lat": None, "lon": None,
+    }
+
+
+def build_index():
+    rows = [center(sigungu) for sigungu in GYEONGGI_CENTERS]
+    rows.append(center("강남구", sido="서울"))
+    # 좌표가 있는 시설은 수원의 해바라기센터 한 곳뿐
+    rows.append({
+        "facility_type": "sunflower_center", "name": "경기해바라기센터", "sido": "경기", "sigungu": "수원시",
+        "address": "경기 수원시", "phone": None, "lat": 37.2636, "lon": 127.0286,
+    })
+    return FacilityGeoIndex(rows)
+
+
+def test_same_sigungu_center_comes_first_when_locations_are_approximate():
+    rows = build_index().nearest("경기 안산시", "multicultural_center", n=3)
+    assert rows[0]["name"] == "안산시가족센터"
+    assert rows[0]["distance_km"] is None
+    # 나머지는 같은 시도 시설 (추정 좌표끼리의 거리로 정렬하지 않음)
+    assert all(row["sido"] == "경기" and row["distance_km"] is None for row in rows[1:])
+
+
+def test_sigungu_without_sido_is_resolved_from_rows():
+    rows = build_index().nearest("안산시", "multicultural_center", n=1)
+    assert [row["name"] for row in rows] == ["안산시가족센터"]
+
+
+def test_other_regions_fill_by_distance():
+    rows = build_index().nearest("서울 강남구", "multicultural_center", n=3)
+    assert rows[0]["name"] == "강남구가족센터"
+    # 서울에는 더 없으므로 다른 시도 시설을 거리와 함께 채움
+    assert all(row["sido"] == "경기" and row["approximate"] for row in rows[1:])
+
+
+def test_exact_coordinates_are_ordered_by_distance():
+    rows = build_index().nearest("경기 수원시", "sunflower_center", n=1)
+    assert rows[0]["name"] == "경기해바라기센터"
+    assert rows[0]["distance_km"] is not None and rows[0]["distance_km"] < 1
+
+
+def test_unknown_region_returns_none():
+    assert build_index().nearest("중구", "multicultural_center") is None
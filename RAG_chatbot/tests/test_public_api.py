@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from RAG_chatbot.public_api import PublicDataClient, odcloud_page, retry_after_seconds
+
+ITEMS = [{"id": i} for i in range(25)]
+
+
+class StubServer:
+    """공공데이터 API 흉내 (페이지네이션, ETag/Last-Modified, 429 + Retry-After, 캐시 없는 304)"""
+
+    def __init__(self):
+        self.calls = {"data": 0, "limited": 0, "stale": 0, "modified": 0}
+        self.conditional = []
+        self.app = web.Application()
+        self.app.router.add_get("/data", self.data)
+        self.app.router.add_get("/limited", self.limited)
+        self.app.router.add_get("/stale", self.stale)
+        self.app.router.add_get("/modified", self.modified)
+
+    async def data(self, request):
+        self.calls["data"] += 1
+        page, per_page = int(request.query["page"]), int(request.query["perPage"])
+        etag = f'"page-{page}"'
+        self.conditional.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        rows = ITEMS[(page - 1) * per_page:page * per_page]
+        return web.json_response({"data": rows, "totalCount": len(ITEMS)}, headers={"ETag": etag})
+
+    async def limited(self, request):
+        self.calls["limited"] += 1
+        if self.calls["limited"] == 1:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        return web.json_response({"ok": True})
+
+    async def stale(self, request):
+        # 조건부 헤더가 없어도 304 를 주는 중간 캐시, 캐시 우회 요청에만 본문 응답
+        self.calls["stale"] += 1
+        if request.headers.get("Cache-Control") != "no-cache":
+            return web.Response(status=304)
+        return web.json_response({"fresh": True})
+
+    async def modified(self, request):
+        self.calls["modified"] += 1
+        last_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+        if request.headers.get("If-Modified-Since") == last_modified:
+            return web.Response(status=304)
+        return web.json_response({"version": 1}, headers={"Last-Modified": last_modified})
+
+
+def run_with_server(scenario):
+    async def run():
+        stub = StubServer()
+        async with TestServer(stub.app) as server:
+            return stub, await scenario(stub, lambda path: str(server.make_url(path)))
+
+    return asyncio.run(run())
+
+
+def test_fetch_all_pages_and_etag_revalidation(tmp_path):
+    async def scenario(stub, url):
+        options = dict(concurrency=3, backoff_base=0.01, cache_dir=str(tmp_path))
+        async with PublicDataClient(**options) as client:
+            first = await client.fetch_all(url("/data"), {}, odcloud_page, "page", "perPage", 10)
+        async with PublicDataClient(**options) as client:
+            second = await client.fetch_all(url("/data"), {}, odcloud_page, "page", "perPage", 10)
+        return first, second
+
+    stub, (first, second) = run_with_server(scenario)
+    assert first == ITEMS
+    assert second == ITEMS
+    assert stub.calls["data"] == 6
+    # 두 번째 실행은 모든 페이지를 ETag 로 재검증 (304 → 디스크 캐시)
+    assert stub.conditional[:3] == [None, None, None]
+    assert sorted(stub.conditional[3:]) == ['"page-1"', '"page-2"', '"page-3"']
+
+
+def test_last_modified_revalidation(tmp_path):
+    async def scenario(stub, url):
+        async with PublicDataClient(cache_dir=str(tmp_path)) as client:
+            return [await client.get_json(url("/modified"), {}) for _ in range(2)]
+
+    stub, bodies = run_with_server(scenario)
+    assert bodies == [{"version": 1}, {"version": 1}]
+    assert stub.calls["modified"] == 2
+
+
+def test_retry_after_is_honoured():
+    async def scenario(stub, url):
+        async with PublicDataClient(backoff_base=0.01, cache_dir=None) as client:
+            started = time.perf_counter()
+            body = await client.get_json(url("/limited"), {})
+            return body, time.perf_counter() - started
+
+    stub, (body, elapsed) = run_with_server(scenario)
+    assert body == {"ok": True}
+    assert stub.calls["limited"] == 2
+    assert elapsed >= 0.9
+
+
+def test_304_without_cache_entry_refetches(tmp_path):
+    async def scenario(stub, url):
+        async with PublicDataClient(backoff_base=0.01, cache_dir=str(tmp_path)) as client:
+            return await client.get_json(url("/stale"), {})
+
+    stub, body = run_with_server(scenario)
+    assert body == {"fresh": True}
+    assert stub.calls["stale"] == 2
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("Wed, 01 Jan 2020 00:00:00 GMT") == 0.0
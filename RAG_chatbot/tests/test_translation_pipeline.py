@@ -0,0 +1,86 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from RAG_chatbot.translation_memory import TranslationMemory
+from RAG_chatbot.translation_pipeline import translate_text
+
+
+class FakeTranslator(BaseChatModel):
+    """프롬프트의 번역할 줄을 그대로 받아 replies 의 답을 돌려주는 LLM (없으면 줄마다 'EN(원문)')"""
+
+    replies: dict = {}
+    prompts: list = []
+
+    @property
+    def _llm_type(self):
+        return "fake-translator"
+
+    def _reply(self, messages):
+        source = messages[0].content.split("\n\n", 1)[1]
+        self.prompts.append(source)
+        return self.replies.get(source, "\n".join(f"EN({line})" for line in source.split("\n")))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # 줄 경계가 토큰 중간에 오도록 3글자씩 나눠 보냄
+        reply = self._reply(messages)
+        for i in range(0, len(reply), 3):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=reply[i:i + 3]))
+
+
+def memory(tmp_path):
+    return TranslationMemory(path=str(tmp_path / "translations.sqlite"))
+
+
+def test_missing_lines_fill_between_known_lines(tmp_path):
+    tm = memory(tmp_path)
+    tm.put("센터를 방문하세요.", "English", "Visit the center.")
+    llm = FakeTranslator()
+    text = "새 안내입니다.\n센터를 방문하세요.\n1577-1366\n마지막 줄입니다."
+
+    result = translate_text(llm, text, "English", memory=tm)
+
+    assert result == "EN(새 안내입니다.)\nVisit the center.\n1577-1366\nEN(마지막 줄입니다.)"
+    # 저장된 줄과 한글이 없는 줄은 LLM 에 보내지 않음
+    assert llm.prompts == ["새 안내입니다.\n마지막 줄입니다."]
+    assert tm.get("새 안내입니다.", "English") == "EN(새 안내입니다.)"
+    assert tm.get("마지막 줄입니다.", "English") == "EN(마지막 줄입니다.)"
+
+
+def test_line_count_mismatch_is_shown_but_not_stored(tmp_path):
+    tm = memory(tmp_path)
+    llm = FakeTranslator(replies={"첫째 줄\n둘째 줄": "First and second line"})
+
+    result = translate_text(llm, "첫째 줄\n둘째 줄\n1577-1366", "English", memory=tm)
+
+    assert result == "First and second line\n1577-1366"
+    assert tm.get("첫째 줄", "English") is None
+    assert tm.get("둘째 줄", "English") is None
+
+
+def test_blank_output_line_is_not_stored(tmp_path):
+    tm = memory(tmp_path)
+    # 줄 수는 같지만 빈 줄이 끼어 있어 줄 대응을 믿을 수 없음
+    llm = FakeTranslator(replies={"첫째 줄\n둘째 줄": "First line\n\nSecond line"})
+
+    result = translate_text(llm, "첫째 줄\n둘째 줄", "English", memory=tm)
+
+    assert result == "First line\nSecond line"
+    assert tm.get("첫째 줄", "English") is None
+    assert tm.get("둘째 줄", "English") is None
+
+
+def test_trailing_newline_is_still_stored(tmp_path):
+    tm = memory(tmp_path)
+    llm = FakeTranslator(replies={"첫째 줄\n둘째 줄": "First line\nSecond line\n\n"})
+
+    assert translate_text(llm, "첫째 줄\n둘째 줄", "English", memory=tm) == "First line\nSecond line"
+    assert tm.get("둘째 줄", "English") == "Second line"
@@ -0,0 +1,87 @@
+# RAG_chatbot/translation_memory.py
+import os
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+from .embedding_cache import CACHE_DIR, normalize_text, normalized_text_hash
+
+
+class TranslationMemory:
+    """
+    (정규화한 한국어 세그먼트, 대상 언어) → 번역문을 저장하는 SQLite 번역 메모리
+    센터 이름, 전화번호 줄, 법령 제목, 안내 문구처럼 답변마다 반복되는 세그먼트는 LLM 을 다시 호출하지 않음
+    max_entries 를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU), 언어별 적중/미적중 횟수 기록
+    """
+
+    def __init__(self, path=None, max_entries=100_000):
+        self.path = path or os.path.join(CACHE_DIR, "translations.sqlite")
+        self.max_entries = max_entries
+        self._counts = defaultdict(lambda: [0, 0])  # 언어 → [적중, 미적중]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                language TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                source TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (language, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    def get(self, segment, language):
+        """저장된 번역문 (없으면 None), 사용 시각 갱신"""
+        text_hash = normalized_text_hash(segment)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM translations WHERE language = ? AND text_hash = ?", (language, text_hash)
+            ).fetchone()
+            if row is None:
+                self._counts[language][1] += 1
+                return None
+            self._counts[language][0] += 1
+            self._conn.execute(
+                "UPDATE translations SET last_used = ? WHERE language = ? AND text_hash = ?",
+                (time.time(), language, text_hash),
+            )
+            self._conn.commit()
+        return row[0]
+
+    def put(self, segment, language, translation):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (language, text_hash, source, translation, last_used) VALUES (?, ?, ?, ?, ?)",
+                (language, normalized_text_hash(segment), normalize_text(segment), translation, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """최대 개수를 넘으면 90% 수준까지 오래된 항목 삭제"""
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+            (count - int(self.max_entries * 0.9),),
+        )
+
+    def stats(self):
+        """언어별 {hits, misses, hit_rate} 와 전체 항목 수"""
+        with self._lock:
+            languages = {
+                language: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                for language, (hits, misses) in self._counts.items()
+            }
+            size = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {"languages": languages, "size": size, "max_entries": self.max_entries}
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
@@ -0,0 +1,268 @@
+# RAG_chatbot/translation_pipeline.py
+import re
+import queue
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage
+
+# 세그먼트 번역 요청을 동시에 보내는 스레드 풀 (프로세스 공용, 동시 번역 요청 수 상한)
+TRANSLATION_WORKERS = 8
+_translation_executor = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix="translation")
+
+# LLM 번역 단위는 문단(빈 줄로 구분), 번역 메모리는 문단 안의 줄 단위
+# (목록 항목, 전화번호 줄, 안내 문구가 다른 문단에 섞여 나와도 그대로 재사용되고, 빠진 줄만 문단당 한 번에 번역)
+# 문단이 이 길이(글자)를 넘으면 줄 경계(없으면 문장 경계)에서 나눔
+MAX_SEGMENT_CHARS = 600
+PARAGRAPH_BREAK = re.compile(r"[ \t]*\n[ \t]*\n\s*(?=\S)")
+LINE_BREAK = re.compile(r"[ \t]*\n\s*(?=\S)")
+SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+# 한글이 없는 줄(전화번호, URL, 구분선 등)은 번역하지 않음
+HANGUL = re.compile(r"[가-힣]")
+
+# 참고 문서 목록 제목 (문서 제목은 번역하지 않으므로 LLM 을 거치지 않음)
+SOURCE_HEADINGS = {
+    "English": "📚 Referenced documents:",
+    "Chinese": "📚 参考文件：",
+    "Vietnamese": "📚 Tài liệu tham khảo:",
+    "Tagalog": "📚 Mga sangguniang dokumento:",
+    "Uzbek": "📚 Foydalanilgan hujjatlar:",
+    "Thai": "📚 เอกสารอ้างอิง:",
+    "Mongolian": "📚 Ашигласан баримт бичиг:",
+}
+
+_DONE = object()
+
+
+def translation_prompt(text, target_language):
+    if "\n" not in text:
+        return f"다음 한국어 텍스트를 {target_language}로 정확히 번역해주세요. 번역문만 출력하세요:\n\n{text}"
+    # 여러 줄은 번역문 줄을 원문 줄에 다시 맞추므로 줄 수를 유지하도록 요청
+    return (
+        f"다음 한국어 텍스트를 {target_language}로 정확히 번역해주세요. "
+        f"한 줄을 한 줄로 번역해서 원문과 같은 줄 수로, 빈 줄 없이 번역문만 출력하세요:\n\n{text}"
+    )
+
+
+def source_list_text(titles, target_language=None):
+    """참고 문서 목록 (target_language 가 있으면 제목 줄만 해당 언어로)"""
+    heading = SOURCE_HEADINGS.get(target_language, SOURCE_HEADINGS["English"]) if target_language else "📚 참고한 문서:"
+    return f"{heading}\n" + "\n".join(f"- {title}" for title in titles)
+
+
+def _next_segment(buffer, max_segment_chars=MAX_SEGMENT_CHARS):
+    """buffer 에서 완성된 첫 세그먼트(문단) → (세그먼트, 뒤 구분자, 나머지), 아직 없으면 None"""
+    # 다음 문단이 시작되어야 문단이 끝났는지 알 수 있음
+    match = PARAGRAPH_BREAK.search(buffer)
+    if match and match.start() <= max_segment_chars:
+        return buffer[:match.start()], "\n\n", buffer[match.end():]
+    if len(buffer) > max_segment_chars:
+        breaks = list(LINE_BREAK.finditer(buffer, 0, max_segment_chars))
+        if breaks:
+            return buffer[:breaks[-1].start()], "\n", buffer[breaks[-1].end():]
+        ends = [match.end() for match in SENTENCE_END.finditer(buffer, 0, max_segment_chars)]
+        if ends:
+            return buffer[:ends[-1]].rstrip(), " ", buffer[ends[-1]:]
+    if match:
+        return buffer[:match.start()], "\n\n", buffer[match.end():]
+    return None
+
+
+def split_segments(text, max_segment_chars=MAX_SEGMENT_CHARS):
+    """완성된 text → [(세그먼트, 뒤 구분자)] (SegmentTranslator 와 같은 기준)"""
+    segments = []
+    while True:
+        cut = _next_segment(text, max_segment_chars)
+        if cut is None:
+            break
+        segment, separator, text = cut
+        segments.append((segment, separator))
+    if text.strip():
+        segments.append((text.rstrip(), ""))
+    elif segments:
+        segments[-1] = (segments[-1][0], "")
+    return segments
+
+
+def _known_translation(line, target_language, memory=None):
+    """LLM 없이 정할 수 있는 번역문 (한글이 없으면 그대로, 번역 메모리에 있으면 저장된 번역), 없으면 None"""
+    if not HANGUL.search(line):
+        return line
+    if memory is not None:
+        return memory.get(line, target_language)
+    return None
+
+
+def _line_translations(segment, target_language, memory=None):
+    """세그먼트의 줄 목록과 줄별로 이미 정해진 번역 (LLM 으로 번역할 줄은 None)"""
+    lines = [line.rstrip() for line in segment.split("\n")]
+    return lines, [_known_translation(line, target_language, memory) for line in lines]
+
+
+def _merged_tokens(lines, known, chunks, target_language, memory=None):
+    """
+    빠진 줄(known 이 None)만 모아 번역한 LLM 출력 토큰(chunks)의 n번째 줄을 n번째 빠진 줄 자리에 넣어
+    원래 줄 순서대로 토큰 생성 (출력이 오는 대로 내보냄), 끝나면 줄별 번역을 번역 메모리에 저장
+    출력 줄 수가 빠진 줄 수와 다르거나(줄이 합쳐지거나 나뉨) 출력 줄 사이에 빈 줄이 있으면
+    출력은 그대로 내보내되 줄 대응을 믿을 수 없으므로 저장하지 않음
+    """
+    missing = [i for i, translated in enumerate(known) if translated is None]
+    translated_lines, current = [], ""
+    position = 0  # 지금 내보내는 줄 (빠진 줄이면 LLM 출력을 기다리는 줄)
+    blank_pending = False  # 출력 줄 뒤에 빈 줄이 나옴 (뒤에 다른 줄이 이어지면 줄이 어긋났을 수 있음)
+    aligned = True
+
+    def known_lines():
+        nonlocal position
+        while position < len(known) and known[position] is not None:
+            yield ("\n" if position else "") + known[position]
+            position += 1
+
+    yield from known_lines()
+    for chunk in chunks:
+        for i, part in enumerate(chunk.split("\n")):
+            if i:
+                if current.strip():
+                    # LLM 출력의 줄이 끝남 → 다음 줄로 (빈 줄은 건너뜀)
+                    translated_lines.append(current.strip())
+                    current = ""
+                    position += 1
+                    yield from known_lines()
+                elif translated_lines:
+                    blank_pending = True
+            if not part.strip() and not current:
+                continue
+            if not current:
+                if blank_pending:
+                    aligned = False
+                if position:
+                    yield "\n"
+                part = part.lstrip()
+            current += part
+            yield part
+    if current.strip():
+        translated_lines.append(current.strip())
+        position += 1
+    # 출력 줄이 모자라면 남은 빠진 줄은 비우고 뒤의 정해진 줄만 이어서 내보냄
+    for i in range(position, len(known)):
+        if known[i] is not None:
+            yield ("\n" if i else "") + known[i]
+
+    if memory is not None and aligned and len(translated_lines) == len(missing):
+        for i, translated in zip(missing, translated_lines):
+            memory.put(lines[i], target_language, translated)
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class SegmentTranslator:
+    """
+    생성 중인 답변을 문단(길면 줄/문장) 단위로 나눠 완성된 세그먼트부터 바로 번역을 시작하고,
+    여러 세그먼트를 스레드 풀에서 동시에 번역하되 결과 토큰은 원래 순서대로 내보냄
+    memory(TranslationMemory) 가 있으면 세그먼트 안의 줄마다 저장된 번역을 쓰고, 빠진 줄만 모아 한 번에 번역한 뒤 줄별로 저장
+    - feed(토큰): 답변 토큰 추가 / close(): 남은 텍스트를 마지막 세그먼트로
+    - ready_tokens(): 지금 바로 내보낼 수 있는 번역 토큰 (대기하지 않음)
+    - remaining_tokens(): 모든 세그먼트 번역이 끝날 때까지 순서대로 토큰 생성
+    """
+
+    def __init__(self, llm, target_language, memory=None, max_segment_chars=MAX_SEGMENT_CHARS):
+        self.llm = llm
+        self.target_language = target_language
+        self.memory = memory
+        self.max_segment_chars = max_segment_chars
+        self.segments = 0  # LLM 으로 번역한 세그먼트 수 (= LLM 호출 수)
+        self.reused = 0  # 번역 메모리에서 가져온 줄 수
+        self._buffer = ""
+        self._pending = []  # 세그먼트별 번역 토큰 큐 (원래 순서)
+        self._separator = ""  # 다음 세그먼트 앞에 붙일 원래 구분자 (문단: 빈 줄, 줄: 줄바꿈, 문장: 공백)
+
+    def _translate(self, lines, known, tokens):
+        missing = "\n".join(line for line, translated in zip(lines, known) if translated is None)
+        try:
+            chunks = (
+                chunk.content
+                for chunk in self.llm.stream([HumanMessage(content=translation_prompt(missing, self.target_language))])
+            )
+            for token in _merged_tokens(lines, known, chunks, self.target_language, self.memory):
+                if token:
+                    tokens.put(token)
+        except Exception as e:
+            tokens.put(_Failed(e))
+        finally:
+            tokens.put(_DONE)
+
+    def _submit(self, segment, separator):
+        tokens = queue.Queue()
+        if self._separator:
+            tokens.put(self._separator)
+        self._separator = separator
+        lines, known = _line_translations(segment, self.target_language, self.memory)
+        self.reused += sum(translated is not None and HANGUL.search(line) is not None for line, translated in zip(lines, known))
+        if None in known:
+            _translation_executor.submit(self._translate, lines, known, tokens)
+            self.segments += 1
+        else:
+            tokens.put("\n".join(known))
+            tokens.put(_DONE)
+        self._pending.append(tokens)
+
+    def feed(self, text):
+        self._buffer += text
+        while True:
+            cut = _next_segment(self._buffer, self.max_segment_chars)
+            if cut is None:
+                break
+            segment, separator, self._buffer = cut
+            self._submit(segment, separator)
+
+    def close(self):
+        if self._buffer.strip():
+            self._submit(self._buffer, "")
+        self._buffer = ""
+
+    def _tokens(self, block):
+        while self._pending:
+            try:
+                item = self._pending[0].get(block=block)
+            except queue.Empty:
+                return
+            if item is _DONE:
+                self._pending.pop(0)
+                continue
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+
+    def ready_tokens(self):
+        yield from self._tokens(block=False)
+
+    def remaining_tokens(self):
+        self.close()
+        yield from self._tokens(block=True)
+
+
+def translate_text(llm, text, target_language, memory=None):
+    """text 를 세그먼트로 나눠 동시에 번역한 결과"""
+    translator = SegmentTranslator(llm, target_language, memory=memory)
+    translator.feed(text)
+    return "".join(translator.remaining_tokens())
+
+
+async def atranslate_text(llm, text, target_language, memory=None, max_concurrency=TRANSLATION_WORKERS):
+    """translate_text 의 비동기 버전 (세그먼트의 빠진 줄을 llm.ainvoke 로 최대 max_concurrency 개씩 동시에 번역)"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def translate(segment):
+        lines, known = _line_translations(segment, target_language, memory)
+        if None not in known:
+            return "\n".join(known)
+        missing = "\n".join(line for line, translated in zip(lines, known) if translated is None)
+        async with semaphore:
+            message = await llm.ainvoke([HumanMessage(content=translation_prompt(missing, target_language))])
+        return "".join(_merged_tokens(lines, known, [message.content], target_language, memory))
+
+    segments = split_segments(text)
+    translations = await asyncio.gather(*(translate(segment) for segment, _ in segments))
+    return "".join(translated + separator for translated, (_, separator) in zip(translations, segments))
@@ -0,0 +1,100 @@
+# RAG_chatbot/vector_compression.py
+import re
+import numpy as np
+
+# 근사 점수 계산 시 한 번에 float32 로 변환하는 행 수 (임시 메모리 상한)
+_SCORE_BLOCK = 8192
+
+
+class Float16Codec:
+    """float16 저장 (pgvector halfvec 과 같은 정밀도, 벡터당 2바이트 × 차원)"""
+
+    name = "float16"
+
+    def fit(self, vectors):
+        return self
+
+    def encode(self, vectors):
+        return np.asarray(vectors, dtype=np.float16)
+
+    def inner_products(self, codes, query):
+        query = np.asarray(query, dtype=np.float32)
+        return np.concatenate([
+            codes[i:i + _SCORE_BLOCK].astype(np.float32) @ query for i in range(0, len(codes), _SCORE_BLOCK)
+        ]) if len(codes) else np.empty(0, dtype=np.float32)
+
+
+class Int8Codec:
+    """
+    차원별 스칼라 int8 양자화 (벡터당 1바이트 × 차원)
+    코퍼스에서 차원별 최대 절댓값으로 스케일을 정하고 [-127, 127] 로 반올림
+    """
+
+    name = "int8"
+
+    def __init__(self):
+        self.scale = None
+
+    def fit(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.scale = np.maximum(np.abs(vectors).max(axis=0), 1e-12) / 127.0
+        return self
+
+    def encode(self, vectors):
+        return np.clip(np.rint(np.asarray(vectors, dtype=np.float32) / self.scale), -127, 127).astype(np.int8)
+
+    def inner_products(self, codes, query):
+        # v ≈ codes * scale 이므로 v·q ≈ codes · (scale * q)
+        scaled = np.asarray(query, dtype=np.float32) * self.scale
+        return np.concatenate([
+            codes[i:i + _SCORE_BLOCK].astype(np.float32) @ scaled for i in range(0, len(codes), _SCORE_BLOCK)
+        ]) if len(codes) else np.empty(0, dtype=np.float32)
+
+
+class PCACodec:
+    """
+    코퍼스로 학습한 PCA 로 dim 차원까지 줄여 float16 으로 저장
+    v ≈ mean + componentsᵀ · codes 이므로 v·q ≈ mean·q + codes · (components · q)
+    (e5-small 은 Matryoshka 학습 모델이 아니라 앞 차원 자르기 대신 PCA 를 사용)
+    """
+
+    def __init__(self, dim=128):
+        self.dim = dim
+        self.name = f"pca{dim}"
+        self.mean = None
+        self.components = None
+
+    def fit(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = vt[:self.dim].astype(np.float32)
+        return self
+
+    def encode(self, vectors):
+        return ((np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T).astype(np.float16)
+
+    def inner_products(self, codes, query):
+        query = np.asarray(query, dtype=np.float32)
+        projected = self.components @ query
+        offset = float(self.mean @ query)
+        return np.concatenate([
+            codes[i:i + _SCORE_BLOCK].astype(np.float32) @ projected for i in range(0, len(codes), _SCORE_BLOCK)
+        ]) + offset if len(codes) else np.empty(0, dtype=np.float32)
+
+
+COMPRESSIONS = ("float16", "int8", "pca<차원>")
+
+
+def make_codec(spec):
+    """'float16' / 'int8' / 'pca128' → 코덱 (None 이면 None)"""
+    if spec is None:
+        return None
+    if spec == "float16":
+        return Float16Codec()
+    if spec == "int8":
+        return Int8Codec()
+    match = re.fullmatch(r"pca(\d+)", spec)
+    if match:
+        return PCACodec(int(match.group(1)))
+    raise ValueError(f"지원하지 않는 압축 방식입니다: {spec} (가능: {', '.join(COMPRESSIONS)})")
@@ -0,0 +1,362 @@
+# RAG_chatbot/vector_replica.py
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Optional
+import numpy as np
+import sqlalchemy
+from pydantic import ConfigDict
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+from langchain_postgres.vectorstores import DistanceStrategy
+from .lexical_index import matches_filter
+from .vector_compression import make_codec
+
+try:
+    import faiss
+except ImportError:  # faiss 가 없으면 NumPy 행렬 곱으로 검색
+    faiss = None
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def replica_snapshot_path(collection_name):
+    return os.path.join(CACHE_DIR, f"replica_{collection_name}.npz")
+
+
+def remove_replica_snapshot(collection_name):
+    """컬렉션의 복제본 스냅샷 삭제 (npz 와 지문별 벡터 파일 <스냅샷>.<지문>.vectors.npy 모두)"""
+    path = replica_snapshot_path(collection_name)
+    for name in [path] + glob.glob(f"{glob.escape(path[:-len('.npz')])}.*.vectors.npy"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def collection_fingerprint(conn, collection_name):
+    """컬렉션의 청크 ID 집합 해시 (청크 ID 는 내용+메타데이터로 정해지므로 내용이 바뀌면 달라짐)"""
+    return conn.execute(
+        sqlalchemy.text("""
+            SELECT count(*) || ':' || coalesce(md5(string_agg(e.id, ',' ORDER BY e.id)), '')
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            WHERE c.name = :name
+        """),
+        {"name": collection_name},
+    ).scalar()
+
+
+class VectorReplica:
+    """
+    벡터 컬렉션의 프로세스 내 읽기 전용 복제본 (id, 임베딩, 본문, 메타데이터)
+    검색/MMR 을 DB 왕복 없이 메모리에서 수행 (faiss 가 있으면 FlatIndex, 없으면 NumPy)
+    코사인 거리는 정규화한 벡터의 내적으로 계산하고, 반환 점수는 PGVector 와 같은 거리 값
+
+    compression('float16' / 'int8' / 'pca128' 등, vector_compression 참고)을 주면
+    압축 코드로 후보 rescore_k 개를 고른 뒤 원래 벡터로 정확한 거리를 다시 계산해서 상위 k개 반환
+    (스냅샷에서 로드하면 원래 벡터는 메모리 매핑 파일로 두고 후보 행만 읽음, rescore_k=0 이면 재계산 생략)
+    """
+
+    def __init__(self, collection_name, fingerprint, ids, vectors, texts, metadatas,
+                 distance_strategy=DistanceStrategy.COSINE, compression=None, rescore_k=50, normalized=False):
+        self.collection_name = collection_name
+        self.fingerprint = fingerprint
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas)
+        self.distance_strategy = distance_strategy
+        if not isinstance(vectors, np.memmap):
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if distance_strategy == DistanceStrategy.COSINE and not normalized:
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self.vectors = vectors
+        self.rescore_k = rescore_k
+        self.codec = make_codec(compression)
+        self.codes = None
+        self._norms_sq = None
+        self._index = None
+        if self.codec is not None and len(self.ids):
+            self.codes = self.codec.fit(vectors).encode(vectors)
+            if distance_strategy == DistanceStrategy.EUCLIDEAN:
+                self._norms_sq = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+        elif faiss is not None and len(self.ids):
+            if distance_strategy == DistanceStrategy.EUCLIDEAN:
+                self._index = faiss.IndexFlatL2(vectors.shape[1])
+            else:
+                self._index = faiss.IndexFlatIP(vectors.shape[1])
+            self._index.add(vectors)
+        self._filter_masks = {}
+        self._lock = threading.Lock()
+
+    def memory_bytes(self):
+        """검색에 메모리로 들고 있는 벡터/코드 크기 (메모리 매핑 원본 벡터 제외)"""
+        total = 0 if isinstance(self.vectors, np.memmap) else self.vectors.nbytes
+        if self.codes is not None:
+            total += self.codes.nbytes
+        return total
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _prepare_query(self, embedding):
+        query = np.asarray(embedding, dtype=np.float32)
+        if self.distance_strategy == DistanceStrategy.COSINE:
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+        return query
+
+    def _distances(self, query, rows=None):
+        """query 와 (rows 행들의) 거리 — 작을수록 가까움"""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if self.distance_strategy == DistanceStrategy.EUCLIDEAN:
+            return np.linalg.norm(vectors - query, axis=1)
+        similarities = vectors @ query
+        if self.distance_strategy == DistanceStrategy.COSINE:
+            return 1.0 - similarities
+        return -similarities
+
+    def _filter_rows(self, metadata_filter):
+        key = json.dumps(metadata_filter, ensure_ascii=False, sort_keys=True, default=str)
+        with self._lock:
+            rows = self._filter_masks.get(key)
+        if rows is None:
+            rows = np.flatnonzero([matches_filter(metadata, metadata_filter) for metadata in self.metadatas])
+            with self._lock:
+                self._filter_masks[key] = rows
+        return rows
+
+    def _approximate_distances(self, query, rows=None):
+        """압축 코드로 계산한 근사 거리"""
+        codes = self.codes if rows is None else self.codes[rows]
+        similarities = self.codec.inner_products(codes, query)
+        if self.distance_strategy == DistanceStrategy.EUCLIDEAN:
+            norms_sq = self._norms_sq if rows is None else self._norms_sq[rows]
+            return np.sqrt(np.maximum(norms_sq - 2 * similarities + float(query @ query), 0))
+        if self.distance_strategy == DistanceStrategy.COSINE:
+            return 1.0 - similarities
+        return -similarities
+
+    def _nearest_compressed(self, query, k, metadata_filter=None):
+        rows = self._filter_rows(metadata_filter) if metadata_filter else np.arange(len(self.ids))
+        distances = self._approximate_distances(query, rows if metadata_filter else None)
+        candidates = min(len(rows), max(k, self.rescore_k))
+        if len(rows) > candidates:
+            top = np.argpartition(distances, candidates - 1)[:candidates]
+            rows, distances = rows[top], distances[top]
+        if self.rescore_k:
+            # 후보만 원래 벡터로 정확한 거리 재계산 (행 번호 순으로 읽어 메모리 매핑 파일 접근을 순차적으로)
+            order = np.argsort(rows)
+            rows, distances = rows[order], self._distances(query, rows[order])
+        if len(rows) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[top], distances[top]
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
+
+    def _nearest(self, query, k, metadata_filter=None):
+        """가까운 순서의 (행 번호 배열, 거리 배열)"""
+        if not len(self.ids) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self.codec is not None:
+            return self._nearest_compressed(query, k, metadata_filter)
+        if metadata_filter:
+            rows = self._filter_rows(metadata_filter)
+            distances = self._distances(query, rows)
+        elif self._index is not None:
+            scores, rows = self._index.search(query.reshape(1, -1), min(k, len(self.ids)))
+            rows, scores = rows[0], scores[0]
+            keep = rows >= 0
+            rows, scores = rows[keep], scores[keep]
+            if self.distance_strategy == DistanceStrategy.EUCLIDEAN:
+                return rows, np.sqrt(np.maximum(scores, 0))
+            return rows, (1.0 - scores) if self.distance_strategy == DistanceStrategy.COSINE else -scores
+        else:
+            rows = np.arange(len(self.ids))
+            distances = self._distances(query)
+        if len(rows) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[top], distances[top]
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
+
+    def _document(self, row):
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def documents(self):
+        return [self._document(row) for row in range(len(self.ids))]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, metadata_filter=None):
+        rows, distances = self._nearest(self._prepare_query(embedding), k, metadata_filter)
+        return [(self._document(row), float(distance)) for row, distance in zip(rows, distances)]
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, metadata_filter=None):
+        query = self._prepare_query(embedding)
+        rows, _ = self._nearest(query, fetch_k, metadata_filter)
+        if not len(rows):
+            return []
+        selected = maximal_marginal_relevance(query, self.vectors[rows], lambda_mult=lambda_mult, k=k)
+        # PGVector / vector_mmr_search 처럼 선택된 문서를 거리 순으로 반환
+        return [self._document(rows[i]) for i in sorted(selected)]
+
+    def save(self, path=None):
+        """
+        스냅샷 저장: 본문/메타데이터는 npz, 벡터는 메모리 매핑용 npy (지문별 파일명)
+        npz 가 마지막에 교체되므로 중간에 실패해도 이전 스냅샷이 그대로 유효
+        """
+        path = path or replica_snapshot_path(self.collection_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        vectors_path = _vectors_path(path, self.fingerprint)
+        tmp_vectors = f"{vectors_path}.tmp.npy"
+        np.save(tmp_vectors, np.asarray(self.vectors, dtype=np.float32))
+        os.replace(tmp_vectors, vectors_path)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            fingerprint=np.array(self.fingerprint),
+            vectors_file=np.array(os.path.basename(vectors_path)),
+            ids=np.array(self.ids, dtype=str),
+            texts=np.array(self.texts, dtype=str),
+            metadatas=np.array([json.dumps(metadata, ensure_ascii=False) for metadata in self.metadatas], dtype=str),
+        )
+        os.replace(tmp_path, path)
+        # 이전 지문의 벡터 파일 정리
+        prefix = os.path.basename(path)[:-len(".npz")] + "."
+        for name in os.listdir(os.path.dirname(path)):
+            if name.startswith(prefix) and name.endswith(".vectors.npy") and name != os.path.basename(vectors_path):
+                os.remove(os.path.join(os.path.dirname(path), name))
+
+    @classmethod
+    def from_snapshot(cls, collection_name, path=None, distance_strategy=DistanceStrategy.COSINE,
+                      compression=None, rescore_k=50):
+        """스냅샷 로드 (압축 사용 시 원래 벡터는 메모리 매핑)"""
+        path = path or replica_snapshot_path(collection_name)
+        data = np.load(path)
+        vectors_path = os.path.join(os.path.dirname(path), str(data["vectors_file"]))
+        vectors = np.load(vectors_path, mmap_mode="r" if compression else None)
+        return cls(
+            collection_name,
+            str(data["fingerprint"]),
+            data["ids"].tolist(),
+            vectors,
+            data["texts"].tolist(),
+            [json.loads(metadata) for metadata in data["metadatas"].tolist()],
+            distance_strategy=distance_strategy,
+            compression=compression,
+            rescore_k=rescore_k,
+            normalized=True,
+        )
+
+
+def _vectors_path(path, fingerprint):
+    digest = hashlib.md5(str(fingerprint).encode("utf-8")).hexdigest()[:12]
+    return f"{path[:-len('.npz')]}.{digest}.vectors.npy"
+
+
+def _snapshot_fingerprint(path):
+    """스냅샷의 지문 (없거나 읽을 수 없는 형식이면 None)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if "vectors_file" not in data.files:
+                return None
+            return str(data["fingerprint"])
+    except (OSError, ValueError):
+        return None
+
+
+def load_replica(engine, collection_name, distance_strategy=DistanceStrategy.COSINE, use_snapshot=True,
+                 compression=None, rescore_k=50):
+    """
+    컬렉션 복제본 로드
+    - 스냅샷 파일의 지문이 DB 와 같으면 스냅샷에서 로드 (임베딩 텍스트 파싱 생략)
+    - 다르면 DB 에서 id/임베딩/본문/메타데이터를 한 번에 읽고 스냅샷 갱신
+    - DB 에 접속할 수 없으면 있는 스냅샷으로 로드 (없으면 예외)
+    compression / rescore_k: VectorReplica 참고 (스냅샷을 쓰면 원래 벡터는 메모리 매핑)
+    """
+    started = time.perf_counter()
+    path = replica_snapshot_path(collection_name)
+    snapshot_fingerprint = _snapshot_fingerprint(path) if use_snapshot else None
+    options = {"distance_strategy": distance_strategy, "compression": compression, "rescore_k": rescore_k}
+
+    try:
+        with engine.connect() as conn:
+            fingerprint = collection_fingerprint(conn, collection_name)
+            if snapshot_fingerprint is not None and snapshot_fingerprint == fingerprint:
+                replica = VectorReplica.from_snapshot(collection_name, path, **options)
+                print(f"[replica] {collection_name} 스냅샷 로드: {len(replica)}개 ({time.perf_counter() - started:.2f}초)")
+                return replica
+            rows = conn.execute(
+                sqlalchemy.text("""
+                    SELECT e.id, e.embedding::text, e.document, e.cmetadata
+                    FROM langchain_pg_embedding e
+                    JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                    WHERE c.name = :name
+                    ORDER BY e.id
+                """),
+                {"name": collection_name},
+            ).all()
+    except sqlalchemy.exc.DBAPIError as e:
+        if snapshot_fingerprint is None:
+            raise
+        print(f"[replica] DB 접속 실패로 스냅샷 사용: {e}")
+        return VectorReplica.from_snapshot(collection_name, path, **options)
+
+    vectors = np.array([json.loads(row[1]) for row in rows], dtype=np.float32) if rows else np.empty((0, 0), np.float32)
+    replica = VectorReplica(
+        collection_name,
+        fingerprint,
+        [row[0] for row in rows],
+        vectors,
+        [row[2] for row in rows],
+        [row[3] or {} for row in rows],
+        **options,
+    )
+    if use_snapshot:
+        replica.save(path)
+        if compression and len(replica):
+            # 원래 벡터를 메모리에서 내리고 스냅샷 파일을 메모리 매핑해서 사용
+            replica = VectorReplica.from_snapshot(collection_name, path, **options)
+    print(f"[replica] {collection_name} DB 로드: {len(replica)}개 ({time.perf_counter() - started:.2f}초)")
+    return replica
+
+
+class ReplicaRetriever(BaseRetriever):
+    """
+    복제본 검색기 (PGVector as_retriever 와 같은 k / fetch_k / search_type 사용)
+    복제본이 없거나 검색 중 오류가 나면 fallback(Postgres 검색기) 사용
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    replica: Optional[VectorReplica] = None
+    embeddings: Any = None
+    fallback: Optional[BaseRetriever] = None
+    metadata_filter: Optional[dict] = None
+    search_type: str = "similarity"
+    k: int = 5
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        if self.replica is not None:
+            try:
+                embedding = self.embeddings.embed_query(query)
+                if self.search_type == "mmr":
+                    return self.replica.max_marginal_relevance_search_by_vector(
+                        embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult,
+                        metadata_filter=self.metadata_filter,
+                    )
+                return [
+                    doc for doc, _ in self.replica.similarity_search_with_score_by_vector(
+                        embedding, k=self.k, metadata_filter=self.metadata_filter
+                    )
+                ]
+            except Exception as e:
+                if self.fallback is None:
+                    raise
+                print(f"[replica] 복제본 검색 오류로 DB 검색 사용: {e}")
+        return self.fallback.invoke(query, config={"callbacks": run_manager.get_child()})
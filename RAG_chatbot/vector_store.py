@@ -1,7 +1,34 @@
 from langchain_postgres import PGVector
+from langchain_postgres.vectorstores import DistanceStrategy
+from langchain_postgres._utils import maximal_marginal_relevance
 from langchain_huggingface import HuggingFaceEmbeddings
 import os
+import io
+import re
+import csv
+import json
+import uuid
+import time
+import hashlib
+from typing import Any, Optional
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import sqlalchemy
+from pydantic import ConfigDict
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from dotenv import load_dotenv
+from .embedding_cache import CachedEmbeddings, LRUQueryEmbeddings, shared_query_lru
+from .onnx_embeddings import onnx_model_available, shared_onnx_embeddings
+from .regions import parse_region_query
+from .lexical_index import BM25Index, documents_from_rows
+from .hybrid_retriever import HybridRetriever, RETRIEVAL_MODES
+from .vector_replica import ReplicaRetriever, load_replica, collection_fingerprint
+
+EMBEDDING_MODEL = "intfloat/multilingual-e5-small"
+# 임베딩 실행 방식 (torch: HuggingFaceEmbeddings, onnx / onnx-int8: scripts/export_onnx_embeddings.py 로 내보낸 ONNX 모델)
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
 
 def get_db_connection():
     """DB 연결 문자열 생성"""
@@ -18,37 +45,817 @@ def get_db_connection():
     connection = f"postgresql+psycopg2://{db_config['DB_USER']}:{db_config['DB_PASSWORD']}@{db_config['DB_HOST']}:{db_config['DB_PORT']}/{db_config['DB_NAME']}"
     return connection
 
-def create_vector_store(documents=None, collection_name="laws_db"):
+@lru_cache(maxsize=None)
+def get_engine():
+    """프로세스 내에서 공유하는 SQLAlchemy 엔진 (PGVector 와 대량 적재가 같은 커넥션 풀 사용)"""
+    return sqlalchemy.create_engine(get_db_connection(), pool_pre_ping=True)
+
+# 프로세스 공용 쿼리 임베딩 LRU 크기 (모델별)
+QUERY_CACHE_SIZE = 1024
+
+def create_embeddings(model_name=EMBEDDING_MODEL, use_cache=True, backend=None):
+    """
+    임베딩 모델 생성 (use_cache=True 이면 로컬 임베딩 캐시를 앞단에 둠)
+    쿼리 임베딩은 그 앞에 프로세스 공용 메모리 LRU 를 한 번 더 둠
+    backend: EMBEDDING_BACKENDS 중 하나 (기본값은 환경 변수 EMBEDDING_BACKEND, 없으면 torch)
+    ONNX 모델이 내보내져 있지 않으면 torch 로 대체
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"지원하지 않는 임베딩 방식입니다: {backend} (가능: {', '.join(EMBEDDING_BACKENDS)})")
+    quantized = backend == "onnx-int8"
+    if backend != "torch" and not onnx_model_available(model_name, quantized):
+        print(f"[embeddings] {model_name} ONNX 모델이 없어 torch 로 실행합니다 (scripts/export_onnx_embeddings.py 로 생성)")
+        backend = "torch"
+
+    if backend == "torch":
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            cache_folder="/tmp/hf_cache"  # 캐시 폴더 지정
+        )
+        cache_key = model_name
+    else:
+        embeddings = shared_onnx_embeddings(model_name, quantized)
+        # int8 모델 출력은 원래 모델과 조금 다르므로 캐시를 따로 사용
+        cache_key = f"{model_name}#int8" if quantized else model_name
+    if use_cache:
+        embeddings = CachedEmbeddings(embeddings, model_name=cache_key)
+        embeddings = LRUQueryEmbeddings(embeddings, shared_query_lru(cache_key, QUERY_CACHE_SIZE))
+    return embeddings
+
+def query_cache_stats(model_name=EMBEDDING_MODEL):
+    """쿼리 임베딩 LRU 적중/미적중 통계"""
+    return shared_query_lru(model_name, QUERY_CACHE_SIZE).stats()
+
+def create_vector_store(documents=None, collection_name="laws_db", version=None, embedding_model=None):
     """
     벡터 스토어 접속 (이미 존재한다고 가정)
     새 문서가 제공된 경우에만 추가
+
+    collection_name 은 별칭으로 취급
+    - version=None: 별칭이 가리키는 현재 버전(없으면 collection_name 컬렉션 그대로)에 접속
+    - version=N: 'collection_name@vN' 버전 컬렉션 (재적재용, 없으면 생성)
+    임베딩 모델은 컬렉션 메타데이터에 기록된 모델을 사용하므로 모델이 다른 버전으로도 전환 가능
     """
-    connection = get_db_connection()
-    
-    # 임베딩 모델 (캐싱 사용)
-    embeddings = HuggingFaceEmbeddings(
-        model_name="intfloat/multilingual-e5-small",
-        cache_folder="/tmp/hf_cache"  # 캐시 폴더 지정
-    )
+    if version is None:
+        target = resolve_alias(collection_name)
+    else:
+        target = versioned_name(collection_name, version)
+    metadata = get_collection_metadata(target) or {}
+    model_name = embedding_model or metadata.get("embedding_model") or EMBEDDING_MODEL
+
+    # 임베딩 모델 (임베딩 캐시 사용)
+    embeddings = create_embeddings(model_name)
     
     # 기존 벡터 스토어에 접속
     vector_store = PGVector(
         embeddings=embeddings,
-        collection_name=collection_name,
-        connection=connection,
+        collection_name=target,
+        collection_metadata={
+            "embedding_model": model_name, "alias": collection_name, "version": version, "build_started_at": time.time(),
+        },
+        connection=get_engine(),
         use_jsonb=True
     )
     
     # 새 문서가 있는 경우만 추가
     if documents:
-        vector_store.add_documents(documents)
+        bulk_add_documents(vector_store, documents)
     
     return vector_store
 
-def create_retriever(vector_store, k=5, fetch_k=10):
-    """검색기 생성"""
-    return vector_store.as_retriever(search_kwargs={
-        "k": k,         # 최종 반환할 문서 개수
-        "fetch_k": fetch_k,  # 처음 검색할 문서 개수
-        "search_type": "mmr"  # MMR 적용
-    })
\ No newline at end of file
+# 버전 컬렉션 이름: '<별칭>@v<번호>'
+# 전환되지 않은 재적재 버전은 시작 후 이 시간(초)이 지나면 중단된 것으로 보고 정리
+REBUILD_GRACE_SECONDS = 24 * 3600
+VERSION_PATTERN = re.compile(r"^(?P<alias>.+)@v(?P<version>\d+)$")
+
+def versioned_name(alias, version):
+    return f"{alias}@v{version}"
+
+def _ensure_alias_table(conn):
+    conn.execute(sqlalchemy.text("""
+        CREATE TABLE IF NOT EXISTS collection_alias (
+            alias TEXT PRIMARY KEY,
+            collection_name TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+def resolve_alias(alias):
+    """
+    별칭이 가리키는 컬렉션 이름 (별칭이 없으면 같은 이름의 기존 컬렉션)
+    서빙 프로세스가 주기적으로 호출하므로 읽기만 함 (별칭 테이블은 swap_alias 에서 생성, 없으면 별칭 없음)
+    """
+    with get_engine().connect() as conn:
+        try:
+            collection_name = conn.execute(
+                sqlalchemy.text("SELECT collection_name FROM collection_alias WHERE alias = :alias"),
+                {"alias": alias},
+            ).scalar()
+        except sqlalchemy.exc.ProgrammingError:
+            collection_name = None  # 아직 별칭 테이블이 없음 (전환한 적 없음)
+    return collection_name or alias
+
+def get_collection_metadata(collection_name):
+    """langchain_pg_collection 의 cmetadata (컬렉션이 없으면 None)"""
+    with get_engine().connect() as conn:
+        try:
+            return conn.execute(
+                sqlalchemy.text("SELECT cmetadata FROM langchain_pg_collection WHERE name = :name"),
+                {"name": collection_name},
+            ).scalar()
+        except sqlalchemy.exc.ProgrammingError:
+            return None  # 아직 테이블이 없음 (첫 실행)
+
+def list_versions(alias):
+    """별칭의 버전 번호 목록 (오름차순)"""
+    with get_engine().connect() as conn:
+        names = conn.execute(
+            sqlalchemy.text("SELECT name FROM langchain_pg_collection WHERE name LIKE :pattern"),
+            {"pattern": f"{alias}@v%"},
+        ).scalars().all()
+    versions = []
+    for name in names:
+        match = VERSION_PATTERN.match(name)
+        if match and match.group("alias") == alias:
+            versions.append(int(match.group("version")))
+    return sorted(versions)
+
+def _live_version(alias):
+    """별칭이 가리키는 버전 번호 (버전 컬렉션이 아니면 0)"""
+    match = VERSION_PATTERN.match(resolve_alias(alias))
+    return int(match.group("version")) if match and match.group("alias") == alias else 0
+
+def _update_collection_metadata(conn, collection_name, **values):
+    """컬렉션 cmetadata 에 값 추가 (재적재 시작 시각, 검증 실패 등 — cmetadata 는 json 컬럼이라 통째로 다시 씀)"""
+    metadata = conn.execute(
+        sqlalchemy.text("SELECT cmetadata FROM langchain_pg_collection WHERE name = :name"), {"name": collection_name}
+    ).scalar() or {}
+    conn.execute(
+        sqlalchemy.text("UPDATE langchain_pg_collection SET cmetadata = CAST(:metadata AS json) WHERE name = :name"),
+        {"name": collection_name, "metadata": json.dumps({**metadata, **values}, ensure_ascii=False)},
+    )
+
+def next_version(alias, resume=True, embedding_model=None):
+    """
+    재적재할 버전 번호
+    resume=True 이면 현재 버전보다 새 버전(전환되지 않은 중단된 재적재) 중 가장 최신 버전을 이어서 적재
+    (적재 매니페스트가 컬렉션별이라 이미 적재한 소스는 건너뜀, 임베딩 모델이 다르거나 검증에 실패한 버전이면 새 번호)
+    이어서 적재해도 시작 시각(build_started_at)은 처음 값을 유지하므로, 계속 실패하는 버전도 유예 기간 뒤에는 정리됨
+    """
+    versions = list_versions(alias)
+    if resume and versions and versions[-1] > _live_version(alias):
+        name = versioned_name(alias, versions[-1])
+        metadata = get_collection_metadata(name) or {}
+        if metadata.get("validation_failed"):
+            print(f"[{alias}] 검증에 실패한 {name} 은 이어서 적재하지 않음: {metadata['validation_failed']}")
+        elif metadata.get("embedding_model") == (embedding_model or EMBEDDING_MODEL):
+            print(f"[{alias}] 중단된 재적재 이어서 진행: {name}")
+            return versions[-1]
+    return versions[-1] + 1 if versions else 1
+
+def count_embeddings(collection_name):
+    with get_engine().connect() as conn:
+        return conn.execute(sqlalchemy.text("""
+            SELECT count(*) FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            WHERE c.name = :name
+        """), {"name": collection_name}).scalar()
+
+def validate_collection(vector_store, min_ratio=0.9, probe_queries=()):
+    """
+    전환 전에 새 버전 컬렉션 검증 (실패하면 ValueError)
+    - 청크 수가 현재 버전의 min_ratio 이상
+    - 모든 벡터 차원이 임베딩 모델 차원과 같음
+    - probe_queries 가 모두 검색 결과를 반환
+    실패하면 컬렉션 cmetadata 에 validation_failed 를 기록 (next_version 이 이어서 적재하지 않고 GC 가 삭제)
+    """
+    try:
+        _validate_collection(vector_store, min_ratio, probe_queries)
+    except ValueError as e:
+        with get_engine().begin() as conn:
+            _update_collection_metadata(conn, vector_store.collection_name, validation_failed=str(e))
+        raise
+
+def _validate_collection(vector_store, min_ratio, probe_queries):
+    collection_name = vector_store.collection_name
+    alias = (get_collection_metadata(collection_name) or {}).get("alias")
+    count = count_embeddings(collection_name)
+    if count == 0:
+        raise ValueError(f"{collection_name}: 적재된 청크가 없습니다.")
+
+    live = resolve_alias(alias) if alias else None
+    if live and live != collection_name:
+        live_count = count_embeddings(live)
+        if count < live_count * min_ratio:
+            raise ValueError(f"{collection_name}: 청크 수 {count}개가 현재 버전({live}) {live_count}개의 {min_ratio:.0%} 미만입니다.")
+
+    dimension = len(vector_store.embeddings.embed_query("차원 확인"))
+    with get_engine().connect() as conn:
+        dimensions = conn.execute(sqlalchemy.text("""
+            SELECT DISTINCT vector_dims(e.embedding) FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+            WHERE c.name = :name
+        """), {"name": collection_name}).scalars().all()
+    if dimensions != [dimension]:
+        raise ValueError(f"{collection_name}: 벡터 차원 {dimensions} 이(가) 임베딩 모델 차원 {dimension} 과 다릅니다.")
+
+    for query in probe_queries:
+        if not vector_store.similarity_search(query, k=1):
+            raise ValueError(f"{collection_name}: 검증 쿼리 결과가 없습니다: {query}")
+    print(f"[{collection_name}] 검증 완료: 청크 {count}개, 차원 {dimension}")
+
+def swap_alias(alias, collection_name):
+    """
+    별칭을 collection_name 으로 전환 (한 트랜잭션, 이전 컬렉션 이름 반환)
+    서빙 프로세스는 resolve_alias 로 다음 조회 때 새 버전을 사용
+    """
+    with get_engine().begin() as conn:
+        _ensure_alias_table(conn)
+        previous = conn.execute(
+            sqlalchemy.text("SELECT collection_name FROM collection_alias WHERE alias = :alias FOR UPDATE"),
+            {"alias": alias},
+        ).scalar()
+        conn.execute(sqlalchemy.text("""
+            INSERT INTO collection_alias (alias, collection_name, updated_at) VALUES (:alias, :name, now())
+            ON CONFLICT (alias) DO UPDATE SET collection_name = EXCLUDED.collection_name, updated_at = now()
+        """), {"alias": alias, "name": collection_name})
+    print(f"[{alias}] {previous or alias} → {collection_name} 전환")
+    return previous
+
+def garbage_collect_versions(alias, keep=1, on_delete=None, grace_seconds=REBUILD_GRACE_SECONDS):
+    """
+    현재 버전과, 되돌리기용으로 그 이전 최신 keep 개 버전만 남기고 오래된 버전 컬렉션 삭제
+    현재 버전보다 새 버전(전환되지 않은 재적재)은 적재 중일 수 있으므로 시작 후 grace_seconds 가 지난 것만 삭제
+    (검증에 실패한 버전은 바로 삭제)
+    (langchain_pg_embedding 은 collection_id 외래키 ON DELETE CASCADE 로 함께 삭제)
+    on_delete(collection_name): 삭제된 버전마다 호출 (매니페스트 등 로컬 파일 정리용)
+    """
+    live_version = _live_version(alias)
+    if live_version == 0:
+        return []
+    versions = list_versions(alias)
+    candidates = [versioned_name(alias, version) for version in versions if version < live_version]
+    stale = candidates[:-keep] if keep > 0 else candidates
+    now = time.time()
+    with get_engine().begin() as conn:
+        for version in versions:
+            if version <= live_version:
+                continue
+            name = versioned_name(alias, version)
+            metadata = get_collection_metadata(name) or {}
+            started_at = metadata.get("build_started_at")
+            if metadata.get("validation_failed"):
+                # 검증에 실패한 버전은 다시 이어서 적재하지 않으므로 바로 삭제
+                stale.append(name)
+            elif started_at is None:
+                # 시작 시각을 기록하기 전에 만든 버전: 지금부터 유예 기간을 셈
+                _update_collection_metadata(conn, name, build_started_at=now)
+            elif now - started_at > grace_seconds:
+                stale.append(name)
+        for name in stale:
+            collection_id = conn.execute(
+                sqlalchemy.text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"), {"name": name}
+            ).scalar()
+            conn.execute(sqlalchemy.text("DELETE FROM langchain_pg_collection WHERE name = :name"), {"name": name})
+            if collection_id is not None:
+                for index_name in _collection_vector_indexes(conn, collection_id):
+                    conn.execute(sqlalchemy.text(f"DROP INDEX IF EXISTS {index_name}"))
+    for name in stale:
+        if on_delete:
+            on_delete(name)
+        print(f"[{alias}] 버전 삭제: {name}")
+    return stale
+
+def get_collection_id(collection_name):
+    """컬렉션 이름으로 langchain_pg_collection 의 uuid 조회"""
+    with get_engine().connect() as conn:
+        collection_id = conn.execute(
+            sqlalchemy.text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+            {"name": collection_name},
+        ).scalar()
+    if collection_id is None:
+        raise ValueError(f"컬렉션을 찾을 수 없습니다: {collection_name}")
+    return str(collection_id)
+
+def _vector_literal(embedding):
+    """pgvector 텍스트 표현 '[0.1,0.2,...]'"""
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+def _clean_text(text):
+    """PostgreSQL text 컬럼은 NUL 문자를 허용하지 않음"""
+    return text.replace("\x00", "")
+
+def write_embeddings(collection_id, ids, documents, embeddings):
+    """
+    임베딩이 끝난 배치 하나를 한 트랜잭션으로 기록
+    COPY 로 임시 테이블에 적재한 뒤 INSERT ... ON CONFLICT 한 번으로 upsert
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (
+            doc_id,
+            collection_id,
+            _vector_literal(embedding),
+            _clean_text(doc.page_content),
+            _clean_text(json.dumps(doc.metadata, ensure_ascii=False, default=str)),
+        )
+        for doc_id, doc, embedding in zip(ids, documents, embeddings)
+    )
+    buffer.seek(0)
+
+    conn = get_engine().raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS bulk_embedding_stage "
+                "(LIKE langchain_pg_embedding INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+            )
+            cur.copy_expert(
+                "COPY bulk_embedding_stage (id, collection_id, embedding, document, cmetadata) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            cur.execute("""
+                INSERT INTO langchain_pg_embedding (id, collection_id, embedding, document, cmetadata)
+                SELECT id, collection_id, embedding, document, cmetadata FROM bulk_embedding_stage
+                ON CONFLICT (id) DO UPDATE SET
+                    collection_id = EXCLUDED.collection_id,
+                    embedding = EXCLUDED.embedding,
+                    document = EXCLUDED.document,
+                    cmetadata = EXCLUDED.cmetadata
+            """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def create_row_writer(vector_store):
+    """
+    적재 파이프라인용 기록 함수 write_rows(ids, documents, embeddings) 생성
+    임베딩이 끝난 배치를 COPY 경로(write_embeddings)로 기록
+    """
+    return partial(write_embeddings, get_collection_id(vector_store.collection_name))
+
+def bulk_add_documents(vector_store, documents, ids=None, batch_size=256, on_batch_written=None):
+    """
+    대량 적재 경로 (add_documents 대체)
+    batch_size 개씩 임베딩하고, 배치마다 COPY + upsert 를 한 트랜잭션으로 기록
+    DB 쓰기는 별도 스레드에서 진행되어 다음 배치 임베딩과 겹쳐 실행됨
+    on_batch_written(batch_ids): 배치가 커밋될 때마다 호출 (적재 매니페스트 기록용)
+    """
+    documents = list(documents)
+    ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+    collection_id = get_collection_id(vector_store.collection_name)
+
+    def write(batch_ids, batch_docs, embeddings):
+        write_embeddings(collection_id, batch_ids, batch_docs, embeddings)
+        if on_batch_written:
+            on_batch_written(batch_ids)
+
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        for i in range(0, len(documents), batch_size):
+            batch_docs = documents[i:i + batch_size]
+            batch_ids = ids[i:i + batch_size]
+            embeddings = vector_store.embeddings.embed_documents([doc.page_content for doc in batch_docs])
+            # 이전 배치 쓰기가 끝나야 다음 배치를 넘김 (메모리에 최대 2배치만 유지)
+            if pending:
+                pending.result()
+            pending = writer.submit(write, batch_ids, batch_docs, embeddings)
+        if pending:
+            pending.result()
+
+    return ids
+
+# ANN 인덱스 (컬렉션별 부분 인덱스)
+VECTOR_INDEX_METHODS = ("hnsw", "ivfflat")
+VECTOR_OPS = {
+    DistanceStrategy.COSINE: "vector_cosine_ops",
+    DistanceStrategy.EUCLIDEAN: "vector_l2_ops",
+    DistanceStrategy.MAX_INNER_PRODUCT: "vector_ip_ops",
+}
+
+def vector_index_name(collection_id, method, partition=None):
+    """컬렉션(+ 파티션 값)별 ANN 인덱스 이름 (파티션 값은 한글일 수 있어 해시로 표기)"""
+    name = f"ix_embedding_{method}_{uuid.UUID(str(collection_id)).hex}"
+    if partition is not None:
+        name += "_" + hashlib.md5(str(partition).encode("utf-8")).hexdigest()[:8]
+    return name
+
+def _collection_vector_indexes(conn, collection_id):
+    """컬렉션의 ANN 인덱스 이름 목록 (파티션 인덱스 포함)"""
+    return list(conn.execute(
+        sqlalchemy.text("""
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'langchain_pg_embedding' AND indexname LIKE :pattern
+        """),
+        {"pattern": f"ix_embedding_%_{uuid.UUID(str(collection_id)).hex}%"},
+    ).scalars())
+
+def _sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+# halfvec(2바이트 float) 을 지원하는 pgvector 최소 버전
+HALFVEC_MIN_VERSION = (0, 7, 0)
+VECTOR_PRECISIONS = ("vector", "halfvec")
+
+def pgvector_version():
+    """설치된 pgvector 확장 버전 (예: (0, 7, 4))"""
+    with get_engine().connect() as conn:
+        version = conn.execute(sqlalchemy.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    return tuple(int(part) for part in re.findall(r"\d+", version or "0"))[:3]
+
+def _require_halfvec():
+    version = pgvector_version()
+    if version < HALFVEC_MIN_VERSION:
+        raise ValueError(f"halfvec 은 pgvector 0.7.0 이상에서 지원합니다 (현재 {'.'.join(map(str, version))})")
+
+def ensure_vector_index(vector_store, method="hnsw", m=16, ef_construction=64, lists=None, partition_key=None,
+                        precision="vector"):
+    """
+    컬렉션의 embedding 에 ANN 인덱스 생성 (이미 있으면 그대로 둠)
+    - collection_id 조건의 부분 인덱스라서 컬렉션 필터 + 거리 정렬 쿼리(vector_search)가 인덱스를 사용
+    - hnsw: m, ef_construction / ivfflat: lists (기본: 행 수 / 1000, 최소 10) — ivfflat 은 적재 후 생성해야 함
+    - partition_key(예: "topic"): 메타데이터 값별 부분 인덱스도 생성. 같은 조건으로 필터한 검색은
+      해당 파티션 인덱스만 탐색하므로, 전체 인덱스에서 찾은 뒤 걸러내느라 결과가 모자라는 일이 없음
+    - precision="halfvec": embedding::halfvec 표현식 인덱스 (인덱스 크기 절반, pgvector 0.7 이상)
+      halfvec_search / create_retriever(precision="halfvec") 가 이 인덱스로 후보를 찾고 원래 벡터로 재정렬
+    embedding 컬럼은 차원 없는 vector 그대로 두고(임베딩 모델이 다른 컬렉션도 같은 테이블을 씀)
+    컬렉션 차원으로 캐스트한 표현식에 인덱스를 만들므로, 검색 SQL 도 같은 식(index_expression)으로 정렬해야 함
+    서비스 중인 테이블이라 CREATE INDEX CONCURRENTLY 로 생성 (생성 중에도 적재/검색을 막지 않음)
+    """
+    if method not in VECTOR_INDEX_METHODS:
+        raise ValueError(f"지원하지 않는 인덱스 방식입니다: {method}")
+    if precision not in VECTOR_PRECISIONS:
+        raise ValueError(f"지원하지 않는 정밀도입니다: {precision}")
+    if precision == "halfvec":
+        _require_halfvec()
+    collection_id = get_collection_id(vector_store.collection_name)
+    ops = VECTOR_OPS[vector_store._distance_strategy]
+    dimension = len(vector_store.embeddings.embed_query("차원 확인"))
+    column = f"(embedding::{precision}({dimension}))"
+    index_method = method
+    if precision == "halfvec":
+        ops = ops.replace("vector_", "halfvec_", 1)
+        index_method = f"{method}_halfvec"
+    index_name = vector_index_name(collection_id, index_method)
+    if method == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    else:
+        if lists is None:
+            rows = count_embeddings(vector_store.collection_name)
+            lists = max(10, rows // 1000)
+        options = f"lists = {int(lists)}"
+
+    # CONCURRENTLY 는 트랜잭션 안에서 실행할 수 없으므로 autocommit 커넥션 사용
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        targets = [(index_name, None)]
+        if partition_key is not None:
+            if not partition_key.isidentifier():
+                raise ValueError(f"잘못된 메타데이터 키입니다: {partition_key}")
+            values = conn.execute(
+                sqlalchemy.text(f"""
+                    SELECT DISTINCT cmetadata->>'{partition_key}' FROM langchain_pg_embedding
+                    WHERE collection_id = :collection_id AND cmetadata ? '{partition_key}'
+                """),
+                {"collection_id": collection_id},
+            ).scalars()
+            targets += [(vector_index_name(collection_id, index_method, value), value) for value in sorted(values)]
+
+        for name, value in targets:
+            valid = conn.execute(
+                sqlalchemy.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+            ).scalar()
+            if valid:
+                continue
+            if valid is not None:
+                # 이전 CONCURRENTLY 생성이 중단되어 남은 INVALID 인덱스는 지우고 다시 생성
+                conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            condition = f"collection_id = '{collection_id}'"
+            if value is not None:
+                condition += f" AND (cmetadata->>'{partition_key}') = {_sql_literal(value)}"
+            started = time.perf_counter()
+            conn.execute(sqlalchemy.text(f"""
+                CREATE INDEX CONCURRENTLY {name} ON langchain_pg_embedding
+                USING {method} ({column} {ops}) WITH ({options})
+                WHERE {condition}
+            """))
+            label = f"{partition_key}={value} " if value is not None else ""
+            print(f"[{vector_store.collection_name}] {label}{index_method} 인덱스 생성 ({options}, {time.perf_counter() - started:.1f}초)")
+    return index_name
+
+# 검색 필터에 쓰는 메타데이터 키 (collection_id + 키 값 표현식 인덱스)
+METADATA_INDEX_FIELDS = ("type", "category", "topic", "statute", "sido", "sigungu")
+
+def ensure_metadata_indexes(fields=METADATA_INDEX_FIELDS):
+    """
+    cmetadata 의 키별 표현식 인덱스 생성 (이미 있으면 그대로 둠)
+    PGVector 는 $in 필터를 cmetadata->>'키' IN (...) 로 만들기 때문에 이 인덱스를 사용
+    ($eq 는 jsonb_path_match 함수 호출이라 인덱스를 타지 않으므로 build_metadata_filter 는 $in 으로 구성)
+    """
+    with get_engine().begin() as conn:
+        for field in fields:
+            conn.execute(sqlalchemy.text(f"""
+                CREATE INDEX IF NOT EXISTS ix_cmetadata_{field}
+                ON langchain_pg_embedding (collection_id, (cmetadata->>'{field}'))
+            """))
+
+def _set_local_search_settings(session, ef_search=None, probes=None):
+    """
+    이 검색의 트랜잭션에만 ANN 검색 범위 적용 (SET LOCAL — 트랜잭션이 끝나면 원래 값, 다른 검색에 영향 없음)
+    ef_search(hnsw) / probes(ivfflat): 클수록 정확하지만 느림 (None 이면 pgvector 기본값 40 / 1)
+    """
+    for name, value in (("hnsw.ef_search", ef_search), ("ivfflat.probes", probes)):
+        if value is not None:
+            session.execute(sqlalchemy.text(f"SET LOCAL {name} = {int(value)}"))
+
+def check_index_usage(vector_store, query="결혼이민자 국적 취득 요건", k=5, metadata_filter=None, precision="vector"):
+    """
+    검색기가 실행하는 SQL(vector_search / halfvec_search)을 캡처해 EXPLAIN 하고 ANN 인덱스 사용 여부 출력
+    metadata_filter 를 주면 필터 검색이 파티션 인덱스를 쓰는지 확인
+    반환값: {"uses_index": bool, "index": 인덱스 이름 또는 None, "plan": 실행 계획}
+    """
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "langchain_pg_embedding" in statement and "ORDER BY" in statement:
+            captured.append((statement, parameters))
+
+    engine = get_engine()
+    sqlalchemy.event.listen(engine, "before_cursor_execute", capture)
+    try:
+        embedding = vector_store.embeddings.embed_query(query)
+        if precision == "halfvec":
+            halfvec_search(vector_store, embedding, k=k, metadata_filter=metadata_filter)
+        else:
+            vector_search(vector_store, embedding, k=k, metadata_filter=metadata_filter)
+    finally:
+        sqlalchemy.event.remove(engine, "before_cursor_execute", capture)
+    if not captured:
+        raise ValueError("검색 쿼리를 찾지 못했습니다.")
+
+    statement, parameters = captured[-1]
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN " + statement, parameters)
+            # 쿼리 벡터 리터럴은 생략
+            plan = re.sub(r"'\[[^\]]*\]'", "'[...]'", "\n".join(row[0] for row in cur.fetchall()))
+        conn.rollback()
+    finally:
+        conn.close()
+
+    match = re.search(r"Index Scan using (ix_embedding_(?:hnsw|ivfflat)_\w+)", plan)
+    result = {"uses_index": bool(match), "index": match.group(1) if match else None, "plan": plan}
+    if match:
+        print(f"[{vector_store.collection_name}] ANN 인덱스 사용: {result['index']}")
+    else:
+        print(f"[{vector_store.collection_name}] ANN 인덱스를 사용하지 않음 (순차 스캔)\n{plan}")
+    return result
+
+_DISTANCE_COMPARATORS = {
+    DistanceStrategy.COSINE: "cosine_distance",
+    DistanceStrategy.EUCLIDEAN: "l2_distance",
+    DistanceStrategy.MAX_INNER_PRODUCT: "max_inner_product",
+}
+
+def index_expression(vector_store, dimension, precision="vector"):
+    """ensure_vector_index 의 인덱스 표현식과 같은 embedding 캐스트 (검색 SQL 이 이 식으로 정렬해야 인덱스를 사용)"""
+    from pgvector.sqlalchemy import HALFVEC, VECTOR
+
+    column_type = HALFVEC(dimension) if precision == "halfvec" else VECTOR(dimension)
+    return sqlalchemy.cast(vector_store.EmbeddingStore.embedding, column_type)
+
+def _search_conditions(vector_store, session, metadata_filter=None):
+    """컬렉션 조건 (+ 메타데이터 필터) — 부분 인덱스의 WHERE 조건과 같은 형태"""
+    collection = vector_store.get_collection(session)
+    if not collection:
+        raise ValueError(f"컬렉션을 찾을 수 없습니다: {vector_store.collection_name}")
+    conditions = [vector_store.EmbeddingStore.collection_id == collection.uuid]
+    if metadata_filter:
+        conditions.append(vector_store._create_filter_clause(metadata_filter))
+    return conditions
+
+def _vector_search_rows(vector_store, embedding, k, metadata_filter=None, ef_search=None, probes=None):
+    store = vector_store.EmbeddingStore
+    comparator = _DISTANCE_COMPARATORS[vector_store._distance_strategy]
+    with vector_store._make_sync_session() as session:
+        _set_local_search_settings(session, ef_search, probes)
+        distance = getattr(index_expression(vector_store, len(embedding)), comparator)(embedding).label("distance")
+        return (
+            session.query(store, distance)
+            .filter(*_search_conditions(vector_store, session, metadata_filter))
+            .order_by(sqlalchemy.asc("distance"))
+            .limit(k)
+            .all()
+        )
+
+def vector_search(vector_store, embedding, k=5, metadata_filter=None, ef_search=None, probes=None):
+    """
+    컬렉션의 vector 표현식 인덱스로 가까운 k개 검색 (ef_search / probes 는 이 검색에만 적용)
+    반환: [(Document, 거리)] — PGVector similarity_search_with_score 와 같은 형식
+    """
+    return vector_store._results_to_docs_and_scores(
+        _vector_search_rows(vector_store, embedding, k, metadata_filter, ef_search, probes)
+    )
+
+def vector_mmr_search(vector_store, embedding, k=5, fetch_k=20, lambda_mult=0.5, metadata_filter=None,
+                      ef_search=None, probes=None):
+    """vector_search 로 fetch_k 개를 가져와 MMR 로 k개 선택 (PGVector max_marginal_relevance_search 와 같은 방식)"""
+    results = _vector_search_rows(vector_store, embedding, fetch_k, metadata_filter, ef_search, probes)
+    selected = maximal_marginal_relevance(
+        np.array(embedding, dtype=np.float32),
+        [result.EmbeddingStore.embedding for result in results],
+        k=k,
+        lambda_mult=lambda_mult,
+    )
+    candidates = vector_store._results_to_docs_and_scores(results)
+    return [candidate for i, candidate in enumerate(candidates) if i in selected]
+
+def halfvec_search(vector_store, embedding, k=5, rescore_k=50, metadata_filter=None, ef_search=None, probes=None):
+    """
+    halfvec 거리로 후보 rescore_k 개를 찾고(halfvec 인덱스 사용) 원래 float 벡터 거리로 다시 정렬해 상위 k개
+    반환: [(Document, 거리)] — PGVector similarity_search_with_score 와 같은 형식
+    """
+    store = vector_store.EmbeddingStore
+    comparator = _DISTANCE_COMPARATORS[vector_store._distance_strategy]
+    with vector_store._make_sync_session() as session:
+        _set_local_search_settings(session, ef_search, probes)
+        half = index_expression(vector_store, len(embedding), precision="halfvec")
+        candidates = (
+            session.query(store.id)
+            .filter(*_search_conditions(vector_store, session, metadata_filter))
+            .order_by(getattr(half, comparator)(embedding))
+            .limit(max(k, rescore_k))
+            .subquery()
+        )
+        results = (
+            session.query(store, getattr(store.embedding, comparator)(embedding).label("distance"))
+            .join(candidates, store.id == candidates.c.id)
+            .order_by(sqlalchemy.asc("distance"))
+            .limit(k)
+            .all()
+        )
+        return vector_store._results_to_docs_and_scores(results)
+
+class IndexedVectorRetriever(BaseRetriever):
+    """
+    ensure_vector_index 의 표현식 인덱스를 쓰는 검색기
+    precision="vector": fetch_k 개 후보에서 MMR 로 k개 (vector_mmr_search)
+    precision="halfvec": halfvec 인덱스 후보 rescore_k 개 + float 재정렬 (halfvec_search)
+    ef_search / probes: 검색마다 SET LOCAL 로 적용하는 ANN 검색 범위 (None 이면 pgvector 기본값)
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_store: Any
+    k: int = 5
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    precision: str = "vector"
+    rescore_k: int = 50
+    metadata_filter: Optional[dict] = None
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        embedding = self.vector_store.embeddings.embed_query(query)
+        if self.precision == "halfvec":
+            results = halfvec_search(
+                self.vector_store, embedding, k=self.k, rescore_k=self.rescore_k, metadata_filter=self.metadata_filter,
+                ef_search=self.ef_search, probes=self.probes,
+            )
+        else:
+            results = vector_mmr_search(
+                self.vector_store, embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult,
+                metadata_filter=self.metadata_filter, ef_search=self.ef_search, probes=self.probes,
+            )
+        return [doc for doc, _ in results]
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+def build_metadata_filter(type=None, category=None, topic=None, statute=None, region=None, active_on=None):
+    """
+    검색 전 범위를 좁히는 PGVector 메타데이터 필터 (조건이 없으면 None)
+    type/category/topic/statute: 값 또는 값 목록 / region: '서울 구로구', '구로구' 등
+    active_on: 'YYYY-MM-DD' 또는 date — 신청 마감일(end_date)이 그 날 이후인 문서만
+    """
+    conditions = []
+    for field, value in (("type", type), ("category", category), ("topic", topic), ("statute", statute)):
+        if value:
+            conditions.append({field: {"$in": _as_list(value)}})
+    if region:
+        sido, sigungu = parse_region_query(region)
+        if sigungu:
+            conditions.append({"sigungu": {"$in": [sigungu]}})
+        elif sido:
+            conditions.append({"sido": {"$in": [sido]}})
+    if active_on:
+        active_on = active_on if isinstance(active_on, str) else active_on.isoformat()
+        conditions.append({"end_date": {"$gte": active_on}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def create_retriever(vector_store, k=5, fetch_k=10, lambda_mult=0.5, ef_search=None, probes=None, metadata_filter=None,
+                     replica=None, precision="vector", rescore_k=50):
+    """
+    검색기 생성
+    ef_search(hnsw) / probes(ivfflat): ANN 인덱스 검색 범위 (기본값은 pgvector 기본값 40 / 1)
+                                       이 검색기의 DB 검색 트랜잭션에만 SET LOCAL 로 적용 (다른 검색기/커넥션에 영향 없음)
+    MMR 은 fetch_k 개를 먼저 가져오므로 ef_search 는 fetch_k 이상이어야 후보가 부족하지 않음
+    metadata_filter: build_metadata_filter 결과 — 벡터 검색 전에 해당 범위로 제한
+    replica: load_vector_replica 결과 — 주면 메모리 복제본에서 검색하고 DB 검색은 오류 시에만 사용
+             (복제본도 DB 검색과 같은 방식: precision="vector" 면 MMR, "halfvec" 면 유사도 순)
+    DB 검색은 ensure_vector_index 의 표현식 인덱스를 쓰도록 같은 캐스트 식으로 정렬 (IndexedVectorRetriever)
+    precision="halfvec": DB 검색을 halfvec 인덱스 후보 rescore_k 개 + float 재정렬로 수행
+    """
+    if precision not in VECTOR_PRECISIONS:
+        raise ValueError(f"지원하지 않는 정밀도입니다: {precision}")
+    retriever = IndexedVectorRetriever(
+        vector_store=vector_store,
+        k=k,                # 최종 반환할 문서 개수
+        fetch_k=fetch_k,    # MMR 적용 전 처음 검색할 문서 개수
+        lambda_mult=lambda_mult,
+        precision=precision,
+        rescore_k=rescore_k,
+        metadata_filter=metadata_filter,
+        ef_search=ef_search,
+        probes=probes,
+    )
+    if replica is None:
+        return retriever
+    return ReplicaRetriever(
+        replica=replica,
+        embeddings=vector_store.embeddings,
+        fallback=retriever,
+        metadata_filter=metadata_filter,
+        search_type="similarity" if precision == "halfvec" else "mmr",
+        k=k,
+        fetch_k=fetch_k,
+        lambda_mult=lambda_mult,
+    )
+
+def load_vector_replica(vector_store, use_snapshot=True, compression=None, rescore_k=50):
+    """
+    벡터 스토어 컬렉션의 메모리 복제본 로드 (vector_replica.load_replica 참고)
+    compression: 'float16' / 'int8' / 'pca128' 등 — 압축 코드로 후보를 고르고 rescore_k 개를 원래 벡터로 재계산
+    """
+    return load_replica(
+        get_engine(), vector_store.collection_name, vector_store._distance_strategy,
+        use_snapshot=use_snapshot, compression=compression, rescore_k=rescore_k,
+    )
+
+def get_collection_fingerprint(collection_name):
+    """컬렉션 내용 지문 (청크가 추가/삭제/변경되면 달라짐, 복제본의 fingerprint 와 같은 값)"""
+    with get_engine().connect() as conn:
+        return collection_fingerprint(conn, collection_name)
+
+def load_lexical_index(collection_name, replica=None):
+    """컬렉션에 저장된 청크로 BM25 인덱스 구성 (벡터 검색과 같은 청크/ID, 복제본이 있으면 DB 조회 생략)"""
+    if replica is not None:
+        return BM25Index(replica.documents())
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            sqlalchemy.text("""
+                SELECT e.id, e.document, e.cmetadata
+                FROM langchain_pg_embedding e
+                JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                WHERE c.name = :name
+                ORDER BY e.id
+            """),
+            {"name": collection_name},
+        ).all()
+    return BM25Index(documents_from_rows(rows))
+
+def create_hybrid_retriever(vector_store, lexical_index, k=5, candidate_k=10, mode="hybrid",
+                            vector_timeout=None, ef_search=None, probes=None, metadata_filter=None, replica=None,
+                            precision="vector"):
+    """
+    BM25 + 벡터 검색 RRF 병합 검색기 (HybridRetriever 참고)
+    candidate_k: 각 검색에서 가져와 병합할 후보 수 / mode: hybrid, lexical, vector
+    replica: 벡터 검색을 메모리 복제본에서 수행 (create_retriever 참고)
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"지원하지 않는 검색 방식입니다: {mode}")
+    vector_retriever = None
+    if mode != "lexical":
+        vector_retriever = create_retriever(
+            vector_store, k=candidate_k, fetch_k=max(candidate_k * 2, 10),
+            ef_search=ef_search, probes=probes, metadata_filter=metadata_filter, replica=replica,
+            precision=precision,
+        )
+    return HybridRetriever(
+        vector_retriever=vector_retriever,
+        lexical_index=lexical_index,
+        metadata_filter=metadata_filter,
+        k=k,
+        candidate_k=candidate_k,
+        mode=mode,
+        vector_timeout=vector_timeout,
+    )
@@ -1,6 +1,7 @@
 import streamlit as st
 import sys
 import os
+from itertools import chain
 from PIL import Image
 
 # 루트 경로 추가
@@ -9,19 +10,19 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from RAG_chatbot.model import RAGModel
 from app.components.translations import TRANSLATIONS, VALUE_TRANSLATIONS, LANG_CODE_MAP, COUNTRY_FLAGS, get_translation, get_value_translation
 
-# 응답 캐싱
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_cached_response(query, user_info_str):
-    user_info = eval(user_info_str)
+# 스트리밍 응답 (비슷한 질문 + 같은 사용자 정보면 RAGModel 의 의미 기반 답변 캐시에서 한 번에 반환)
+# session_id 별로 이전 대화가 프롬프트에 들어감
+def stream_cached_response(query, user_info, session_id=None):
     model = RAGModel()
-    return model.get_response(query, user_info)
+    return model.stream_response(query, user_info, use_cache=True, session_id=session_id)
 
 
 class ChatInterface:
-    def __init__(self, user_info: dict, rag_model: RAGModel, chat_history: list):
+    def __init__(self, user_info: dict, rag_model: RAGModel, chat_history: list, session_id: str = None):
         self.user_info = user_info
         self.rag_model = rag_model
         self.chat_history = chat_history
+        self.session_id = session_id
         self.lang = LANG_CODE_MAP.get(self.user_info["preferred_language"], "ko")
         self.t = TRANSLATIONS[self.lang]
 
@@ -68,9 +69,39 @@ class ChatInterface:
                 st.write(self.query)
             self.chat_history.append({"role": "user", "content": self.query})
 
-            with st.spinner(self.t["chat_spinner"]):
-                response = get_cached_response(self.query, str(self.user_info))
-
             with st.chat_message("assistant"):
-                st.write(response)
+                response = self.render_stream(stream_cached_response(self.query, self.user_info, self.session_id))
             self.chat_history.append({"role": "assistant", "content": response})
+
+    def render_stream(self, events):
+        """
+        RAGModel.stream_response 이벤트를 받는 대로 표시하고 최종 답변을 반환
+        번역문은 위, 한국어 원문은 아래 (최종 답변과 같은 배치), 첫 이벤트 전까지만 스피너 표시
+        """
+        translation_box = st.empty()
+        answer_box = st.empty()
+        answer = translation = response = ""
+
+        events = iter(events)
+        with st.spinner(self.t["chat_spinner"]):
+            first = next(events, None)
+
+        for event, value in chain([first] if first else [], events):
+            if event == "sources" and value:
+                answer_box.caption("📚 " + " · ".join(value))
+            elif event == "answer":
+                answer += value
+                # 번역이 시작된 뒤에도 한국어 답변은 계속 생성됨 (세그먼트 단위 번역)
+                prefix = "---\n[한국어 원문]\n" if translation else ""
+                answer_box.markdown(prefix + answer + "▌")
+            elif event == "translation":
+                if not translation:
+                    answer_box.markdown(f"---\n[한국어 원문]\n{answer}")
+                translation += value
+                translation_box.markdown(translation + "▌")
+            elif event == "done":
+                response = value
+
+        translation_box.empty()
+        answer_box.write(response)
+        return response
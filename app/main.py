@@ -3,6 +3,7 @@ st.set_page_config(page_title="이주여성을 위한 다국어 대화형 인공
 
 import sys
 import os
+import uuid
 from PIL import Image
 from base64 import b64encode
 
@@ -21,6 +22,9 @@ def init_session_state():
         st.session_state.rag_model = RAGModel()
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    if "session_id" not in st.session_state:
+        # RAGModel 의 세션별 대화 기록 키
+        st.session_state.session_id = uuid.uuid4().hex
 
 def render_logo_and_title():
     logo_path = os.path.join(os.path.dirname(__file__), "static/images/majubom_logo.webp")
@@ -60,7 +64,8 @@ def main():
             ChatInterface(
                 rag_model=st.session_state.rag_model,
                 user_info=st.session_state.user_info,
-                chat_history=st.session_state.chat_history
+                chat_history=st.session_state.chat_history,
+                session_id=st.session_state.session_id
             ).display()
         else:
             st.warning("기본 정보를 먼저 입력해주세요.")